@@ -1,14 +1,59 @@
 from django.contrib import admin
 from django.contrib import messages
 from django.shortcuts import redirect
-from django.urls import path
+from django.urls import path, reverse
 from django.utils.html import format_html
 from django.contrib.admin import AdminSite
-from .models import MetaModel, MetaField
+from django.db import connection
+from .models import DataJob, MetaModel, MetaField
 from .dynamic_manager import dynamic_model_manager
 from .forms import MetaFieldAdminForm, MetaFieldInlineForm
 
 
+# Voci della sezione "Modelli Dinamici": versione dello schema -> lista di voci.
+# Invalidata con le altre cache derivate dallo schema (segnali su MetaModel/MetaField,
+# create/update/drop_table e sincronizzazione tra processi)
+_dynamic_app_section_cache = {}
+
+
+def _invalidate_dynamic_app_section(meta_model_name=None):
+    _dynamic_app_section_cache.clear()
+
+
+dynamic_model_manager.register_cache_invalidator(_invalidate_dynamic_app_section)
+
+
+def get_dynamic_app_section_models():
+    """
+    Voci della sezione dei modelli dinamici, costruite una volta per versione dello
+    schema invece che ad ogni pagina dell'admin
+    
+    Usa solo i MetaModel e l'elenco delle tabelle: get_model() in modalità lazy
+    costruirebbe (ed eventualmente rimuoverebbe) le classi di tutti i modelli.
+    """
+    schema_version = dynamic_model_manager.schema_version
+    section_models = _dynamic_app_section_cache.get(schema_version)
+    
+    if section_models is None:
+        section_models = []
+        table_names = set(connection.introspection.table_names())
+        
+        for meta_model in MetaModel.objects.filter(is_active=True):
+            if meta_model.table_name in table_names:
+                section_models.append({
+                    'name': meta_model.verbose_name if hasattr(meta_model, 'verbose_name') else meta_model.name,
+                    'object_name': meta_model.name,
+                    'perms': {'add': True, 'change': True, 'delete': True, 'view': True},
+                    'admin_url': reverse('dynamic_data_list', args=[meta_model.id]),
+                    'add_url': reverse('dynamic_data_add', args=[meta_model.id]),
+                })
+        
+        _dynamic_app_section_cache.clear()
+        _dynamic_app_section_cache[schema_version] = section_models
+    
+    return section_models
+
+
 # Personalizza l'admin site per aggiungere una sezione "Modelli Dinamici"
 class DynamicModelsAdminMixin:
     """
@@ -17,27 +62,15 @@ class DynamicModelsAdminMixin:
     def get_app_list(self, request, app_label=None):
         app_list = super().get_app_list(request, app_label)
         
-        # Crea una sezione per i modelli dinamici
+        # Crea una sezione per i modelli dinamici (copia delle voci in cache)
         dynamic_models_section = {
             'name': 'Modelli Dinamici',
             'app_label': 'dynamic_models',
             'app_url': '/admin/dynamic_models/',
             'has_module_perms': True,
-            'models': []
+            'models': [dict(model) for model in get_dynamic_app_section_models()]
         }
         
-        # Aggiungi i modelli dinamici attivi
-        for meta_model in MetaModel.objects.filter(is_active=True):
-            model_class = dynamic_model_manager.get_model(meta_model.name)
-            if model_class:
-                dynamic_models_section['models'].append({
-                    'name': meta_model.verbose_name if hasattr(meta_model, 'verbose_name') else meta_model.name,
-                    'object_name': meta_model.name,
-                    'perms': {'add': True, 'change': True, 'delete': True, 'view': True},
-                    'admin_url': f'/dynamic_models/data/{meta_model.id}/',
-                    'add_url': f'/dynamic_models/data/{meta_model.id}/add/',
-                })
-        
         # Aggiungi la sezione se ci sono modelli dinamici
         if dynamic_models_section['models']:
             app_list.append(dynamic_models_section)
@@ -53,7 +86,7 @@ class MetaFieldInline(admin.TabularInline):
     model = MetaField
     form = MetaFieldInlineForm
     extra = 1
-    fields = ['name', 'field_type', 'required', 'unique', 'verbose_name', 'help_text', 
+    fields = ['name', 'field_type', 'required', 'unique', 'db_index', 'verbose_name', 'help_text', 
              'related_model', 'relation_type', 'on_delete', 'related_name', 'field_params', 'order']
     
     class Media:
@@ -76,6 +109,11 @@ class MetaModelAdmin(admin.ModelAdmin):
         ('Informazioni Base', {
             'fields': ('name', 'table_name', 'description', 'is_active')
         }),
+        ('Indici', {
+            'fields': ('indexes', 'fulltext_search'),
+            'classes': ('collapse',),
+            'description': 'Indici composti o parziali. Es: [{"fields": ["category", "-created"]}]'
+        }),
         ('Metadati', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
@@ -176,7 +214,7 @@ class MetaFieldAdmin(admin.ModelAdmin):
             'fields': ('meta_model', 'name', 'field_type', 'verbose_name', 'help_text')
         }),
         ('Vincoli', {
-            'fields': ('required', 'unique', 'default_value')
+            'fields': ('required', 'unique', 'db_index', 'default_value')
         }),
         ('Relazioni', {
             'fields': ('related_model', 'relation_type', 'on_delete', 'related_name'),
@@ -197,6 +235,36 @@ class MetaFieldAdmin(admin.ModelAdmin):
         js = ('admin/js/dynamic_field_admin.js',)
 
 
+@admin.register(DataJob)
+class DataJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'job_type', 'meta_model', 'status', 'progress_display', 'worker', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['job_type', 'status', 'meta_model']
+    search_fields = ['meta_model__name', 'worker', 'error']
+    readonly_fields = ['status', 'processed', 'total', 'result', 'error', 'result_file', 'worker',
+                       'created_by', 'created_at', 'started_at', 'heartbeat_at', 'finished_at']
+    actions = ['request_cancel']
+    
+    def progress_display(self, obj):
+        if obj.progress is None:
+            return f"{obj.processed}"
+        return f"{obj.progress}% ({obj.processed}/{obj.total})"
+    progress_display.short_description = 'Avanzamento'
+    
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+    
+    def request_cancel(self, request, queryset):
+        """Annulla i job selezionati: subito se in attesa, al prossimo blocco se in esecuzione"""
+        cancelled = queryset.filter(status=DataJob.STATUS_PENDING).update(
+            status=DataJob.STATUS_CANCELLED, cancel_requested=True
+        )
+        requested = queryset.filter(status=DataJob.STATUS_RUNNING).update(cancel_requested=True)
+        messages.success(request, f"{cancelled} job annullati, annullamento richiesto per {requested} job in esecuzione")
+    request_cancel.short_description = "Annulla i job selezionati"
+
+
 # Aggiungi link personalizzato per gestione backup nell'admin
 def backup_management_link():
     """Link per accedere alla gestione backup"""
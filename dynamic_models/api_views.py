@@ -2,10 +2,258 @@ from rest_framework import viewsets, serializers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, MultiPartParser, FormParser, JSONParser
+from rest_framework.validators import UniqueValidator
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import DatabaseError, models, transaction
 from django.db.models import Model
-from .models import MetaModel, MetaField
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, urlencode
+from .models import MetaModel, MetaField, SchemaState
 from .dynamic_manager import dynamic_model_manager
+from .fulltext import apply_search
+from .pagination import DynamicCursorPagination, DynamicPageNumberPagination, use_cursor_pagination
+from .query_dsl import QueryDSLError, compile_filters, compile_ordering, get_field_types
+from .query_planner import ExpandError, apply_relation_plan, get_expand_plan, get_relation_plan, parse_expand
+import copy
+import hashlib
+import json
+
+
+# Cache per processo: nome modello -> MetaModel, classe e metadati dei campi.
+# Invalidata dal dynamic_model_manager quando lo schema del modello cambia.
+_model_resolution_cache = {}
+
+
+def _invalidate_model_resolution(meta_model_name=None):
+    if meta_model_name is None:
+        _model_resolution_cache.clear()
+    else:
+        _model_resolution_cache.pop(meta_model_name, None)
+
+
+dynamic_model_manager.register_cache_invalidator(_invalidate_model_resolution)
+
+
+def resolve_dynamic_model(model_name):
+    """
+    Risolve il nome di un modello dinamico in MetaModel, classe del modello e
+    metadati dei campi. Dopo la prima richiesta non esegue query sui metadati.
+    
+    Returns:
+        Dizionario con meta_model, model_class, fields e file_fields
+    
+    Raises:
+        MetaModel.DoesNotExist: se non esiste un MetaModel attivo con quel nome
+    """
+    resolution = _model_resolution_cache.get(model_name)
+    
+    if resolution is not None:
+        if dynamic_model_manager.lazy_loading:
+            # Mantiene aggiornato l'ordine LRU dei modelli caricati
+            dynamic_model_manager.get_model(model_name)
+        return resolution
+    
+    meta_model = MetaModel.objects.prefetch_related('fields').get(name=model_name, is_active=True)
+    fields = list(meta_model.fields.all())
+    
+    resolution = {
+        'meta_model': meta_model,
+        'model_class': dynamic_model_manager.get_model(model_name),
+        'fields': fields,
+        'file_fields': tuple(field.name for field in fields if field.field_type in ['file', 'image']),
+        'field_types': None,
+    }
+    if resolution['model_class'] is not None:
+        resolution['field_types'] = get_field_types(resolution['model_class'], fields)
+    
+    # Non memorizzare modelli non ancora caricati: verranno risolti alla prossima richiesta
+    if resolution['model_class'] is not None:
+        _model_resolution_cache[model_name] = resolution
+    
+    return resolution
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parser per application/x-ndjson: un oggetto JSON per riga, restituiti come lista
+    """
+    media_type = 'application/x-ndjson'
+    
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        rows = []
+        
+        for line_number, line in enumerate(stream, start=1):
+            line = line.decode(encoding).strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as e:
+                raise ParseError(f"NDJSON non valido alla riga {line_number}: {e}")
+        
+        return rows
+
+
+class DynamicModelSerializer(serializers.ModelSerializer):
+    """
+    Serializer base per i modelli dinamici.
+    Le sottoclassi vengono generate da get_dynamic_serializer_class().
+    """
+    
+    # Nomi dei campi file/image, calcolati una volta per classe
+    file_fields = ()
+    
+    def get_fields(self):
+        """
+        Introspeziona il modello una sola volta per classe e restituisce
+        una copia dei campi (come fanno i form Django con base_fields)
+        """
+        serializer_class = type(self)
+        prototype = serializer_class.__dict__.get('_fields_prototype')
+        
+        if prototype is None:
+            prototype = super().get_fields()
+            serializer_class._fields_prototype = prototype
+        
+        return copy.deepcopy(prototype)
+    
+    def to_representation(self, instance):
+        """Converte i percorsi dei file in URL complete"""
+        ret = super().to_representation(instance)
+        
+        for field_name in self.file_fields:
+            file_value = ret.get(field_name)
+            if file_value and not file_value.startswith('http'):
+                ret[field_name] = settings.MEDIA_URL + file_value
+        
+        return ret
+
+
+# Limite massimo per ?chunk_size= dell'endpoint bulk
+BULK_MAX_CHUNK_SIZE = 10000
+
+
+class _PreloadedQuerySet:
+    """
+    Sostituisce il queryset dei campi relazionali durante la validazione bulk:
+    i record collegati di un blocco vengono caricati con una query sola
+    """
+    
+    def __init__(self, model, objects):
+        self.model = model
+        self.objects = objects
+    
+    def get(self, pk):
+        try:
+            pk = self.model._meta.pk.to_python(pk)
+        except DjangoValidationError:
+            raise ValueError(pk)
+        
+        try:
+            return self.objects[pk]
+        except KeyError:
+            raise self.model.DoesNotExist
+
+
+# Cache delle classi serializer: (classe modello, versione schema, campi, expand) -> classe serializer
+_serializer_class_cache = {}
+# Le combinazioni di ?fields= sono potenzialmente molte: oltre il limite la cache si svuota
+SERIALIZER_CACHE_LIMIT = 512
+
+
+def _invalidate_serializer_classes(meta_model_name=None):
+    if meta_model_name is None:
+        _serializer_class_cache.clear()
+        return
+    
+    # Le classi con ?expand= contengono i serializer dei modelli collegati
+    for key in [key for key in _serializer_class_cache if key[0].__name__ == meta_model_name or key[3]]:
+        _serializer_class_cache.pop(key, None)
+
+
+dynamic_model_manager.register_cache_invalidator(_invalidate_serializer_classes)
+
+
+def get_dynamic_serializer_class(model_class, schema_version, fields=None, expand=None):
+    """
+    Restituisce la classe serializer per un modello dinamico, costruendola
+    solo la prima volta per ogni combinazione (classe, versione dello schema, campi, expand)
+    
+    Args:
+        model_class: Classe del modello dinamico
+        schema_version: Versione dello schema del MetaModel
+        fields: Tupla opzionale dei campi da serializzare (None = tutti)
+        expand: Tupla opzionale dei percorsi da incorporare (da query_planner.parse_expand)
+    """
+    key = (model_class, schema_version, fields, expand)
+    serializer_class = _serializer_class_cache.get(key)
+    
+    if serializer_class is None:
+        meta_class = type('Meta', (), {
+            'model': model_class,
+            'fields': list(fields) if fields else '__all__'
+        })
+        
+        serializer_class = type(
+            f'{model_class.__name__}Serializer',
+            (DynamicModelSerializer,),
+            {
+                'Meta': meta_class,
+                'file_fields': tuple(
+                    field.name for field in model_class._meta.concrete_fields
+                    if isinstance(field, models.FileField)
+                ),
+                **_get_expanded_fields(model_class, expand),
+            }
+        )
+        if len(_serializer_class_cache) >= SERIALIZER_CACHE_LIMIT:
+            _serializer_class_cache.clear()
+        _serializer_class_cache[key] = serializer_class
+    
+    return serializer_class
+
+
+def _get_expanded_fields(model_class, expand):
+    """
+    Serializer annidati (sola lettura) per le relazioni di primo livello di expand;
+    i percorsi più profondi vengono passati al serializer del modello collegato
+    """
+    declared_fields = {}
+    
+    for path in expand or ():
+        if '.' in path:
+            continue
+        
+        nested_expand = tuple(
+            nested_path.split('.', 1)[1] for nested_path in expand
+            if nested_path.startswith(path + '.')
+        )
+        field = model_class._meta.get_field(path)
+        related_model = field.related_model
+        related_schema_version = resolve_dynamic_model(related_model.__name__)['meta_model'].schema_version
+        
+        nested_class = get_dynamic_serializer_class(
+            related_model, related_schema_version, None, nested_expand or None
+        )
+        declared_fields[path] = nested_class(many=field.many_to_many, read_only=True)
+    
+    return declared_fields
+
+
+# Documento dello schema precalcolato: versione dello schema -> documento
+_schema_document_cache = {}
+
+
+def _invalidate_schema_document(meta_model_name=None):
+    _schema_document_cache.clear()
+
+
+dynamic_model_manager.register_cache_invalidator(_invalidate_schema_document)
 
 
 class MetaModelSerializer(serializers.ModelSerializer):
@@ -14,25 +262,33 @@ class MetaModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = MetaModel
         fields = ['id', 'name', 'table_name', 'description', 'is_active', 
-                  'meta_fields', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+                  'indexes', 'fulltext_search', 'meta_fields', 'schema_version', 'created_at', 'updated_at']
+        read_only_fields = ['schema_version', 'created_at', 'updated_at']
     
     def get_meta_fields(self, obj):
         return MetaFieldSerializer(obj.fields.all(), many=True).data
+    
+    def validate_indexes(self, value):
+        try:
+            MetaModel(indexes=value).clean()
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.message_dict['indexes'])
+        return value
 
 
 class MetaFieldSerializer(serializers.ModelSerializer):
     class Meta:
         model = MetaField
         fields = ['id', 'name', 'field_type', 'verbose_name', 'help_text',
-                  'required', 'unique', 'default_value', 'field_params', 'order']
+                  'required', 'unique', 'db_index', 'default_value', 'field_params', 'order']
 
 
 class MetaModelViewSet(viewsets.ModelViewSet):
     """
     ViewSet per gestire i MetaModel (definizioni dei modelli)
     """
-    queryset = MetaModel.objects.all()
+    # I campi vengono caricati con una sola query aggiuntiva per tutta la pagina
+    queryset = MetaModel.objects.prefetch_related('fields')
     serializer_class = MetaModelSerializer
     
     def get_permissions(self):
@@ -48,6 +304,53 @@ class MetaModelViewSet(viewsets.ModelViewSet):
         
         return [permission() for permission in permission_classes]
     
+    @staticmethod
+    def _schema_resource_key(request):
+        """
+        Impronta della risorsa richiesta (percorso e query string normalizzata):
+        list, pagine diverse, retrieve e schema non devono condividere lo stesso ETag
+        """
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        resource = f'{request.path}?{query}'
+        return hashlib.sha1(resource.encode('utf-8')).hexdigest()[:16]
+    
+    def _schema_conditional_response(self, request, build_response):
+        """
+        Gestisce le richieste condizionali (If-None-Match / If-Modified-Since)
+        usando la versione globale dello schema: se il client ha già la versione
+        corrente risponde 304 senza serializzare nulla.
+        
+        Args:
+            build_response: Funzione senza argomenti che costruisce la risposta completa
+        """
+        version, updated_at = SchemaState.get_state()
+        etag = f'"schema-v{version}-{request.accepted_renderer.format}-{self._schema_resource_key(request)}"'
+        last_modified = int(updated_at.timestamp()) if updated_at else None
+        
+        response = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = build_response()
+        
+        if 200 <= response.status_code < 300 or response.status_code == 304:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # Il client deve sempre rivalidare: la risposta cambia ad ogni modifica dello schema
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Accept', 'Authorization', 'Cookie'])
+        
+        return response
+    
+    def list(self, request, *args, **kwargs):
+        return self._schema_conditional_response(
+            request, lambda: super(MetaModelViewSet, self).list(request, *args, **kwargs)
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self._schema_conditional_response(
+            request, lambda: super(MetaModelViewSet, self).retrieve(request, *args, **kwargs)
+        )
+    
     @action(detail=True, methods=['post'])
     def create_table(self, request, pk=None):
         """
@@ -119,6 +422,19 @@ class MetaModelViewSet(viewsets.ModelViewSet):
         
         GET /api/meta-models/schema/
         """
+        return self._schema_conditional_response(request, self._schema_response)
+    
+    def _schema_response(self):
+        document = _schema_document_cache.get(dynamic_model_manager.schema_version)
+        if document is None:
+            document = self._build_schema_document()
+            _schema_document_cache.clear()
+            _schema_document_cache[dynamic_model_manager.schema_version] = document
+        
+        return Response(document)
+    
+    def _build_schema_document(self):
+        """Costruisce il documento dello schema (2 query: modelli attivi + campi)"""
         active_models = self.queryset.filter(is_active=True)
         schema = {}
         
@@ -126,6 +442,8 @@ class MetaModelViewSet(viewsets.ModelViewSet):
             schema[meta_model.name] = {
                 'table_name': meta_model.table_name,
                 'description': meta_model.description,
+                'indexes': meta_model.indexes,
+                'fulltext_search': meta_model.fulltext_search,
                 'api_endpoints': {
                     'list': f'/api/data/{meta_model.name}/',
                     'detail': f'/api/data/{meta_model.name}/{{id}}/',
@@ -136,6 +454,7 @@ class MetaModelViewSet(viewsets.ModelViewSet):
                         'type': field.field_type,
                         'required': field.required,
                         'unique': field.unique,
+                        'db_index': field.db_index,
                         'verbose_name': field.verbose_name or field.name,
                         'help_text': field.help_text,
                         'default_value': field.default_value,
@@ -145,20 +464,21 @@ class MetaModelViewSet(viewsets.ModelViewSet):
                 }
             }
         
-        return Response({
+        return {
             'models': schema,
             'endpoints': {
                 'meta_models': '/api/meta-models/',
                 'schema': '/api/meta-models/schema/',
             }
-        })
+        }
 
 
 class DynamicModelViewSet(viewsets.ModelViewSet):
     """
     ViewSet generico per gestire i dati dei modelli dinamici
     """
-    parser_classes = [MultiPartParser, FormParser, JSONParser]  # Supporto per file upload
+    parser_classes = [MultiPartParser, FormParser, JSONParser, NDJSONParser]  # Supporto per file upload
+    pagination_class = DynamicPageNumberPagination
     
     def get_permissions(self):
         """
@@ -177,6 +497,7 @@ class DynamicModelViewSet(viewsets.ModelViewSet):
         super().__init__(*args, **kwargs)
         self.meta_model = None
         self.model_class = None
+        self.resolution = None
     
     def initial(self, request, *args, **kwargs):
         """
@@ -189,8 +510,9 @@ class DynamicModelViewSet(viewsets.ModelViewSet):
         
         if model_name:
             try:
-                self.meta_model = MetaModel.objects.get(name=model_name, is_active=True)
-                self.model_class = dynamic_model_manager.get_model(model_name)
+                self.resolution = resolve_dynamic_model(model_name)
+                self.meta_model = self.resolution['meta_model']
+                self.model_class = self.resolution['model_class']
                 
                 if not self.model_class:
                     raise ValueError(f"Modello '{model_name}' non caricato")
@@ -198,65 +520,438 @@ class DynamicModelViewSet(viewsets.ModelViewSet):
             except MetaModel.DoesNotExist:
                 raise serializers.ValidationError(f"MetaModel '{model_name}' non trovato")
     
+    @property
+    def paginator(self):
+        """
+        Usa la paginazione a cursore se richiesta (?cursor=, ?pagination=cursor
+        o DYNAMIC_MODELS_CURSOR_PAGINATION), altrimenti quella per numero di pagina
+        con i conteggi mantenuti (DynamicPageNumberPagination)
+        """
+        if not hasattr(self, '_paginator'):
+            if use_cursor_pagination(self.request):
+                self._paginator = DynamicCursorPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+    
     def get_queryset(self):
         """Restituisce il queryset del modello dinamico"""
         if self.model_class:
-            return self.model_class.objects.all()
+            queryset = self.model_class.objects.all()
+            
+            requested_fields = self.get_requested_fields()
+            if requested_fields:
+                # Carica solo le colonne richieste (le M2M non sono colonne della tabella)
+                columns = [
+                    name for name in requested_fields
+                    if not self.model_class._meta.get_field(name).many_to_many
+                ]
+                queryset = queryset.only(*columns)
+            
+            if self.action in ['list', 'retrieve']:
+                # Molti a molti con una query per relazione e per pagina; le foreign key
+                # sono serializzate come id (<campo>_id) e non richiedono JOIN
+                plan = get_relation_plan(
+                    self.model_class, self.resolution['fields'],
+                    self.meta_model.schema_version, requested_fields
+                )
+                queryset = apply_relation_plan(queryset, plan, select_related=False)
+                
+                # Relazioni incorporate con ?expand=: JOIN e prefetch a blocchi per pagina
+                expand = self.get_expand()
+                if expand:
+                    queryset = apply_relation_plan(
+                        queryset, get_expand_plan(self.model_class, self.meta_model.schema_version, expand)
+                    )
+            
+            return self.apply_filters(queryset)
         return Model.objects.none()
     
+    def apply_filters(self, queryset):
+        """
+        Applica i filtri (?campo__op=valore, ?filter=<json>) e l'ordinamento (?ordering=)
+        compilati dal linguaggio di query in query_dsl.py, e la ricerca testuale (?search=)
+        """
+        field_types = self.resolution['field_types']
+        params = self.request.query_params
+        
+        try:
+            q_object, uses_many_to_many = compile_filters(
+                self.model_class, field_types, params, self.meta_model.schema_version
+            )
+            # Con la paginazione a cursore l'ordinamento è gestito dal paginator
+            ordering = [] if isinstance(self.paginator, DynamicCursorPagination) else compile_ordering(
+                self.model_class, field_types, params.get('ordering')
+            )
+        except QueryDSLError as e:
+            raise serializers.ValidationError({'filter': str(e)})
+        
+        if q_object:
+            queryset = queryset.filter(q_object)
+            if uses_many_to_many:
+                queryset = queryset.distinct()
+        
+        # Ricerca testuale: ordinata per rilevanza se non è richiesto un altro ordinamento
+        search_query = params.get('search')
+        if search_query:
+            queryset = apply_search(
+                queryset, self.meta_model, self.model_class, search_query, self.resolution['fields']
+            )
+        
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        
+        return queryset
+    
+    def get_requested_fields(self):
+        """
+        Restituisce la tupla dei campi richiesti con ?fields=a,b o ?exclude=c,
+        valida solo in lettura (None = tutti i campi). La chiave primaria è sempre inclusa.
+        """
+        if hasattr(self, '_requested_fields'):
+            return self._requested_fields
+        
+        self._requested_fields = None
+        
+        fields_param = self.request.query_params.get('fields')
+        exclude_param = self.request.query_params.get('exclude')
+        
+        if self.action not in ['list', 'retrieve'] or not (fields_param or exclude_param):
+            return None
+        
+        opts = self.model_class._meta
+        available = [field.name for field in opts.concrete_fields] + [field.name for field in opts.many_to_many]
+        
+        requested = [name.strip() for name in (fields_param or '').split(',') if name.strip()]
+        excluded = [name.strip() for name in (exclude_param or '').split(',') if name.strip()]
+        
+        unknown = [name for name in requested + excluded if name not in available]
+        if unknown:
+            raise serializers.ValidationError({
+                'fields': f"Campi non validi per {opts.object_name}: {', '.join(unknown)}"
+            })
+        
+        selected = [name for name in (requested or available) if name not in excluded]
+        pk_name = opts.pk.name
+        if pk_name not in selected:
+            selected.insert(0, pk_name)
+        
+        self._requested_fields = tuple(selected)
+        return self._requested_fields
+    
+    def get_expand(self):
+        """
+        Restituisce la tupla dei percorsi di ?expand=a,b.c da incorporare nella
+        risposta, valida solo in lettura (None = nessuno). La profondità massima
+        è DYNAMIC_MODELS_MAX_EXPAND_DEPTH.
+        """
+        if hasattr(self, '_expand'):
+            return self._expand
+        
+        self._expand = None
+        
+        expand_param = self.request.query_params.get('expand')
+        if self.action not in ['list', 'retrieve'] or not expand_param:
+            return None
+        
+        try:
+            expand = parse_expand(self.model_class, expand_param)
+        except ExpandError as e:
+            raise serializers.ValidationError({'expand': str(e)})
+        
+        requested_fields = self.get_requested_fields()
+        if requested_fields:
+            missing = [path for path in expand if '.' not in path and path not in requested_fields]
+            if missing:
+                raise serializers.ValidationError({
+                    'expand': f"Campi non inclusi in ?fields=: {', '.join(missing)}"
+                })
+        
+        self._expand = expand or None
+        return self._expand
+    
     def get_serializer_class(self):
-        """Crea dinamicamente un serializer per il modello"""
+        """Restituisce il serializer (in cache) per il modello dinamico"""
         if not self.model_class:
             return serializers.Serializer
         
-        # Controlla se ci sono campi file/image nel modello
-        has_file_fields = False
-        if self.meta_model:
-            has_file_fields = any(field.field_type in ['file', 'image'] 
-                                for field in self.meta_model.fields.all())
+        return get_dynamic_serializer_class(
+            self.model_class,
+            self.meta_model.schema_version,
+            self.get_requested_fields(),
+            self.get_expand()
+        )
+    
+    def get_serializer(self, *args, **kwargs):
+        """Override per gestire validazione dei campi"""
+        serializer_class = self.get_serializer_class()
+        kwargs.setdefault('context', self.get_serializer_context())
+        return serializer_class(*args, **kwargs)
+    
+    def bulk(self, request, *args, **kwargs):
+        """
+        Crea, aggiorna o fa upsert di molti record con una sola richiesta
+        
+        Il corpo è una lista JSON o NDJSON di oggetti. Le righe con la chiave primaria
+        aggiornano il record esistente (bulk_update), le altre vengono create (bulk_create).
+        Con ?upsert_on=<campo unique> le righe senza chiave primaria aggiornano il record
+        con lo stesso valore del campo invece di fallire.
         
-        # Crea un serializer dinamico
-        meta_class = type('Meta', (), {
-            'model': self.model_class,
-            'fields': '__all__'
-        })
+        Le righe vengono validate e scritte a blocchi (?chunk_size= o
+        DYNAMIC_MODELS_BULK_CHUNK_SIZE), ogni blocco nella propria transazione.
+        Gli errori sono restituiti per riga: {"index": <posizione>, "errors": {...}}.
+        """
+        rows = request.data
+        if not isinstance(rows, list):
+            raise serializers.ValidationError({
+                'non_field_errors': ['Il corpo deve essere una lista di oggetti (JSON o NDJSON)']
+            })
         
-        serializer_attrs = {'Meta': meta_class}
+        chunk_size = self.get_bulk_chunk_size()
+        upsert_on = self.get_upsert_field()
+        result = {'created': 0, 'updated': 0, 'errors': []}
         
-        # Se ci sono campi file, aggiungi metodi per gestirli correttamente
-        if has_file_fields:
-            def to_representation(self, instance):
-                """Override per gestire la rappresentazione dei file"""
-                ret = super(type(self), self).to_representation(instance)
-                
-                # Converti i percorsi dei file in URL complete
-                from django.conf import settings
-                from django.utils.html import format_html
+        for start in range(0, len(rows), chunk_size):
+            self._bulk_write_chunk(rows[start:start + chunk_size], start, upsert_on, result)
+        
+        result['chunk_size'] = chunk_size
+        
+        if not result['errors']:
+            response_status = status.HTTP_200_OK
+        elif result['created'] or result['updated']:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        
+        return Response(result, status=response_status)
+    
+    def get_bulk_chunk_size(self):
+        """Dimensione dei blocchi: ?chunk_size= oppure DYNAMIC_MODELS_BULK_CHUNK_SIZE"""
+        default = getattr(settings, 'DYNAMIC_MODELS_BULK_CHUNK_SIZE', 1000)
+        raw_value = self.request.query_params.get('chunk_size')
+        
+        if not raw_value:
+            return default
+        
+        try:
+            chunk_size = int(raw_value)
+        except ValueError:
+            chunk_size = 0
+        if chunk_size <= 0:
+            raise serializers.ValidationError({'chunk_size': 'Deve essere un intero positivo'})
+        
+        return min(chunk_size, BULK_MAX_CHUNK_SIZE)
+    
+    def get_upsert_field(self):
+        """Valida ?upsert_on=: deve essere un campo unique del modello"""
+        field_name = self.request.query_params.get('upsert_on')
+        if not field_name:
+            return None
+        
+        unique_fields = [
+            field.name for field in self.model_class._meta.concrete_fields
+            if field.unique and not field.primary_key
+        ]
+        if field_name not in unique_fields:
+            raise serializers.ValidationError({
+                'upsert_on': f"'{field_name}' non è un campo unique di {self.model_class.__name__}. "
+                             f"Campi validi: {', '.join(unique_fields) or 'nessuno'}"
+            })
+        
+        return field_name
+    
+    def _get_bulk_serializers(self):
+        """
+        Restituisce i serializer (creazione, aggiornamento parziale) riusati per tutte le righe.
+        L'unicità viene verificata con una query per blocco invece che una per riga.
+        """
+        if not hasattr(self, '_bulk_serializers'):
+            create_serializer = self.get_serializer()
+            update_serializer = self.get_serializer(partial=True)
+            
+            for serializer in (create_serializer, update_serializer):
+                for field in serializer.fields.values():
+                    field.validators = [
+                        validator for validator in field.validators
+                        if not isinstance(validator, UniqueValidator)
+                    ]
+            
+            self._bulk_serializers = (create_serializer, update_serializer)
+        
+        return self._bulk_serializers
+    
+    def _bulk_write_chunk(self, rows, offset, upsert_on, result):
+        """Valida e scrive un blocco di righe, accumulando conteggi ed errori in result"""
+        opts = self.model_class._meta
+        pk_field = opts.pk
+        m2m_names = {field.name for field in opts.many_to_many}
+        create_serializer, update_serializer = self._get_bulk_serializers()
+        self._preload_related(rows, (create_serializer, update_serializer))
+        
+        errors = {}
+        creates = []  # (indice, istanza, valori m2m)
+        updates = []
+        update_fields = set()
+        
+        # Record da aggiornare: una sola query per blocco
+        row_ids = {}
+        for index, row in enumerate(rows):
+            if isinstance(row, dict) and row.get(pk_field.name) not in (None, ''):
+                try:
+                    row_ids[index] = pk_field.to_python(row[pk_field.name])
+                except DjangoValidationError as e:
+                    errors[index] = {pk_field.name: e.messages}
+        existing = self.model_class.objects.in_bulk(set(row_ids.values())) if row_ids else {}
+        
+        for index, row in enumerate(rows):
+            if index in errors:
+                continue
+            if not isinstance(row, dict):
+                errors[index] = {'non_field_errors': ['Ogni riga deve essere un oggetto']}
+                continue
+            
+            is_update = index in row_ids
+            if is_update and row_ids[index] not in existing:
+                errors[index] = {pk_field.name: [f"Record {row_ids[index]} non trovato"]}
+                continue
+            
+            serializer = update_serializer if is_update else create_serializer
+            try:
+                validated_data = serializer.run_validation(row)
+            except serializers.ValidationError as e:
+                errors[index] = e.detail
+                continue
+            
+            m2m_values = {name: validated_data.pop(name) for name in m2m_names if name in validated_data}
+            
+            if is_update:
+                instance = existing[row_ids[index]]
+                for name, value in validated_data.items():
+                    setattr(instance, name, value)
+                update_fields.update(validated_data)
+                updates.append((index, instance, m2m_values))
+            else:
+                creates.append((index, self.model_class(**validated_data), m2m_values))
+        
+        self._check_bulk_uniqueness(creates, updates, upsert_on, errors)
+        creates = [item for item in creates if item[0] not in errors]
+        updates = [item for item in updates if item[0] not in errors]
+        
+        try:
+            with transaction.atomic():
+                created, upserted = self._bulk_save(creates, upsert_on)
                 
-                for field in self.Meta.model._meta.get_fields():
-                    if hasattr(field, 'upload_to') and field.name in ret:
-                        file_value = ret[field.name]
-                        if file_value:
-                            if not file_value.startswith('http'):
-                                ret[field.name] = settings.MEDIA_URL + file_value
+                if updates:
+                    self.model_class.objects.bulk_update(
+                        [instance for _, instance, _ in updates], sorted(update_fields)
+                    )
                 
-                return ret
+                for _, instance, m2m_values in creates + updates:
+                    for name, value in m2m_values.items():
+                        if instance.pk is not None:
+                            getattr(instance, name).set(value)
+        
+        except DatabaseError as e:
+            for index, _, _ in creates + updates:
+                errors[index] = {'non_field_errors': [f"Errore del database nel blocco: {e}"]}
+        else:
+            result['created'] += created
+            result['updated'] += upserted + len(updates)
+        
+        result['errors'].extend(
+            {'index': offset + index, 'errors': errors[index]} for index in sorted(errors)
+        )
+    
+    def _preload_related(self, rows, bulk_serializers):
+        """Carica con una query per campo i record collegati referenziati dal blocco"""
+        for field in self.model_class._meta.get_fields():
+            if not field.concrete or not field.is_relation:
+                continue
+            
+            related_model = field.related_model
+            keys = set()
+            for row in rows:
+                value = row.get(field.name) if isinstance(row, dict) else None
+                for key in (value if isinstance(value, list) else [value]):
+                    try:
+                        key = related_model._meta.pk.to_python(key)
+                    except (DjangoValidationError, TypeError):
+                        continue
+                    if key is not None and not isinstance(key, (dict, list)):
+                        keys.add(key)
             
-            serializer_attrs['to_representation'] = to_representation
+            queryset = _PreloadedQuerySet(related_model, related_model._default_manager.in_bulk(keys) if keys else {})
+            for serializer in bulk_serializers:
+                serializer_field = serializer.fields.get(field.name)
+                serializer_field = getattr(serializer_field, 'child_relation', serializer_field)
+                if isinstance(serializer_field, serializers.PrimaryKeyRelatedField):
+                    serializer_field.queryset = queryset
+    
+    def _bulk_save(self, creates, upsert_on):
+        """Esegue bulk_create (o l'upsert) e restituisce (creati, aggiornati)"""
+        if not creates:
+            return 0, 0
         
-        serializer_class = type(
-            f'{self.model_class.__name__}Serializer',
-            (serializers.ModelSerializer,),
-            serializer_attrs
+        instances = [instance for _, instance, _ in creates]
+        
+        if not upsert_on:
+            self.model_class.objects.bulk_create(instances)
+            return len(instances), 0
+        
+        keys = [getattr(instance, upsert_on) for instance in instances]
+        already_present = set(
+            self.model_class.objects.filter(**{f'{upsert_on}__in': keys}).values_list(upsert_on, flat=True)
         )
         
-        return serializer_class
+        update_fields = [
+            field.name for field in self.model_class._meta.concrete_fields
+            if not field.primary_key and field.name != upsert_on
+        ]
+        if update_fields:
+            self.model_class.objects.bulk_create(
+                instances, update_conflicts=True, unique_fields=[upsert_on], update_fields=update_fields
+            )
+        else:
+            self.model_class.objects.bulk_create(instances, ignore_conflicts=True)
+        
+        upserted = sum(1 for key in keys if key in already_present)
+        return len(instances) - upserted, upserted
     
-    def get_serializer(self, *args, **kwargs):
-        """Override per gestire validazione dei campi"""
-        serializer_class = self.get_serializer_class()
-        kwargs.setdefault('context', self.get_serializer_context())
-        return serializer_class(*args, **kwargs)
+    def _check_bulk_uniqueness(self, creates, updates, upsert_on, errors):
+        """
+        Verifica i campi unique del blocco: duplicati nel blocco stesso e valori
+        già presenti nel database (una query per campo)
+        """
+        unique_fields = [
+            field for field in self.model_class._meta.concrete_fields
+            if field.unique and not field.primary_key
+        ]
+        
+        for field in unique_fields:
+            seen = {}
+            for index, instance, _ in creates + updates:
+                if index in errors:
+                    continue
+                value = getattr(instance, field.attname)
+                if value is None:
+                    continue
+                if value in seen:
+                    errors[index] = {field.name: [f"Valore duplicato nel blocco (riga {seen[value]})"]}
+                else:
+                    seen[value] = index
+            
+            # Con l'upsert i valori esistenti del campo chiave sono attesi
+            if field.name == upsert_on or not seen:
+                continue
+            
+            taken = dict(
+                self.model_class.objects.filter(**{f'{field.attname}__in': list(seen)})
+                .values_list(field.attname, 'pk')
+            )
+            for index, instance, _ in creates + updates:
+                value = getattr(instance, field.attname)
+                if index not in errors and value in taken and taken[value] != instance.pk:
+                    errors[index] = {field.name: [f"Esiste già un record con {field.name}={value}"]}
 
 
 # Factory function per creare viewset per modello specifico
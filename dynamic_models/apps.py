@@ -13,6 +13,7 @@ class DynamicModelsConfig(AppConfig):
         """
         # Import qui per evitare circular imports
         from .dynamic_manager import dynamic_model_manager
+        from . import signals  # noqa: F401 - registra i receiver del versioning dello schema
         
         # Carica tutti i modelli dinamici all'avvio
         try:
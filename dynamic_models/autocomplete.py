@@ -0,0 +1,151 @@
+"""
+Autocompletamento per i campi relazionali dei form dei dati.
+
+I widget select2 dell'admin non elencano il modello di destinazione nella pagina:
+al render risolvono solo le righe selezionate e le altre scelte vengono chieste
+all'endpoint data/<id>/autocomplete/<campo>/ mentre si digita, a pagine di
+AUTOCOMPLETE_PAGE_SIZE righe (LIMIT/OFFSET sulla chiave primaria, nessun COUNT).
+"""
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteMixin
+from django import forms
+from django.urls import reverse
+
+from .dynamic_manager import dynamic_model_manager
+from .fulltext import apply_search, get_searchable_fields
+
+
+RELATIONAL_FIELD_TYPES = ['foreign_key', 'one_to_one', 'many_to_many']
+
+AUTOCOMPLETE_PAGE_SIZE = 20
+
+
+class DynamicAutocompleteMixin(AutocompleteMixin):
+    """
+    AutocompleteMixin che interroga l'endpoint dei modelli dinamici invece della
+    vista autocomplete dell'admin (che richiede il modello registrato nell'admin)
+    """
+    
+    def __init__(self, field, url, attrs=None, choices=(), using=None):
+        super().__init__(field, admin.site, attrs=attrs, choices=choices, using=using)
+        self.url = url
+    
+    def get_url(self):
+        return self.url
+
+
+class DynamicAutocompleteSelect(DynamicAutocompleteMixin, forms.Select):
+    pass
+
+
+class DynamicAutocompleteSelectMultiple(DynamicAutocompleteMixin, forms.SelectMultiple):
+    pass
+
+
+def get_target_meta_model(related_model):
+    """MetaModel del modello di destinazione (None se non è un modello dinamico)"""
+    from .models import MetaModel
+    
+    if related_model._meta.app_label != 'dynamic_models':
+        return None
+    return MetaModel.objects.filter(name=related_model.__name__, is_active=True).first()
+
+
+def get_label_function(target_meta_model):
+    """
+    Etichetta delle scelte: "<Modello> #<id> · <primo campo di testo>" per i modelli
+    dinamici (il solo "#id" non basta a riconoscere un record), str() per gli altri
+    """
+    label_fields = get_searchable_fields(target_meta_model.fields.all()) if target_meta_model else []
+    if not label_fields:
+        return str
+    
+    label_field = label_fields[0].name
+    
+    def label_from_instance(obj):
+        value = getattr(obj, label_field, None)
+        return f"{obj} · {value}" if value else str(obj)
+    
+    return label_from_instance
+
+
+def create_autocomplete_field(meta_model, meta_field, django_field, **kwargs):
+    """
+    Crea il campo form per una relazione: ModelChoiceField o ModelMultipleChoiceField
+    con widget di autocompletamento. Il queryset resta non valutato: viene usato solo
+    per risolvere i valori selezionati (render) e inviati (validazione).
+    """
+    related_model = django_field.related_model
+    url = reverse('dynamic_data_autocomplete', args=[meta_model.pk, meta_field.name])
+    
+    if meta_field.field_type == 'many_to_many':
+        field_class, widget_class = forms.ModelMultipleChoiceField, DynamicAutocompleteSelectMultiple
+    else:
+        field_class, widget_class = forms.ModelChoiceField, DynamicAutocompleteSelect
+    
+    form_field = field_class(
+        queryset=related_model._default_manager.all(),
+        widget=widget_class(django_field, url),
+        **kwargs
+    )
+    form_field.label_from_instance = get_label_function(get_target_meta_model(related_model))
+    return form_field
+
+
+def search_related(request, related_model, target_meta_model, term):
+    """
+    Queryset delle scelte che corrispondono al termine cercato.
+    
+    Un numero (anche "#123") cerca per chiave primaria; il testo usa la ricerca del
+    modello di destinazione: indice full-text se attivo, altrimenti icontains sui
+    campi di testo. I modelli Django usano i search_fields del loro ModelAdmin.
+    """
+    queryset = related_model._default_manager.order_by('pk')
+    term = term.strip()
+    
+    if not term:
+        return queryset
+    
+    if term.lstrip('#').isdigit():
+        return queryset.filter(pk=int(term.lstrip('#')))
+    
+    if target_meta_model is not None:
+        return apply_search(queryset, target_meta_model, related_model, term)
+    
+    model_admin = admin.site._registry.get(related_model)
+    if model_admin is not None and model_admin.get_search_fields(request):
+        queryset, may_have_duplicates = model_admin.get_search_results(request, queryset, term)
+        return queryset.distinct() if may_have_duplicates else queryset
+    
+    return queryset.none()
+
+
+def get_autocomplete_results(request, meta_model, meta_field):
+    """
+    Una pagina di scelte nel formato atteso da select2:
+    {"results": [{"id": ..., "text": ...}], "pagination": {"more": bool}}
+    
+    Legge AUTOCOMPLETE_PAGE_SIZE + 1 righe: quella in più indica se esiste
+    una pagina successiva, senza contare le righe.
+    """
+    model_class = dynamic_model_manager.get_model(meta_model.name)
+    related_model = model_class._meta.get_field(meta_field.name).related_model
+    target_meta_model = get_target_meta_model(related_model)
+    
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except (TypeError, ValueError):
+        page = 1
+    
+    queryset = search_related(request, related_model, target_meta_model, request.GET.get('term', ''))
+    offset = (page - 1) * AUTOCOMPLETE_PAGE_SIZE
+    rows = list(queryset[offset:offset + AUTOCOMPLETE_PAGE_SIZE + 1])
+    label_from_instance = get_label_function(target_meta_model)
+    
+    return {
+        'results': [
+            {'id': str(obj.pk), 'text': label_from_instance(obj)}
+            for obj in rows[:AUTOCOMPLETE_PAGE_SIZE]
+        ],
+        'pagination': {'more': len(rows) > AUTOCOMPLETE_PAGE_SIZE},
+    }
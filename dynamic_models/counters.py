@@ -0,0 +1,196 @@
+"""
+Conteggio delle righe dei modelli dinamici senza COUNT(*) ad ogni richiesta.
+
+- Conteggio mantenuto: per ogni tabella una riga di TableRowCount aggiornata da
+  trigger su INSERT e DELETE (SQLite: trigger per riga; PostgreSQL: trigger per
+  istruzione con transition table, quindi un solo aggiornamento per bulk_create).
+  I trigger vengono installati da create_table/update_table; le tabelle senza
+  contatore (es. create prima di questa funzione) ripiegano su COUNT(*) fino al
+  primo Aggiorna Tabella.
+- Conteggio approssimato per i queryset filtrati, attivo con
+  DYNAMIC_MODELS_APPROXIMATE_COUNT_THRESHOLD = N: il conteggio è esatto fino a N
+  righe (al massimo N righe lette), oltre è la stima del planner su PostgreSQL
+  oppure N come limite inferiore ("più di N").
+"""
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import TableRowCount
+
+
+COUNTED_VENDORS = ['sqlite', 'postgresql']
+
+_POSTGRES_FUNCTION = 'dynamic_models_count_rows'
+
+
+def _trigger_names(table_name):
+    return [f'{table_name}_rowcount_{suffix}' for suffix in ('ai', 'ad', 'at')]
+
+
+def _literal(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _create_sqlite_triggers(cursor, table_name):
+    qn = connection.ops.quote_name
+    counter_table = qn(TableRowCount._meta.db_table)
+    insert_name, delete_name, _ = _trigger_names(table_name)
+    
+    for name in _trigger_names(table_name):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {qn(name)}")
+    
+    for name, event, delta in [(insert_name, 'INSERT', '+ 1'), (delete_name, 'DELETE', '- 1')]:
+        cursor.execute(
+            f"CREATE TRIGGER {qn(name)} AFTER {event} ON {qn(table_name)} BEGIN "
+            f"UPDATE {counter_table} SET row_count = row_count {delta} "
+            f"WHERE table_name = {_literal(table_name)}; "
+            f"END"
+        )
+
+
+def _create_postgres_triggers(cursor, table_name):
+    qn = connection.ops.quote_name
+    counter_table = qn(TableRowCount._meta.db_table)
+    insert_name, delete_name, truncate_name = _trigger_names(table_name)
+    
+    # Una funzione per tutte le tabelle: la riga del contatore è individuata da TG_TABLE_NAME
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION {_POSTGRES_FUNCTION}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE {counter_table} SET row_count = row_count + (SELECT count(*) FROM new_rows)
+                WHERE table_name = TG_TABLE_NAME;
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE {counter_table} SET row_count = row_count - (SELECT count(*) FROM old_rows)
+                WHERE table_name = TG_TABLE_NAME;
+            ELSE
+                UPDATE {counter_table} SET row_count = 0 WHERE table_name = TG_TABLE_NAME;
+            END IF;
+            RETURN NULL;
+        END;
+        $$
+    """)
+    
+    for name in _trigger_names(table_name):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {qn(name)} ON {qn(table_name)}")
+    
+    cursor.execute(
+        f"CREATE TRIGGER {qn(insert_name)} AFTER INSERT ON {qn(table_name)} "
+        f"REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {_POSTGRES_FUNCTION}()"
+    )
+    cursor.execute(
+        f"CREATE TRIGGER {qn(delete_name)} AFTER DELETE ON {qn(table_name)} "
+        f"REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION {_POSTGRES_FUNCTION}()"
+    )
+    cursor.execute(
+        f"CREATE TRIGGER {qn(truncate_name)} AFTER TRUNCATE ON {qn(table_name)} "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION {_POSTGRES_FUNCTION}()"
+    )
+
+
+def install_row_counter(model_class):
+    """
+    Ricalcola il contatore della tabella e (ri)crea i trigger che lo mantengono.
+    Viene chiamata da create_table/update_table: su SQLite alcune modifiche di schema
+    ricreano la tabella, e con essa i suoi trigger.
+    
+    Returns:
+        Numero di righe della tabella (None se il database non è supportato)
+    """
+    if connection.vendor not in COUNTED_VENDORS:
+        return None
+    
+    table_name = model_class._meta.db_table
+    qn = connection.ops.quote_name
+    
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Blocca le scritture tra il conteggio e l'installazione dei trigger
+            cursor.execute(f"LOCK TABLE {qn(table_name)} IN SHARE MODE")
+            _create_postgres_triggers(cursor, table_name)
+        else:
+            _create_sqlite_triggers(cursor, table_name)
+        
+        cursor.execute(f"SELECT COUNT(*) FROM {qn(table_name)}")
+        row_count = cursor.fetchone()[0]
+        
+        TableRowCount.objects.update_or_create(table_name=table_name, defaults={'row_count': row_count})
+    
+    return row_count
+
+
+def drop_row_counter(model_class):
+    """Rimuove il contatore di una tabella (i trigger vengono eliminati con la tabella)"""
+    TableRowCount.objects.filter(table_name=model_class._meta.db_table).delete()
+
+
+def get_row_count(model_class):
+    """
+    Numero di righe della tabella: dal contatore mantenuto (una lettura per
+    chiave univoca) o, se la tabella non ha un contatore, con COUNT(*)
+    """
+    row_count = TableRowCount.objects.filter(
+        table_name=model_class._meta.db_table
+    ).values_list('row_count', flat=True).first()
+    
+    if row_count is None:
+        return model_class.objects.count()
+    return row_count
+
+
+def is_unfiltered(queryset):
+    """True se il queryset comprende tutte le righe della tabella"""
+    query = queryset.query
+    return (
+        not query.where
+        and not query.extra_tables
+        and not query.combinator
+        and not query.is_sliced
+        and not query.is_empty()
+    )
+
+
+def get_approximate_count_threshold():
+    return getattr(settings, 'DYNAMIC_MODELS_APPROXIMATE_COUNT_THRESHOLD', None)
+
+
+def _estimate_count(queryset):
+    """Stima del planner di PostgreSQL (None se non disponibile)"""
+    if connection.vendor != 'postgresql':
+        return None
+    
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_queryset(queryset, approximate=None):
+    """
+    Conta le righe di un queryset evitando COUNT(*) quando possibile
+    
+    Args:
+        queryset: QuerySet di un modello dinamico
+        approximate: Soglia oltre la quale il conteggio dei queryset filtrati è
+            approssimato (default: DYNAMIC_MODELS_APPROXIMATE_COUNT_THRESHOLD; None = esatto)
+    
+    Returns:
+        (conteggio, esatto): esatto è False se il conteggio è una stima o un limite inferiore
+    """
+    if is_unfiltered(queryset):
+        return get_row_count(queryset.model), True
+    
+    if approximate is None:
+        approximate = get_approximate_count_threshold()
+    
+    if not approximate:
+        return queryset.count(), True
+    
+    # Conteggio esatto fino alla soglia: legge al massimo approximate + 1 righe
+    row_count = queryset.order_by()[:approximate + 1].count()
+    if row_count <= approximate:
+        return row_count, True
+    
+    estimate = _estimate_count(queryset)
+    return max(estimate or 0, approximate), False
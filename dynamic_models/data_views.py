@@ -3,19 +3,59 @@ from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponseRedirect
 from django.urls import reverse
-from django.core.paginator import Paginator
 from django.db import transaction
 from django.forms.models import modelform_factory
 from django import forms
-from django.contrib.admin import widgets
 from .models import MetaModel, MetaField
 from .dynamic_manager import dynamic_model_manager
+from .pagination import CountedPaginator, keyset_paginate, use_cursor_pagination
+from .counters import get_row_count
+from .fulltext import apply_search
+from .query_planner import apply_relation_plan, get_relation_plan
+from .autocomplete import RELATIONAL_FIELD_TYPES, create_autocomplete_field, get_autocomplete_results
+from .exporters import (
+    COLUMNAR_CONTENT_TYPES, EXPORT_CONTENT_TYPES, ColumnarExportUnavailable,
+    columnar_export_response, export_response
+)
 import json
 
 
+# Cache delle classi form: (classe modello, versione schema) -> classe ModelForm
+_form_class_cache = {}
+
+
+def _invalidate_form_classes(meta_model_name=None):
+    if meta_model_name is None:
+        _form_class_cache.clear()
+        return
+    
+    for key in [key for key in _form_class_cache if key[0].__name__ == meta_model_name]:
+        _form_class_cache.pop(key, None)
+
+
+dynamic_model_manager.register_cache_invalidator(_invalidate_form_classes)
+
+
+def get_dynamic_form(model_class, meta_model):
+    """
+    Restituisce la classe form per un modello dinamico, costruendola solo la prima
+    volta per ogni combinazione (classe, versione dello schema). Le istanze del form
+    copiano i campi della classe, quindi la classe può essere condivisa tra le richieste.
+    """
+    key = (model_class, meta_model.schema_version)
+    form_class = _form_class_cache.get(key)
+    
+    if form_class is None:
+        form_class = create_dynamic_form(model_class, meta_model)
+        _form_class_cache[key] = form_class
+    
+    return form_class
+
+
 def create_dynamic_form(model_class, meta_model):
     """
     Crea un form dinamico con i widget appropriati per ogni tipo di campo
+    (usare get_dynamic_form per la versione in cache)
     """
     form_fields = {}
     
@@ -72,26 +112,12 @@ def create_dynamic_form(model_class, meta_model):
                 help_text=meta_field.help_text,
                 label=meta_field.verbose_name or field_name.title()
             )
-        elif meta_field.field_type in ['foreign_key', 'one_to_one']:
-            # Per le relazioni, usa il widget di selezione
+        elif meta_field.field_type in RELATIONAL_FIELD_TYPES:
+            # Relazioni: scelte caricate su richiesta dall'endpoint di autocompletamento,
+            # al render vengono lette solo le righe selezionate
             try:
-                related_model = django_field.related_model
-                form_fields[field_name] = forms.ModelChoiceField(
-                    queryset=related_model.objects.all(),
-                    widget=widgets.ForeignKeyRawIdWidget(django_field.remote_field, admin_site=None),
-                    required=meta_field.required,
-                    help_text=meta_field.help_text,
-                    label=meta_field.verbose_name or field_name.title()
-                )
-            except:
-                # Fallback al campo generico
-                pass
-        elif meta_field.field_type == 'many_to_many':
-            try:
-                related_model = django_field.related_model
-                form_fields[field_name] = forms.ModelMultipleChoiceField(
-                    queryset=related_model.objects.all(),
-                    widget=widgets.FilteredSelectMultiple(field_name, False),
+                form_fields[field_name] = create_autocomplete_field(
+                    meta_model, meta_field, django_field,
                     required=meta_field.required,
                     help_text=meta_field.help_text,
                     label=meta_field.verbose_name or field_name.title()
@@ -126,6 +152,14 @@ def create_dynamic_form(model_class, meta_model):
     return DynamicForm
 
 
+def _parse_keyset_value(value):
+    """Converte il parametro ?after= / ?before= in id (None se assente o non valido)"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
 @staff_member_required
 def dynamic_data_list(request, meta_model_id):
     """
@@ -138,35 +172,41 @@ def dynamic_data_list(request, meta_model_id):
         messages.error(request, f'Modello "{meta_model.name}" non trovato. Crea prima la tabella.')
         return redirect('admin:dynamic_models_metamodel_changelist')
     
-    # Ottieni tutti i record
+    fields = list(meta_model.fields.all())
+    
+    # Ottieni tutti i record, con le relazioni caricate per pagina (JOIN e prefetch)
     search_query = request.GET.get('q', '')
-    queryset = model_class.objects.all()
+    plan = get_relation_plan(model_class, fields, meta_model.schema_version)
+    queryset = apply_relation_plan(model_class.objects.all(), plan)
     
-    # Cerca nei campi di testo se c'è una query
+    # Cerca nei campi di testo se c'è una query (indice full-text se attivo, altrimenti icontains)
     if search_query:
-        from django.db.models import Q
-        q_objects = Q()
-        
-        for field in meta_model.fields.filter(field_type__in=['char', 'text', 'email']):
-            q_objects |= Q(**{f"{field.name}__icontains": search_query})
-        
-        if q_objects:
-            queryset = queryset.filter(q_objects)
+        queryset = apply_search(queryset, meta_model, model_class, search_query, fields)
     
-    # Paginazione
-    paginator = Paginator(queryset, 25)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Paginazione: keyset (?after= / ?before=, nessun COUNT) oppure per numero di pagina
+    keyset = use_cursor_pagination(request) or 'after' in request.GET or 'before' in request.GET
     
-    # Ottieni i campi per la visualizzazione
-    fields = meta_model.fields.all()
+    if keyset:
+        page_obj = keyset_paginate(
+            queryset, 25,
+            after=_parse_keyset_value(request.GET.get('after')),
+            before=_parse_keyset_value(request.GET.get('before')),
+        )
+        total_count = None
+    else:
+        # Conteggi dal contatore mantenuto: nessun COUNT(*) sulla lista non filtrata
+        paginator = CountedPaginator.for_queryset(queryset, 25)
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
+        total_count = paginator.count if not search_query else get_row_count(model_class)
     
     context = {
         'meta_model': meta_model,
         'fields': fields,
         'page_obj': page_obj,
         'search_query': search_query,
-        'total_count': queryset.count(),
+        'total_count': total_count,
+        'keyset_pagination': keyset,
     }
     
     return render(request, 'admin/dynamic_models/data_list.html', context)
@@ -184,8 +224,8 @@ def dynamic_data_add(request, meta_model_id):
         messages.error(request, f'Modello "{meta_model.name}" non trovato. Crea prima la tabella.')
         return redirect('admin:dynamic_models_metamodel_changelist')
     
-    # Crea un form dinamicamente con widget appropriati
-    DynamicForm = create_dynamic_form(model_class, meta_model)
+    # Form con widget appropriati (classe in cache per versione dello schema)
+    DynamicForm = get_dynamic_form(model_class, meta_model)
     
     if request.method == 'POST':
         print(f"DEBUG - POST data: {request.POST}")
@@ -243,8 +283,8 @@ def dynamic_data_edit(request, meta_model_id, object_id):
     
     instance = get_object_or_404(model_class, pk=object_id)
     
-    # Crea un form dinamicamente con widget appropriati
-    DynamicForm = create_dynamic_form(model_class, meta_model)
+    # Form con widget appropriati (classe in cache per versione dello schema)
+    DynamicForm = get_dynamic_form(model_class, meta_model)
     
     if request.method == 'POST':
         form = DynamicForm(request.POST, request.FILES, instance=instance)  # Aggiungi request.FILES
@@ -302,10 +342,33 @@ def dynamic_data_delete(request, meta_model_id, object_id):
     return render(request, 'admin/dynamic_models/data_delete.html', context)
 
 
+@staff_member_required
+def dynamic_data_autocomplete(request, meta_model_id, field_name):
+    """
+    Scelte per un campo relazionale del form (JSON per select2): ?term= e ?page=
+    """
+    meta_model = get_object_or_404(MetaModel, pk=meta_model_id, is_active=True)
+    meta_field = get_object_or_404(
+        MetaField, meta_model=meta_model, name=field_name, field_type__in=RELATIONAL_FIELD_TYPES
+    )
+    model_class = dynamic_model_manager.get_model(meta_model.name)
+    
+    if not model_class:
+        return JsonResponse({'error': 'Modello non trovato'}, status=404)
+    
+    # I modelli Django (es. auth.User) richiedono il permesso di visualizzazione
+    related_model = model_class._meta.get_field(field_name).related_model
+    opts = related_model._meta
+    if opts.app_label != 'dynamic_models' and not request.user.has_perm(f'{opts.app_label}.view_{opts.model_name}'):
+        return JsonResponse({'error': 'Permesso negato'}, status=403)
+    
+    return JsonResponse(get_autocomplete_results(request, meta_model, meta_field))
+
+
 @staff_member_required
 def dynamic_data_export(request, meta_model_id):
     """
-    Vista per esportare i dati in formato JSON/CSV
+    Vista per esportare i dati in formato JSON, NDJSON, CSV, Parquet o Arrow (?format=)
     """
     meta_model = get_object_or_404(MetaModel, pk=meta_model_id, is_active=True)
     model_class = dynamic_model_manager.get_model(meta_model.name)
@@ -315,45 +378,14 @@ def dynamic_data_export(request, meta_model_id):
     
     format_type = request.GET.get('format', 'json')
     
-    # Ottieni tutti i record
-    records = model_class.objects.all()
-    fields = meta_model.fields.all()
-    
-    if format_type == 'json':
-        data = []
-        for record in records:
-            record_data = {'id': record.pk}
-            for field in fields:
-                value = getattr(record, field.name)
-                
-                # Gestisce diversi tipi di campi per la serializzazione JSON
-                if hasattr(value, 'isoformat'):
-                    # DateTime, Date, Time
-                    value = value.isoformat()
-                elif hasattr(value, 'url') and hasattr(value, 'name'):
-                    # FileField, ImageField
-                    if value and value.name:  # Controlla che il campo non sia vuoto
-                        try:
-                            value = value.url  # Restituisce l'URL completo del file
-                        except ValueError:
-                            # Se il file non esiste più sul disco
-                            value = value.name if value.name else None
-                    else:
-                        value = None  # Campo vuoto
-                elif callable(value):
-                    # Skip dei metodi e delle funzioni
-                    continue
-                
-                record_data[field.name] = value
-            data.append(record_data)
-        
-        response = JsonResponse({
-            'meta_model': meta_model.name,
-            'count': len(data),
-            'data': data
-        }, json_dumps_params={'indent': 2})
-        response['Content-Disposition'] = f'attachment; filename="{meta_model.name}_export.json"'
-        return response
-    
-    # Aggiungi altri formati di export qui (CSV, Excel, etc.)
-    return JsonResponse({'error': 'Formato non supportato'}, status=400)
\ No newline at end of file
+    if format_type in COLUMNAR_CONTENT_TYPES:
+        try:
+            return columnar_export_response(meta_model, model_class, format_type)
+        except ColumnarExportUnavailable as e:
+            return JsonResponse({'error': str(e)}, status=501)
+    
+    if format_type not in EXPORT_CONTENT_TYPES:
+        return JsonResponse({'error': 'Formato non supportato'}, status=400)
+    
+    # Esportazione in streaming: i record vengono letti e scritti a blocchi
+    return export_response(meta_model, model_class, format_type)
\ No newline at end of file
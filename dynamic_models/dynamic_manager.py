@@ -1,4 +1,5 @@
 from django.apps import apps
+from django.conf import settings
 from django.db import connection, migrations
 from django.db.migrations.executor import MigrationExecutor
 from django.db.migrations.state import ProjectState
@@ -9,6 +10,9 @@ import sys
 import shutil
 import datetime
 import json
+import threading
+import time
+from collections import OrderedDict
 
 
 class DynamicModelManager:
@@ -19,6 +23,19 @@ class DynamicModelManager:
     def __init__(self):
         self.app_label = 'dynamic_models'  # Torna al normale app_label
         self.registered_models = {}
+        # Cache delle classi compilate: nome modello -> fingerprint, classe, dipendenze
+        self._model_class_cache = {}
+        self.cache_stats = {'hits': 0, 'misses': 0, 'lazy_loads': 0, 'evictions': 0}
+        # Ordine di utilizzo dei modelli caricati (modalità lazy, per l'eviction LRU)
+        self._access_order = OrderedDict()
+        self._materializing = set()
+        # Ultima versione globale dello schema applicata in questo processo
+        self._schema_version_seen = 0
+        self._sync_lock = threading.RLock()
+        # Callback delle cache derivate dallo schema (resolution, serializer, form, ...)
+        self._cache_invalidators = []
+        # Statistiche dell'ultimo caricamento completo (load_all_models)
+        self.bootstrap_stats = {}
         self._backup_dir = "db_backups"
         self._ensure_backup_dir()
 
@@ -88,34 +105,36 @@ class DynamicModelManager:
         print(f"⚠️  Backup non disponibile per questo tipo di database: {db_settings['ENGINE']}")
         return None
     
-    def register_model(self, meta_model, register_in_admin=False):  # Default False per evitare duplicati
+    def register_model(self, meta_model, register_in_admin=False, fields=None, known_models=None):  # Default False per evitare duplicati
         """
         Registra un modello dinamico nell'app registry di Django
         
         Args:
             meta_model: Istanza di MetaModel
             register_in_admin: Se True, registra anche nell'admin per la sidebar
+            fields: Lista opzionale di MetaField già caricati
+            known_models: Insieme opzionale dei nomi dei MetaModel attivi (evita query per le relazioni)
         
         Returns:
             La classe del modello Django creata
         """
-        model_class = meta_model.create_model_class()
+        model_class = self._get_or_build_model_class(meta_model, fields, known_models)
+        previous_class = self.registered_models.get(meta_model.name)
         
         # Registra il modello nell'app - prima rimuovi se esiste
         app_config = apps.get_app_config(self.app_label)
         
         # Rimuovi il modello esistente se presente
         model_key = meta_model.name.lower()
-        if model_key in app_config.models:
-            old_model = app_config.models[model_key]
+        from django.contrib import admin
+        for old_model in (app_config.models.get(model_key), previous_class):
             # Rimuovi dall'admin se registrato
-            from django.contrib import admin
-            if old_model in admin.site._registry:
+            if old_model is not None and old_model in admin.site._registry:
                 admin.site.unregister(old_model)
-            del app_config.models[model_key]
+        self._pop_from_app_registry(model_key)
         
         # Registra il nuovo modello
-        app_config.models[model_key] = model_class
+        self._add_to_app_registry(model_class)
         
         # Registra nell'admin solo se esplicitamente richiesto
         if register_in_admin:
@@ -124,8 +143,114 @@ class DynamicModelManager:
         # Memorizza nella cache
         self.registered_models[meta_model.name] = model_class
         
+        if self.lazy_loading:
+            self._touch(meta_model.name)
+        
+        if previous_class is not model_class:
+            self.invalidate_caches(meta_model.name)
+        
+        return model_class
+    
+    def register_cache_invalidator(self, callback):
+        """
+        Registra una funzione da chiamare quando lo schema di un modello cambia
+        
+        Args:
+            callback: Funzione callback(meta_model_name); None significa "tutti i modelli"
+        """
+        if callback not in self._cache_invalidators:
+            self._cache_invalidators.append(callback)
+    
+    def invalidate_caches(self, meta_model_name=None):
+        """
+        Svuota le cache derivate dallo schema per un modello (o per tutti se None)
+        """
+        for callback in self._cache_invalidators:
+            try:
+                callback(meta_model_name)
+            except Exception as e:
+                print(f"⚠️  Errore durante l'invalidazione della cache: {e}")
+    
+    @property
+    def schema_version(self):
+        """Versione globale dello schema applicata in questo processo"""
+        return self._schema_version_seen
+    
+    @property
+    def lazy_loading(self):
+        """True se i modelli vengono costruiti al primo utilizzo invece che all'avvio"""
+        return getattr(settings, 'DYNAMIC_MODELS_LAZY_LOADING', False)
+    
+    @property
+    def max_loaded_models(self):
+        """Numero massimo di modelli tenuti in memoria in modalità lazy (None = nessun limite)"""
+        return getattr(settings, 'DYNAMIC_MODELS_MAX_LOADED_MODELS', None)
+    
+    def _get_or_build_model_class(self, meta_model, fields=None, known_models=None):
+        """
+        Restituisce la classe compilata dalla cache se la definizione non è cambiata,
+        altrimenti la ricostruisce e aggiorna la cache
+        
+        Args:
+            meta_model: Istanza di MetaModel
+            fields: Lista opzionale di MetaField già caricati
+            known_models: Insieme opzionale dei nomi dei MetaModel attivi
+        """
+        if fields is None:
+            fields = list(meta_model.fields.all())
+        
+        fingerprint = meta_model.get_schema_fingerprint(fields)
+        cached = self._model_class_cache.get(meta_model.name)
+        
+        if cached and cached['fingerprint'] == fingerprint:
+            self.cache_stats['hits'] += 1
+            return cached['model_class']
+        
+        self.cache_stats['misses'] += 1
+        
+        # Le relazioni verso il modello stesso (incluse quelle delle tabelle intermedie M2M)
+        # vengono risolte per nome nell'app registry: la classe precedente va tolta prima
+        # di costruire la nuova, altrimenti punterebbero a quella
+        previous_class = self._pop_from_app_registry(meta_model.name.lower())
+        try:
+            model_class = meta_model.create_model_class(fields, known_models)
+        except Exception:
+            if previous_class is not None:
+                self._add_to_app_registry(previous_class)
+            raise
+        
+        # I modelli che puntano a questo tengono un riferimento alla classe precedente:
+        # vanno ricostruiti alla prossima registrazione
+        self._invalidate_dependent_classes(meta_model.name)
+        
+        self._model_class_cache[meta_model.name] = {
+            'fingerprint': fingerprint,
+            'model_class': model_class,
+            'related_models': {field.related_model for field in fields if field.related_model},
+        }
         return model_class
     
+    def _invalidate_dependent_classes(self, model_name):
+        """Rimuove dalla cache le classi che hanno relazioni verso model_name"""
+        dependents = [
+            name for name, entry in self._model_class_cache.items()
+            if name != model_name and model_name in entry['related_models']
+        ]
+        for name in dependents:
+            del self._model_class_cache[name]
+    
+    def get_cache_stats(self):
+        """Restituisce i contatori hit/miss della cache delle classi compilate"""
+        lookups = self.cache_stats['hits'] + self.cache_stats['misses']
+        return {
+            'hits': self.cache_stats['hits'],
+            'misses': self.cache_stats['misses'],
+            'hit_ratio': round(self.cache_stats['hits'] / lookups, 3) if lookups else None,
+            'cached_models': len(self._model_class_cache),
+            'lazy_loads': self.cache_stats['lazy_loads'],
+            'evictions': self.cache_stats['evictions'],
+        }
+    
     def _register_in_admin(self, meta_model, model_class):
         """
         Registra il modello dinamico nell'admin per la sidebar
@@ -207,6 +332,16 @@ class DynamicModelManager:
             with connection.schema_editor() as schema_editor:
                 schema_editor.create_model(model_class)
             
+            from .fulltext import sync_fulltext_index
+            sync_fulltext_index(meta_model, model_class)
+            
+            from .counters import install_row_counter
+            install_row_counter(model_class)
+            
+            # La classe può venire dalla cache (nessuna invalidazione in register_model),
+            # ma le cache che dipendono dall'esistenza della tabella vanno aggiornate
+            self.invalidate_caches(meta_model.name)
+            
             print(f"✅ Tabella {meta_model.table_name} creata con successo!")
             return model_class
             
@@ -242,12 +377,25 @@ class DynamicModelManager:
             current_schema = self._get_current_table_schema(meta_model.table_name)
             desired_schema = self._get_desired_schema(meta_model)
             
+            current_indexes = self._get_current_indexes(meta_model.table_name)
+            desired_indexes = self._get_desired_indexes(model_class)
+            
             # Calcola le differenze
-            schema_diff = self._calculate_schema_diff(current_schema, desired_schema)
+            schema_diff = self._calculate_schema_diff(
+                current_schema, desired_schema, current_indexes, desired_indexes
+            )
             
             # Applica le modifiche incrementali
             self._apply_schema_changes(meta_model, model_class, schema_diff)
             
+            # Indice full-text e contatore delle righe: dopo le modifiche,
+            # che su SQLite possono ricreare la tabella (e i suoi trigger)
+            from .fulltext import sync_fulltext_index
+            sync_fulltext_index(meta_model, model_class)
+            
+            from .counters import install_row_counter
+            install_row_counter(model_class)
+            
             print(f"✅ Tabella {meta_model.table_name} aggiornata con successo!")
             return model_class
             
@@ -387,13 +535,50 @@ class DynamicModelManager:
                 'primary_key': False
             }
     
-    def _calculate_schema_diff(self, current_schema, desired_schema):
-        """Calcola le differenze tra schema corrente e desiderato"""
+    def _get_current_indexes(self, table_name):
+        """
+        Restituisce gli indici gestiti (prefisso dmidx_) presenti sulla tabella
+        come dizionario nome -> lista di colonne
+        """
+        from .models import MANAGED_INDEX_PREFIX
+        
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table_name)
+        
+        return {
+            name: info['columns']
+            for name, info in constraints.items()
+            if info['index'] and not info['primary_key'] and not info['unique']
+            and name.startswith(MANAGED_INDEX_PREFIX)
+        }
+    
+    def _get_desired_indexes(self, model_class):
+        """Restituisce gli indici dichiarati sulla classe del modello (nome -> Index)"""
+        return {index.name: index for index in model_class._meta.indexes}
+    
+    def _calculate_index_diff(self, current_indexes, desired_indexes):
+        """
+        Calcola gli indici da creare e da eliminare. Il nome degli indici gestiti
+        deriva dalla loro definizione, quindi un indice modificato viene ricreato.
+        """
+        return {
+            'add_indexes': [
+                index for name, index in desired_indexes.items() if name not in current_indexes
+            ],
+            'drop_indexes': [
+                {'name': name, 'columns': columns}
+                for name, columns in current_indexes.items() if name not in desired_indexes
+            ],
+        }
+    
+    def _calculate_schema_diff(self, current_schema, desired_schema, current_indexes=None, desired_indexes=None):
+        """Calcola le differenze tra schema corrente e desiderato (colonne e indici)"""
         diff = {
             'add_columns': [],
             'drop_columns': [],
             'modify_columns': []
         }
+        diff.update(self._calculate_index_diff(current_indexes or {}, desired_indexes or {}))
         
         # Campi da aggiungere
         for field_name, field_info in desired_schema.items():
@@ -449,8 +634,42 @@ class DynamicModelManager:
                 except Exception as e:
                     print(f"✗ Errore rimuovendo campo '{drop_col_name}': {e}")
         
+        if schema_diff['add_columns']:
+            # Su SQLite add_field può ricreare la tabella insieme ai suoi indici:
+            # il confronto degli indici va ripetuto sullo stato reale
+            schema_diff.update(self._calculate_index_diff(
+                self._get_current_indexes(meta_model.table_name),
+                self._get_desired_indexes(model_class),
+            ))
+        
+        self._apply_index_changes(meta_model, model_class, schema_diff)
+        
         print(f"✓ Schema aggiornato per tabella '{meta_model.table_name}'")
     
+    def _apply_index_changes(self, meta_model, model_class, schema_diff):
+        """Crea ed elimina gli indici gestiti secondo il diff calcolato"""
+        from django.db import models
+        
+        with connection.schema_editor() as schema_editor:
+            
+            for drop_index in schema_diff.get('drop_indexes', []):
+                try:
+                    # Per eliminare un indice basta il nome
+                    index = models.Index(fields=drop_index['columns'], name=drop_index['name'])
+                    schema_editor.remove_index(model_class, index)
+                    print(f"✓ Rimosso indice '{drop_index['name']}' dalla tabella '{meta_model.table_name}'")
+                    
+                except Exception as e:
+                    print(f"✗ Errore rimuovendo indice '{drop_index['name']}': {e}")
+            
+            for index in schema_diff.get('add_indexes', []):
+                try:
+                    schema_editor.add_index(model_class, index)
+                    print(f"✓ Creato indice '{index.name}' su {list(index.fields)} nella tabella '{meta_model.table_name}'")
+                    
+                except Exception as e:
+                    print(f"✗ Errore creando indice '{index.name}': {e}")
+    
     def drop_table(self, meta_model):
         """
         Elimina la tabella dal database
@@ -458,19 +677,73 @@ class DynamicModelManager:
         Args:
             meta_model: Istanza di MetaModel
         """
-        model_class = meta_model.get_model_class()
+        model_class = self.get_model(meta_model.name)
         
         if model_class:
+            from .fulltext import drop_fulltext_index
+            drop_fulltext_index(model_class._meta.db_table)
+            
+            from .counters import drop_row_counter
+            drop_row_counter(model_class)
+            
             with connection.schema_editor() as schema_editor:
                 schema_editor.delete_model(model_class)
             
             # Rimuovi dall'app registry
-            app_config = apps.get_app_config(self.app_label)
-            if meta_model.name.lower() in app_config.models:
-                del app_config.models[meta_model.name.lower()]
-            
-            if meta_model.name in self.registered_models:
-                del self.registered_models[meta_model.name]
+            self.unregister_model(meta_model.name)
+    
+    def _get_auto_created_through_models(self, model_class):
+        """Tabelle intermedie M2M create da Django per il modello (es. book_tags)"""
+        return [
+            field.remote_field.through
+            for field in model_class._meta.local_many_to_many
+            if field.remote_field.through._meta.auto_created
+        ]
+    
+    def _add_to_app_registry(self, model_class):
+        """Registra nell'app la classe del modello e le sue tabelle intermedie M2M"""
+        app_models = apps.get_app_config(self.app_label).models
+        for registered_class in [model_class] + self._get_auto_created_through_models(model_class):
+            app_models[registered_class._meta.model_name] = registered_class
+        apps.clear_cache()
+    
+    def _pop_from_app_registry(self, model_key):
+        """
+        Rimuove dall'app la classe del modello insieme alle sue tabelle intermedie M2M:
+        rimaste registrate, la ricostruzione del modello le ridefinirebbe
+        (RuntimeWarning "already registered") e le relazioni inverse dei modelli
+        collegati continuerebbero a puntare alla classe rimossa
+        
+        Returns:
+            La classe rimossa o None se il modello non era registrato
+        """
+        app_models = apps.get_app_config(self.app_label).models
+        model_class = app_models.pop(model_key, None)
+        if model_class is None:
+            return None
+        
+        for through in self._get_auto_created_through_models(model_class):
+            if app_models.get(through._meta.model_name) is through:
+                del app_models[through._meta.model_name]
+        apps.clear_cache()
+        return model_class
+    
+    def unregister_model(self, meta_model_name):
+        """
+        Rimuove un modello dinamico dall'app registry e dalle cache del manager
+        
+        Args:
+            meta_model_name: Nome del MetaModel
+        """
+        self._pop_from_app_registry(meta_model_name.lower())
+        
+        if meta_model_name in self.registered_models:
+            del self.registered_models[meta_model_name]
+        
+        self._model_class_cache.pop(meta_model_name, None)
+        self._invalidate_dependent_classes(meta_model_name)
+        self._access_order.pop(meta_model_name, None)
+        self.invalidate_caches(meta_model_name)
     
     def get_model(self, meta_model_name):
         """
@@ -483,22 +756,260 @@ class DynamicModelManager:
             Classe del modello Django o None
         """
         try:
-            return apps.get_model(self.app_label, meta_model_name)
+            model_class = apps.get_model(self.app_label, meta_model_name)
         except LookupError:
-            return None
+            model_class = None
+        
+        if not self.lazy_loading:
+            return model_class
+        
+        if model_class is None:
+            model_class = self._materialize(meta_model_name)
+        elif model_class.__name__ in self.registered_models:
+            # Solo i modelli dinamici partecipano all'LRU (non MetaModel, DataJob, ...)
+            self._touch(model_class.__name__)
+        
+        return model_class
+    
+    def _materialize(self, meta_model_name):
+        """
+        Costruisce e registra un modello al primo utilizzo (modalità lazy).
+        I modelli dinamici target delle relazioni vengono caricati prima, quelli
+        che hanno relazioni verso questo subito dopo: senza di loro le relazioni
+        inverse mancherebbero e delete() ignorerebbe CASCADE/PROTECT/SET_NULL.
+        """
+        from .models import MetaModel
+        
+        with self._sync_lock:
+            if meta_model_name in self.registered_models:
+                return self.registered_models[meta_model_name]
+            
+            meta_model = (
+                MetaModel.objects.filter(name=meta_model_name, is_active=True)
+                .prefetch_related('fields')
+                .first()
+            )
+            if meta_model is None:
+                return None
+            
+            fields = list(meta_model.fields.all())
+            
+            self._materializing.add(meta_model.name)
+            try:
+                for field in fields:
+                    target = field.related_model
+                    # I target in costruzione (cicli) si risolvono con riferimenti lazy
+                    if (target and '.' not in target and target not in self.registered_models
+                            and target not in self._materializing):
+                        self.get_model(target)
+                
+                model_class = self.register_model(meta_model, fields=fields)
+                
+                for referrer in self._get_referrer_names(meta_model.name):
+                    if referrer not in self.registered_models and referrer not in self._materializing:
+                        self.get_model(referrer)
+            finally:
+                self._materializing.discard(meta_model.name)
+            
+            self.cache_stats['lazy_loads'] += 1
+            # Solo alla fine della materializzazione più esterna: prima i modelli
+            # collegati non sono ancora tutti registrati e risulterebbero non bloccati
+            if not self._materializing:
+                self._evict_cold_models()
+            
+            return model_class
+    
+    def _get_referrer_names(self, meta_model_name):
+        """Nomi dei MetaModel attivi con una relazione verso il modello"""
+        from .models import MetaField
+        
+        return set(
+            MetaField.objects.filter(related_model=meta_model_name, meta_model__is_active=True)
+            .exclude(meta_model__name=meta_model_name)
+            .values_list('meta_model__name', flat=True)
+        )
+    
+    def _touch(self, meta_model_name):
+        """Segna un modello come usato di recente"""
+        self._access_order[meta_model_name] = True
+        self._access_order.move_to_end(meta_model_name)
+    
+    def _evict_cold_models(self):
+        """
+        Rimuove i modelli usati meno di recente finché il numero di modelli caricati
+        rientra nel limite. Un modello collegato da una relazione (in entrambe le
+        direzioni) a un altro modello caricato è bloccato (pinned) e non viene rimosso:
+        il limite è quindi indicativo, i modelli collegati restano in memoria insieme.
+        """
+        limit = self.max_loaded_models
+        if not limit:
+            return
+        
+        while len(self.registered_models) > limit:
+            pinned = set()
+            for name in self.registered_models:
+                entry = self._model_class_cache.get(name)
+                if entry:
+                    loaded_targets = (entry['related_models'] - {name}) & self.registered_models.keys()
+                    if loaded_targets:
+                        pinned.update(loaded_targets)
+                        pinned.add(name)
+            
+            # Mai rimuovere i modelli in costruzione né l'ultimo usato
+            protected = pinned | self._materializing | set(list(self._access_order)[-1:])
+            # Dal meno usato di recente; i modelli mai usati vengono per primi
+            access_rank = {name: rank for rank, name in enumerate(self._access_order)}
+            candidates = sorted(self.registered_models, key=lambda name: access_rank.get(name, -1))
+            victim = next((name for name in candidates if name not in protected), None)
+            if victim is None:
+                break
+            
+            self.unregister_model(victim)
+            self.cache_stats['evictions'] += 1
     
     def load_all_models(self):
         """
         Carica tutti i modelli dinamici definiti nel database
         Questo dovrebbe essere chiamato all'avvio dell'app
         """
-        from .models import MetaModel
+        from .models import MetaModel, SchemaState
+        
+        started = time.perf_counter()
+        
+        # Legge la versione prima dei modelli: una modifica concorrente verrà
+        # comunque rilevata dalla prossima sync_schema_version()
+        schema_version = SchemaState.get_version()
+        
+        if self.lazy_loading:
+            # I modelli verranno costruiti da get_model() al primo utilizzo
+            self._schema_version_seen = schema_version
+            self.bootstrap_stats = {'models': 0, 'lazy': True}
+            print("⏱️  Caricamento lazy dei modelli dinamici attivo")
+            return
+        
+        # Due query in totale: MetaModel attivi + tutti i loro MetaField
+        meta_models = list(MetaModel.objects.filter(is_active=True).prefetch_related('fields'))
+        fields_by_model = {meta_model.name: list(meta_model.fields.all()) for meta_model in meta_models}
+        known_models = set(fields_by_model)
+        
+        load_order, cyclic = self._resolve_load_order(meta_models, fields_by_model)
         
-        for meta_model in MetaModel.objects.filter(is_active=True):
+        errors = 0
+        for meta_model in load_order:
             try:
-                self.register_model(meta_model)
+                self.register_model(
+                    meta_model,
+                    fields=fields_by_model[meta_model.name],
+                    known_models=known_models
+                )
             except Exception as e:
+                errors += 1
                 print(f"Errore nel caricamento del modello {meta_model.name}: {e}")
+        
+        self._schema_version_seen = schema_version
+        
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.bootstrap_stats = {
+            'models': len(meta_models),
+            'fields': sum(len(fields) for fields in fields_by_model.values()),
+            'errors': errors,
+            'cyclic_models': sorted(cyclic),
+            'elapsed_ms': round(elapsed_ms, 2),
+        }
+        print(f"⏱️  {len(meta_models)} modelli dinamici caricati in {elapsed_ms:.1f} ms")
+    
+    def _resolve_load_order(self, meta_models, fields_by_model):
+        """
+        Ordina i MetaModel in modo che i target delle relazioni vengano registrati
+        prima dei modelli che li referenziano (ordinamento topologico).
+        I modelli coinvolti in cicli vengono accodati alla fine: le loro relazioni
+        reciproche sono risolte tramite riferimenti lazy ('dynamic_models.Nome').
+        
+        Returns:
+            Tupla (lista ordinata di MetaModel, insieme dei nomi in un ciclo)
+        """
+        by_name = {meta_model.name: meta_model for meta_model in meta_models}
+        
+        # dipendenze: modello -> target dinamici (auto-relazioni escluse)
+        dependencies = {
+            name: {
+                field.related_model for field in fields
+                if field.related_model in by_name and field.related_model != name
+            }
+            for name, fields in fields_by_model.items()
+        }
+        dependents = {name: [] for name in by_name}
+        for name, targets in dependencies.items():
+            for target in targets:
+                dependents[target].append(name)
+        
+        pending = {name: len(targets) for name, targets in dependencies.items()}
+        ready = [meta_model.name for meta_model in meta_models if not pending[meta_model.name]]
+        ordered = []
+        
+        while ready:
+            name = ready.pop()
+            ordered.append(by_name[name])
+            for dependent in dependents[name]:
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    ready.append(dependent)
+        
+        cyclic = {name for name, count in pending.items() if count > 0}
+        ordered.extend(meta_model for meta_model in meta_models if meta_model.name in cyclic)
+        
+        return ordered, cyclic
+    
+    def sync_schema_version(self):
+        """
+        Allinea questo processo alla versione globale dello schema.
+        Costa una lettura per chiave primaria quando non ci sono modifiche;
+        altrimenti ricarica solo i MetaModel modificati dopo l'ultima sincronizzazione.
+        
+        Returns:
+            Lista dei nomi dei modelli ricaricati o rimossi
+        """
+        from .models import MetaModel, SchemaState
+        
+        version = SchemaState.get_version()
+        if version <= self._schema_version_seen:
+            return []
+        
+        with self._sync_lock:
+            if version <= self._schema_version_seen:
+                return []
+            
+            changed = []
+            
+            for meta_model in MetaModel.objects.filter(schema_version__gt=self._schema_version_seen):
+                # In modalità lazy i modelli non caricati verranno costruiti al primo utilizzo
+                if self.lazy_loading and meta_model.name not in self.registered_models:
+                    continue
+                try:
+                    if meta_model.is_active:
+                        self.register_model(meta_model)
+                    else:
+                        self.unregister_model(meta_model.name)
+                    # Anche le modifiche che non cambiano la classe (es. descrizione)
+                    # rendono obsolete le cache derivate
+                    self.invalidate_caches(meta_model.name)
+                    changed.append(meta_model.name)
+                except Exception as e:
+                    print(f"Errore nella sincronizzazione del modello {meta_model.name}: {e}")
+            
+            # I MetaModel eliminati non hanno più una riga da confrontare
+            active_names = set(MetaModel.objects.filter(is_active=True).values_list('name', flat=True))
+            for name in list(self.registered_models):
+                if name not in active_names:
+                    self.unregister_model(name)
+                    changed.append(name)
+            
+            self._schema_version_seen = version
+        
+        if changed:
+            print(f"🔄 Schema v{version}: sincronizzati {', '.join(changed)}")
+        
+        return changed
     
     def add_field_to_table(self, meta_field):
         """
@@ -0,0 +1,373 @@
+"""
+Esportazione dei dati dei modelli dinamici.
+
+- JSON, NDJSON, CSV: in streaming. I record vengono letti a blocchi per
+  chiave primaria con values_list(): la memoria resta costante qualunque sia
+  la dimensione della tabella e i primi byte partono subito.
+- Parquet, Arrow IPC: file colonnari tipizzati, scritti a record batch
+  (richiedono il pacchetto opzionale pyarrow).
+"""
+import csv
+import tempfile
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.http import FileResponse, StreamingHttpResponse
+
+
+# Record letti dal database per ogni blocco
+EXPORT_CHUNK_SIZE = 2000
+
+# Separatore dei valori molti a molti nelle celle CSV
+CSV_MULTI_VALUE_SEPARATOR = ';'
+
+EXPORT_CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+COLUMNAR_CONTENT_TYPES = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+}
+
+
+class ColumnarExportUnavailable(ImportError):
+    """pyarrow non è installato"""
+
+
+class ExportColumn:
+    """Colonna esportata: nome, attributo letto dal database e convertitore del valore"""
+    
+    def __init__(self, name, attname, convert=None):
+        self.name = name
+        self.attname = attname
+        self.convert = convert
+
+
+def _identity(value):
+    return value
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def _decimal_to_string(value):
+    # Come stringa per non perdere precisione in JSON
+    return str(value) if value is not None else None
+
+
+def build_converter(field):
+    """
+    Restituisce la funzione che converte il valore grezzo di una colonna
+    in un valore serializzabile. Viene costruita una volta per esportazione.
+    """
+    if isinstance(field, models.FileField):
+        storage = field.storage
+        
+        def file_url(value):
+            if not value:
+                return None
+            try:
+                return storage.url(value)
+            except ValueError:
+                return value
+        
+        return file_url
+    
+    if isinstance(field, (models.DateTimeField, models.DateField, models.TimeField)):
+        return _isoformat
+    
+    if isinstance(field, models.DecimalField):
+        return _decimal_to_string
+    
+    return _identity
+
+
+def get_export_columns(model_class, meta_fields, native=False):
+    """
+    Restituisce (colonne, campi molti a molti) nell'ordine dei MetaField,
+    con la chiave primaria in testa. Le relazioni sono esportate come chiavi primarie.
+    
+    Con native=True i valori restano tipi Python (Decimal, date, datetime) e solo
+    i file vengono convertiti in URL: è il formato atteso dai writer colonnari.
+    """
+    opts = model_class._meta
+    columns = [ExportColumn('id', opts.pk.attname, _identity)]
+    m2m_fields = []
+    
+    for meta_field in meta_fields:
+        try:
+            field = opts.get_field(meta_field.name)
+        except Exception:
+            continue
+        
+        if field.many_to_many:
+            m2m_fields.append(field)
+        elif field.concrete:
+            if native and not isinstance(field, models.FileField):
+                convert = _identity
+            else:
+                convert = build_converter(field)
+            columns.append(ExportColumn(field.name, field.attname, convert))
+    
+    return columns, m2m_fields
+
+
+def iter_export_rows(queryset, columns, m2m_fields, chunk_size=EXPORT_CHUNK_SIZE, on_chunk=None):
+    """
+    Genera le righe convertite (liste di valori, nell'ordine di columns + m2m_fields).
+    I valori molti a molti vengono caricati con una query per campo e per blocco.
+    
+    I blocchi sono letti per chiave primaria (pk > ultimo letto): ogni blocco è una
+    query breve, quindi tra un blocco e l'altro non resta aperto nessun cursore e
+    on_chunk può scrivere sul database anche con SQLite.
+    
+    Args:
+        on_chunk: Funzione opzionale chiamata con il numero di righe lette dopo ogni blocco
+    """
+    converters = [column.convert for column in columns]
+    rows = queryset.order_by('pk').values_list(*[column.attname for column in columns])
+    last_pk = None
+    processed = 0
+    
+    while True:
+        page = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+        last_pk = chunk[-1][0]
+        
+        related_ids = [_load_m2m_ids(field, [row[0] for row in chunk]) for field in m2m_fields]
+        
+        for row in chunk:
+            values = [convert(value) for convert, value in zip(converters, row)]
+            values.extend(ids.get(row[0], []) for ids in related_ids)
+            yield values
+        
+        processed += len(chunk)
+        if on_chunk is not None:
+            on_chunk(processed)
+
+
+def _load_m2m_ids(field, pks):
+    """Restituisce {pk: [pk collegati]} per un campo molti a molti e un blocco di record"""
+    through = field.remote_field.through
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    
+    related = {}
+    pairs = through.objects.filter(**{f'{source}__in': pks}).order_by(target).values_list(
+        f'{source}_id', f'{target}_id'
+    )
+    for source_id, target_id in pairs:
+        related.setdefault(source_id, []).append(target_id)
+    
+    return related
+
+
+class _Echo:
+    """Pseudo-buffer per csv.writer: restituisce la riga invece di scriverla"""
+    
+    def write(self, value):
+        return value
+
+
+def stream_ndjson(names, rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for values in rows:
+        yield encoder.encode(dict(zip(names, values))) + '\n'
+
+
+def stream_csv(names, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(names)
+    for values in rows:
+        yield writer.writerow([
+            CSV_MULTI_VALUE_SEPARATOR.join(str(item) for item in value) if isinstance(value, list) else value
+            for value in values
+        ])
+
+
+def stream_json(names, rows, meta_model_name):
+    """Documento {"meta_model", "data", "count"}: il conteggio è noto solo alla fine"""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    yield '{"meta_model": %s, "data": [' % encoder.encode(meta_model_name)
+    
+    count = 0
+    for values in rows:
+        yield (',\n' if count else '\n') + encoder.encode(dict(zip(names, values)))
+        count += 1
+    
+    yield '\n], "count": %d}\n' % count
+
+
+def iter_export_content(meta_model, model_class, format_type, queryset=None, meta_fields=None,
+                        chunk_size=EXPORT_CHUNK_SIZE, on_chunk=None):
+    """
+    Genera il contenuto testuale dell'esportazione, pezzo per pezzo
+    
+    Args:
+        meta_model: Istanza di MetaModel
+        model_class: Classe del modello dinamico
+        format_type: 'json', 'ndjson' o 'csv' (vedi EXPORT_CONTENT_TYPES)
+        queryset: QuerySet opzionale già filtrato (default: tutti i record)
+        meta_fields: Lista opzionale di MetaField già caricati
+        chunk_size: Record letti dal database per blocco
+        on_chunk: Funzione opzionale chiamata con il numero di record letti dopo ogni blocco
+    """
+    if meta_fields is None:
+        meta_fields = meta_model.fields.all()
+    if queryset is None:
+        queryset = model_class.objects.all()
+    
+    columns, m2m_fields = get_export_columns(model_class, meta_fields)
+    names = [column.name for column in columns] + [field.name for field in m2m_fields]
+    rows = iter_export_rows(queryset, columns, m2m_fields, chunk_size, on_chunk)
+    
+    if format_type == 'csv':
+        return stream_csv(names, rows)
+    elif format_type == 'ndjson':
+        return stream_ndjson(names, rows)
+    return stream_json(names, rows, meta_model.name)
+
+
+def export_response(meta_model, model_class, format_type, queryset=None, meta_fields=None):
+    """
+    Restituisce una StreamingHttpResponse con i dati del modello nel formato richiesto
+    (stessi argomenti di iter_export_content)
+    """
+    content = iter_export_content(meta_model, model_class, format_type, queryset, meta_fields)
+    
+    response = StreamingHttpResponse(content, content_type=EXPORT_CONTENT_TYPES[format_type])
+    response['Content-Disposition'] = f'attachment; filename="{meta_model.name}_export.{format_type}"'
+    return response
+
+
+def _import_pyarrow():
+    """Importa pyarrow solo quando serve: è una dipendenza opzionale"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ColumnarExportUnavailable(
+            "L'esportazione Parquet/Arrow richiede il pacchetto 'pyarrow' (pip install pyarrow)"
+        )
+    return pyarrow
+
+
+def get_arrow_type(pa, meta_field):
+    """Tipo Arrow corrispondente al tipo del MetaField"""
+    field_type = meta_field.field_type
+    
+    if field_type == 'integer':
+        return pa.int64()
+    if field_type == 'decimal':
+        return pa.decimal128(
+            int(meta_field.field_params.get('max_digits', 10)),
+            int(meta_field.field_params.get('decimal_places', 2)),
+        )
+    if field_type == 'boolean':
+        return pa.bool_()
+    if field_type == 'date':
+        return pa.date32()
+    if field_type == 'datetime':
+        return pa.timestamp('us', tz=settings.TIME_ZONE if settings.USE_TZ else None)
+    if field_type in ['foreign_key', 'one_to_one']:
+        return pa.int64()
+    if field_type == 'many_to_many':
+        return pa.list_(pa.int64())
+    
+    # char, text, email, url, file, image
+    return pa.string()
+
+
+def write_columnar(sink, meta_model, model_class, format_type, queryset=None, meta_fields=None,
+                   chunk_size=EXPORT_CHUNK_SIZE, on_chunk=None):
+    """
+    Scrive i dati in formato Parquet o Arrow IPC, un record batch per blocco letto
+    
+    Args:
+        sink: Percorso o file binario aperto in scrittura
+        format_type: 'parquet' o 'arrow' (vedi COLUMNAR_CONTENT_TYPES)
+        (gli altri argomenti come iter_export_content)
+    
+    Returns:
+        Numero di record scritti
+    
+    Raises:
+        ColumnarExportUnavailable: se pyarrow non è installato
+    """
+    pa = _import_pyarrow()
+    
+    if meta_fields is None:
+        meta_fields = list(meta_model.fields.all())
+    if queryset is None:
+        queryset = model_class.objects.all()
+    
+    columns, m2m_fields = get_export_columns(model_class, meta_fields, native=True)
+    meta_fields_by_name = {meta_field.name: meta_field for meta_field in meta_fields}
+    
+    schema = pa.schema(
+        [pa.field('id', pa.int64(), nullable=False)]
+        + [
+            pa.field(name, get_arrow_type(pa, meta_fields_by_name[name]))
+            for name in [column.name for column in columns[1:]] + [field.name for field in m2m_fields]
+        ]
+    )
+    
+    if format_type == 'parquet':
+        writer = pa.parquet.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_file(sink, schema)
+    
+    count = 0
+    rows = iter_export_rows(queryset, columns, m2m_fields, chunk_size, on_chunk)
+    
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            
+            # Da righe a colonne: un array tipizzato per colonna
+            arrays = [
+                pa.array(values, type=schema.field(position).type)
+                for position, values in enumerate(zip(*chunk))
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            count += len(chunk)
+    finally:
+        writer.close()
+    
+    return count
+
+
+def columnar_export_response(meta_model, model_class, format_type, queryset=None, meta_fields=None):
+    """
+    Restituisce una FileResponse con il file Parquet/Arrow. Il file viene scritto
+    su un file temporaneo (Parquet scrive i metadati in fondo al file) e poi inviato
+    a blocchi, quindi la memoria resta costante.
+    
+    Raises:
+        ColumnarExportUnavailable: se pyarrow non è installato
+    """
+    temporary_file = tempfile.TemporaryFile(suffix=f'.{format_type}')
+    
+    try:
+        write_columnar(temporary_file, meta_model, model_class, format_type, queryset, meta_fields)
+    except Exception:
+        temporary_file.close()
+        raise
+    
+    temporary_file.seek(0)
+    return FileResponse(
+        temporary_file,
+        as_attachment=True,
+        filename=f'{meta_model.name}_export.{format_type}',
+        content_type=COLUMNAR_CONTENT_TYPES[format_type],
+    )
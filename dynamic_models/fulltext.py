@@ -0,0 +1,261 @@
+"""
+Ricerca full-text sui dati dei modelli dinamici.
+
+Con MetaModel.fulltext_search attivo (e database SQLite con FTS5) i campi di testo
+vengono indicizzati in una tabella virtuale FTS5 "<tabella>_fts" a contenuto esterno:
+il testo resta solo nella tabella del modello, l'indice contiene i token ed è
+mantenuto allineato da trigger su INSERT, UPDATE e DELETE. La tabella e i trigger
+vengono creati, ricostruiti o rimossi da create_table/update_table/drop_table.
+
+Senza indice la ricerca ripiega su __icontains (scansione completa della tabella).
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .dynamic_manager import dynamic_model_manager
+
+
+# Tipi di MetaField inclusi nella ricerca testuale
+SEARCHABLE_FIELD_TYPES = ['char', 'text', 'email']
+
+# Token considerati in una ricerca (le parole oltre questo limite vengono ignorate)
+MAX_SEARCH_TERMS = 10
+
+FTS_TOKENIZER = 'unicode61 remove_diacritics 2'
+
+# Colonne indicizzate per modello: nome MetaModel -> tupla di colonne (vuota = nessun indice)
+_fulltext_columns = {}
+
+# Disponibilità del modulo fts5 nel database in uso
+_fts5_available = {}
+
+
+def _invalidate_fulltext_columns(meta_model_name=None):
+    if meta_model_name is None:
+        _fulltext_columns.clear()
+    else:
+        _fulltext_columns.pop(meta_model_name, None)
+
+
+dynamic_model_manager.register_cache_invalidator(_invalidate_fulltext_columns)
+
+
+def get_fulltext_table_name(table_name):
+    return f'{table_name}_fts'
+
+
+def is_fulltext_supported():
+    """True se il database è SQLite ed è disponibile il modulo FTS5"""
+    if connection.vendor != 'sqlite':
+        return False
+    
+    if connection.alias not in _fts5_available:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pragma_module_list WHERE name = 'fts5'")
+            _fts5_available[connection.alias] = cursor.fetchone() is not None
+    
+    return _fts5_available[connection.alias]
+
+
+def get_searchable_fields(meta_fields):
+    """MetaField di testo inclusi nella ricerca, nell'ordine di definizione"""
+    return [field for field in meta_fields if field.field_type in SEARCHABLE_FIELD_TYPES]
+
+
+def _get_index_columns(table_name):
+    """Colonne della tabella FTS esistente (tupla vuota se non esiste)"""
+    fts_table = get_fulltext_table_name(table_name)
+    
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [fts_table])
+        if cursor.fetchone() is None:
+            return ()
+        cursor.execute(f"PRAGMA table_info({connection.ops.quote_name(fts_table)})")
+        return tuple(row[1] for row in cursor.fetchall())
+
+
+def _trigger_names(table_name):
+    return [f'{table_name}_fts_{suffix}' for suffix in ('ai', 'ad', 'au')]
+
+
+def _create_triggers(table_name, pk_column, columns):
+    """(Ri)crea i trigger che mantengono allineato l'indice alla tabella"""
+    qn = connection.ops.quote_name
+    fts_table = qn(get_fulltext_table_name(table_name))
+    insert_names, delete_names, update_name = [qn(name) for name in _trigger_names(table_name)]
+    column_list = ', '.join(qn(column) for column in columns)
+    new_values = ', '.join(f'new.{qn(column)}' for column in columns)
+    old_values = ', '.join(f'old.{qn(column)}' for column in columns)
+    
+    # Con il contenuto esterno la rimozione passa dal comando 'delete' con i valori precedenti
+    statements = [
+        f"""CREATE TRIGGER {insert_names} AFTER INSERT ON {qn(table_name)} BEGIN
+            INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.{qn(pk_column)}, {new_values});
+        END""",
+        f"""CREATE TRIGGER {delete_names} AFTER DELETE ON {qn(table_name)} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, {column_list})
+            VALUES ('delete', old.{qn(pk_column)}, {old_values});
+        END""",
+        # Solo gli aggiornamenti che toccano le colonne indicizzate modificano l'indice
+        f"""CREATE TRIGGER {update_name} AFTER UPDATE OF {column_list} ON {qn(table_name)} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, {column_list})
+            VALUES ('delete', old.{qn(pk_column)}, {old_values});
+            INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.{qn(pk_column)}, {new_values});
+        END""",
+    ]
+    
+    with connection.cursor() as cursor:
+        for name in _trigger_names(table_name):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {qn(name)}")
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def drop_fulltext_index(table_name):
+    """Rimuove tabella FTS e trigger di una tabella (se esistono)"""
+    if not is_fulltext_supported():
+        return
+    
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for name in _trigger_names(table_name):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {qn(name)}")
+        cursor.execute(f"DROP TABLE IF EXISTS {qn(get_fulltext_table_name(table_name))}")
+
+
+def sync_fulltext_index(meta_model, model_class, fields=None):
+    """
+    Allinea l'indice full-text alla definizione del MetaModel: lo crea (e lo popola),
+    lo ricostruisce se le colonne di testo sono cambiate o lo rimuove se disattivato.
+    I trigger vengono sempre ricreati: su SQLite alcune modifiche di schema
+    ricreano la tabella del modello e con essa i suoi trigger.
+    
+    Args:
+        meta_model: Istanza di MetaModel
+        model_class: Classe del modello dinamico
+        fields: Lista opzionale di MetaField già caricati
+    """
+    if not is_fulltext_supported():
+        if meta_model.fulltext_search:
+            print(f"⚠️  FTS5 non disponibile: la ricerca su {meta_model.name} userà icontains")
+        return
+    
+    from .models import SchemaState
+    
+    if fields is None:
+        fields = list(meta_model.fields.all())
+    
+    table_name = model_class._meta.db_table
+    fts_table = get_fulltext_table_name(table_name)
+    columns = tuple(
+        model_class._meta.get_field(field.name).column for field in get_searchable_fields(fields)
+    ) if meta_model.fulltext_search else ()
+    current_columns = _get_index_columns(table_name)
+    
+    with transaction.atomic():
+        if not columns:
+            if current_columns:
+                drop_fulltext_index(table_name)
+                print(f"✓ Rimosso indice full-text '{fts_table}'")
+                SchemaState.bump(meta_model.pk)
+            _fulltext_columns.pop(meta_model.name, None)
+            return
+        
+        qn = connection.ops.quote_name
+        
+        if current_columns != columns:
+            drop_fulltext_index(table_name)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE {qn(fts_table)} USING fts5("
+                    f"{', '.join(qn(column) for column in columns)}, "
+                    f"content={qn(table_name)}, content_rowid={qn(model_class._meta.pk.column)}, "
+                    f"tokenize='{FTS_TOKENIZER}')"
+                )
+                # Indicizza le righe già presenti
+                cursor.execute(f"INSERT INTO {qn(fts_table)}({qn(fts_table)}) VALUES ('rebuild')")
+            print(f"✓ Creato indice full-text '{fts_table}' su {list(columns)}")
+            SchemaState.bump(meta_model.pk)
+        
+        _create_triggers(table_name, model_class._meta.pk.column, columns)
+    
+    _fulltext_columns[meta_model.name] = columns
+
+
+def get_fulltext_columns(meta_model, model_class):
+    """Colonne dell'indice full-text del modello (tupla vuota se non disponibile)"""
+    if not meta_model.fulltext_search or not is_fulltext_supported():
+        return ()
+    
+    if meta_model.name not in _fulltext_columns:
+        _fulltext_columns[meta_model.name] = _get_index_columns(model_class._meta.db_table)
+    
+    return _fulltext_columns[meta_model.name]
+
+
+def build_match_expression(search_query):
+    """
+    Converte il testo dell'utente in un'espressione MATCH sicura: ogni parola diventa
+    una stringa FTS5 tra virgolette, in AND; l'ultima è cercata per prefisso ("lib"*
+    trova "libro") perché la ricerca avviene mentre si digita. Il prefisso solo
+    sull'ultima parola evita di espandere i termini già completi.
+    Gli operatori FTS5 (AND, OR, NEAR, *, :, ...) non sono interpretati.
+    
+    Returns:
+        Stringa per MATCH o None se il testo non contiene parole
+    """
+    terms = re.findall(r'\w+', search_query)[:MAX_SEARCH_TERMS]
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"' for term in terms) + '*'
+
+
+def apply_search(queryset, meta_model, model_class, search_query, meta_fields=None):
+    """
+    Filtra il queryset con la ricerca testuale.
+    
+    Con l'indice full-text le righe vengono filtrate per rowid con una sottoquery
+    sulla tabella FTS e ordinate per rilevanza (bm25, annotata come search_rank
+    con una sottoquery correlata); un ordinamento successivo
+    (?ordering=, paginazione a cursore) la sostituisce. Senza indice ripiega su
+    __icontains in OR sui campi di testo.
+    
+    Args:
+        meta_fields: Lista opzionale di MetaField già caricati (solo per il fallback)
+    """
+    search_query = search_query.strip()
+    if not search_query:
+        return queryset
+    
+    if get_fulltext_columns(meta_model, model_class):
+        match = build_match_expression(search_query)
+        if match is None:
+            return queryset.none()
+        
+        qn = connection.ops.quote_name
+        table_name = model_class._meta.db_table
+        fts_table = qn(get_fulltext_table_name(table_name))
+        
+        # Filtro: rowid delle righe trovate dall'indice (la rowid è la chiave primaria)
+        matching_rowids = RawSQL(f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s", [match])
+        # Rilevanza: sottoquery correlata per rowid, che FTS5 risolve senza scandire l'indice
+        rank = RawSQL(
+            f"SELECT bm25({fts_table}) FROM {fts_table} "
+            f"WHERE {fts_table} MATCH %s AND rowid = {qn(table_name)}.{qn(model_class._meta.pk.column)}",
+            [match],
+            output_field=FloatField(),
+        )
+        
+        return queryset.filter(pk__in=matching_rowids).annotate(search_rank=rank).order_by('search_rank')
+    
+    if meta_fields is None:
+        meta_fields = meta_model.fields.all()
+    
+    q_objects = Q()
+    for field in get_searchable_fields(meta_fields):
+        q_objects |= Q(**{f"{field.name}__icontains": search_query})
+    
+    return queryset.filter(q_objects) if q_objects else queryset
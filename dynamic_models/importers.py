@@ -0,0 +1,422 @@
+"""
+Importazione massiva di dati CSV/NDJSON nei modelli dinamici.
+
+I convertitori di ogni colonna sono compilati una volta dal tipo del MetaField,
+le chiavi delle relazioni vengono risolte con una query per campo e per blocco
+e le righe sono scritte con bulk_create, un blocco per transazione.
+"""
+import csv
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+IMPORT_CHUNK_SIZE = 5000
+
+# Separatore dei valori molti a molti nelle celle CSV (come in exporters.py)
+CSV_MULTI_VALUE_SEPARATOR = ';'
+
+TRUE_VALUES = {'true', '1', 'yes', 'si', 'sì', 'y', 't', 'on'}
+FALSE_VALUES = {'false', '0', 'no', 'n', 'f', 'off'}
+
+TEXT_FIELD_TYPES = ['char', 'text', 'email', 'url', 'file', 'image']
+RELATION_FIELD_TYPES = ['foreign_key', 'one_to_one', 'many_to_many']
+
+# Errori conservati nelle statistiche (gli altri vengono solo contati)
+MAX_REPORTED_ERRORS = 50
+
+
+class DataImportError(ValueError):
+    """Configurazione dell'importazione non valida (colonne, campi, lookup)"""
+
+
+def _to_int(value):
+    if isinstance(value, bool):
+        raise ValueError('booleano non ammesso')
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"'{value}' non è un numero intero")
+
+
+def _to_decimal(value):
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f"'{value}' non è un numero decimale")
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    normalized = str(value).strip().lower()
+    if normalized in TRUE_VALUES:
+        return True
+    if normalized in FALSE_VALUES:
+        return False
+    raise ValueError(f"'{value}' non è un booleano")
+
+
+def _to_date(value):
+    parsed = parse_date(str(value)[:10])
+    if parsed is None:
+        raise ValueError(f"'{value}' non è una data (AAAA-MM-GG)")
+    return parsed
+
+
+def _to_datetime(value):
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        raise ValueError(f"'{value}' non è una data/ora ISO 8601")
+    if settings.USE_TZ and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _to_str(value):
+    return value if isinstance(value, str) else str(value)
+
+
+CONVERTERS = {
+    'char': _to_str,
+    'text': _to_str,
+    'email': _to_str,
+    'url': _to_str,
+    'file': _to_str,
+    'image': _to_str,
+    'integer': _to_int,
+    'decimal': _to_decimal,
+    'boolean': _to_bool,
+    'date': _to_date,
+    'datetime': _to_datetime,
+}
+
+
+class ColumnPlan:
+    """Come leggere un campo: colonna di origine, convertitore e vincoli, calcolati una volta"""
+    
+    def __init__(self, meta_field, django_field, source, lookup=None):
+        self.name = meta_field.name
+        self.field_type = meta_field.field_type
+        self.source = source
+        self.field = django_field
+        self.is_text = meta_field.field_type in TEXT_FIELD_TYPES
+        self.is_relation = meta_field.field_type in RELATION_FIELD_TYPES
+        self.nullable = django_field.null or django_field.many_to_many
+        self.convert = CONVERTERS.get(meta_field.field_type, _to_str)
+        
+        if self.is_relation:
+            related_model = django_field.related_model
+            self.lookup = lookup or related_model._meta.pk.name
+            self.lookup_field = related_model._meta.get_field(self.lookup)
+            self.related_model = related_model
+
+
+class DynamicImporter:
+    """
+    Importa righe (dizionari colonna -> valore) in un modello dinamico
+    
+    Args:
+        meta_model: Istanza di MetaModel
+        model_class: Classe del modello dinamico
+        column_map: Dizionario colonna di origine -> nome del campo (le colonne
+            non indicate vengono associate al campo con lo stesso nome)
+        fk_lookups: Dizionario campo relazionale -> campo del modello collegato usato
+            come chiave (default: chiave primaria)
+        chunk_size: Righe per blocco / transazione
+        keep_ids: Importa anche la colonna 'id' come chiave primaria
+    """
+    
+    def __init__(self, meta_model, model_class, column_map=None, fk_lookups=None,
+                 chunk_size=IMPORT_CHUNK_SIZE, keep_ids=False):
+        self.meta_model = meta_model
+        self.model_class = model_class
+        self.column_map = column_map or {}
+        self.fk_lookups = fk_lookups or {}
+        self.chunk_size = chunk_size
+        self.keep_ids = keep_ids
+        self.plans = None
+        self.id_column = None
+        self.ignored_columns = []
+    
+    def compile(self, columns):
+        """
+        Associa le colonne del file ai campi e compila i convertitori
+        
+        Raises:
+            DataImportError: se una colonna o un lookup indicati non esistono
+        """
+        meta_fields = {field.name: field for field in self.meta_model.fields.all()}
+        
+        unknown_targets = [name for name in self.column_map.values() if name not in meta_fields and name != 'id']
+        if unknown_targets:
+            raise DataImportError(f"Campi inesistenti in {self.meta_model.name}: {', '.join(unknown_targets)}")
+        
+        missing_columns = [column for column in self.column_map if column not in columns]
+        if missing_columns:
+            raise DataImportError(f"Colonne non presenti nel file: {', '.join(missing_columns)}")
+        
+        field_to_column = {name: name for name in columns if name in meta_fields or name == 'id'}
+        field_to_column.update({field: column for column, field in self.column_map.items()})
+        
+        plans = []
+        for field_name, source in field_to_column.items():
+            if field_name == 'id':
+                continue
+            meta_field = meta_fields[field_name]
+            lookup = self.fk_lookups.get(field_name)
+            
+            if lookup and meta_field.field_type not in RELATION_FIELD_TYPES:
+                raise DataImportError(f"--fk-lookup indicato per '{field_name}', che non è una relazione")
+            
+            try:
+                plans.append(ColumnPlan(meta_field, self.model_class._meta.get_field(field_name), source, lookup))
+            except Exception as e:
+                raise DataImportError(f"Lookup '{lookup}' non valido per '{field_name}': {e}")
+        
+        self.id_column = field_to_column.get('id') if self.keep_ids else None
+        self.plans = plans
+        used = set(field_to_column.values())
+        self.ignored_columns = [column for column in columns if column not in used]
+        return plans
+    
+    def run(self, rows, offset=0, on_chunk=None, save_progress=None):
+        """
+        Importa le righe a blocchi, saltando le prime `offset`
+        
+        Args:
+            rows: Iterabile di dizionari (vedi iter_source_rows)
+            offset: Numero di righe già importate da saltare (ripresa)
+            on_chunk: Funzione opzionale chiamata con le statistiche dopo ogni blocco
+                confermato; se restituisce False l'importazione si interrompe
+            save_progress: Funzione opzionale chiamata con le statistiche nella
+                transazione del blocco: l'avanzamento salvato nel database viene
+                confermato insieme alle righe (ripresa senza blocchi duplicati)
+        
+        Returns:
+            Dizionario con offset, imported, rejected, errors, elapsed
+        """
+        stats = {'offset': offset, 'imported': 0, 'rejected': 0, 'errors': [], 'elapsed': 0.0}
+        started = time.monotonic()
+        rows = iter(rows)
+        
+        # Le righe già importate vengono lette e scartate senza conversione
+        for _ in islice(rows, offset):
+            pass
+        
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            
+            if self.plans is None:
+                self.compile(list(chunk[0].keys()))
+            
+            instances, m2m_values, conversion_errors = self.convert_chunk(chunk, stats['offset'])
+            
+            with transaction.atomic():
+                write_errors = self.write_chunk(instances, m2m_values)
+                errors = conversion_errors + write_errors
+                
+                stats['offset'] += len(chunk)
+                stats['imported'] += len(instances) - len(write_errors)
+                stats['rejected'] += len(errors)
+                stats['errors'].extend(errors[:MAX_REPORTED_ERRORS - len(stats['errors'])])
+                stats['elapsed'] = time.monotonic() - started
+                
+                if save_progress is not None:
+                    save_progress(stats)
+            
+            if on_chunk is not None and on_chunk(stats) is False:
+                break
+        
+        stats['elapsed'] = time.monotonic() - started
+        return stats
+    
+    def convert_chunk(self, chunk, first_row):
+        """
+        Converte un blocco di righe in istanze del modello
+        
+        Returns:
+            Tupla (istanze, valori m2m per istanza, errori di conversione)
+        """
+        related_keys = self._resolve_related_keys(chunk)
+        instances = []
+        m2m_values = []
+        errors = []
+        
+        for position, row in enumerate(chunk):
+            row_number = first_row + position + 1
+            values = {}
+            m2m = {}
+            
+            try:
+                if self.id_column is not None:
+                    values['id'] = _to_int(row[self.id_column])
+                
+                for plan in self.plans:
+                    value = self._convert_value(plan, row.get(plan.source), related_keys)
+                    if plan.field.many_to_many:
+                        m2m[plan.name] = value
+                    else:
+                        values[plan.field.attname] = value
+            except (ValueError, TypeError, KeyError) as e:
+                errors.append({'row': row_number, 'error': f"{getattr(e, 'field_name', '')}{e}"})
+                continue
+            
+            instance = self.model_class(**values)
+            instance._import_row = row_number
+            instances.append(instance)
+            m2m_values.append(m2m)
+        
+        return instances, m2m_values, errors
+    
+    def _convert_value(self, plan, raw_value, related_keys):
+        try:
+            if plan.field.many_to_many:
+                return [related_keys[plan.name][key] for key in self._split_keys(plan, raw_value)]
+            
+            if raw_value is None or (raw_value == '' and not plan.is_text):
+                if not plan.nullable:
+                    raise ValueError('valore obbligatorio')
+                return None
+            
+            if plan.is_relation:
+                key = plan.lookup_field.to_python(raw_value)
+                if key not in related_keys[plan.name]:
+                    raise ValueError(f"nessun {plan.related_model.__name__} con {plan.lookup}={raw_value}")
+                return related_keys[plan.name][key]
+            
+            return plan.convert(raw_value)
+        
+        except KeyError as e:
+            error = ValueError(f"nessun {plan.related_model.__name__} con {plan.lookup}={e.args[0]}")
+            error.field_name = f"{plan.name}: "
+            raise error
+        except Exception as e:
+            error = ValueError(' '.join(getattr(e, 'messages', [str(e)])))
+            error.field_name = f"{plan.name}: "
+            raise error
+    
+    def _split_keys(self, plan, raw_value):
+        if raw_value in (None, ''):
+            return []
+        if isinstance(raw_value, list):
+            values = raw_value
+        else:
+            values = [item for item in str(raw_value).split(CSV_MULTI_VALUE_SEPARATOR) if item.strip()]
+        return [plan.lookup_field.to_python(value) for value in values]
+    
+    def _resolve_related_keys(self, chunk):
+        """Una query per campo relazionale: {campo: {chiave: pk collegato}}"""
+        related_keys = {}
+        
+        for plan in self.plans:
+            if not plan.is_relation:
+                continue
+            
+            keys = set()
+            for row in chunk:
+                try:
+                    if plan.field.many_to_many:
+                        keys.update(self._split_keys(plan, row.get(plan.source)))
+                    elif row.get(plan.source) not in (None, ''):
+                        keys.add(plan.lookup_field.to_python(row[plan.source]))
+                except Exception:
+                    # Il valore non valido viene segnalato durante la conversione della riga
+                    continue
+            
+            related_keys[plan.name] = dict(
+                plan.related_model._default_manager.filter(**{f'{plan.lookup}__in': keys})
+                .values_list(plan.lookup, 'pk')
+            ) if keys else {}
+        
+        return related_keys
+    
+    def write_chunk(self, instances, m2m_values):
+        """
+        Scrive un blocco in una transazione (un savepoint se run() ne ha già aperta
+        una per il blocco). Se il database rifiuta il blocco
+        (es. vincolo unique) le righe vengono riprovate una per una per isolare
+        quelle non valide.
+        
+        Returns:
+            Lista degli errori di scrittura
+        """
+        if not instances:
+            return []
+        
+        try:
+            with transaction.atomic():
+                self._save(instances, m2m_values)
+            return []
+        except IntegrityError:
+            pass
+        
+        errors = []
+        with transaction.atomic():
+            for instance, m2m in zip(instances, m2m_values):
+                try:
+                    with transaction.atomic():
+                        instance.pk = instance.pk if self.id_column is not None else None
+                        self._save([instance], [m2m])
+                except IntegrityError as e:
+                    errors.append({'row': instance._import_row, 'error': str(e)})
+        return errors
+    
+    def _save(self, instances, m2m_values):
+        self.model_class.objects.bulk_create(instances)
+        
+        for field in self.model_class._meta.many_to_many:
+            through = field.remote_field.through
+            source = f'{field.m2m_field_name()}_id'
+            target = f'{field.m2m_reverse_field_name()}_id'
+            links = [
+                through(**{source: instance.pk, target: related_pk})
+                for instance, m2m in zip(instances, m2m_values)
+                for related_pk in m2m.get(field.name, [])
+                if instance.pk is not None
+            ]
+            if links:
+                through.objects.bulk_create(links, ignore_conflicts=True)
+
+
+def detect_format(path, format_type=None):
+    """Restituisce 'csv' o 'ndjson' dall'opzione o dall'estensione del file"""
+    format_type = format_type or os.path.splitext(path)[1].lstrip('.').lower()
+    if format_type in ('jsonl', 'ndjson'):
+        return 'ndjson'
+    if format_type == 'csv':
+        return 'csv'
+    raise DataImportError(f"Formato '{format_type}' non supportato: usa csv o ndjson")
+
+
+def iter_source_rows(source, format_type, delimiter=','):
+    """
+    Legge un file di testo aperto riga per riga
+    
+    Yields:
+        Dizionari colonna -> valore (stringhe per CSV, tipi JSON per NDJSON)
+    """
+    if format_type == 'csv':
+        yield from csv.DictReader(source, delimiter=delimiter)
+        return
+    
+    for line_number, line in enumerate(source, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            raise DataImportError(f"NDJSON non valido alla riga {line_number}: {e}")
+        if not isinstance(row, dict):
+            raise DataImportError(f"Riga {line_number}: ogni riga NDJSON deve essere un oggetto")
+        yield row
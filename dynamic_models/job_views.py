@@ -0,0 +1,166 @@
+from rest_framework import mixins, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from django.http import FileResponse
+from .dynamic_manager import dynamic_model_manager
+from .exporters import COLUMNAR_CONTENT_TYPES, EXPORT_CONTENT_TYPES
+from .importers import DataImportError, detect_format
+from .jobs import get_filter_params
+from .models import DataJob, MetaModel
+from .query_dsl import QueryDSLError, compile_filters, get_field_types
+import json
+import os
+
+
+class DataJobSerializer(serializers.ModelSerializer):
+    meta_model = serializers.SlugRelatedField(
+        slug_field='name',
+        queryset=MetaModel.objects.filter(is_active=True)
+    )
+    progress = serializers.FloatField(read_only=True)
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = DataJob
+        fields = ['id', 'meta_model', 'job_type', 'status', 'params', 'source_file',
+                  'processed', 'total', 'progress', 'result', 'error', 'cancel_requested',
+                  'download_url', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = ['status', 'processed', 'total', 'result', 'error', 'cancel_requested',
+                            'created_at', 'started_at', 'finished_at']
+        extra_kwargs = {'source_file': {'write_only': True}}
+    
+    def get_download_url(self, obj):
+        if not obj.result_file:
+            return None
+        request = self.context.get('request')
+        url = f'/api/jobs/{obj.pk}/download/'
+        return request.build_absolute_uri(url) if request else url
+    
+    def to_internal_value(self, data):
+        # Con multipart/form-data i parametri arrivano come stringa JSON
+        if hasattr(data, 'getlist') and isinstance(data.get('params'), str):
+            data = data.copy()
+            try:
+                data['params'] = json.loads(data['params'] or '{}')
+            except ValueError:
+                raise serializers.ValidationError({'params': 'JSON non valido'})
+            data = data.dict()
+        return super().to_internal_value(data)
+    
+    def validate(self, attrs):
+        job_type = attrs['job_type']
+        params = attrs.get('params') or {}
+        
+        if not isinstance(params, dict):
+            raise serializers.ValidationError({'params': 'Deve essere un oggetto JSON'})
+        
+        if job_type == DataJob.TYPE_IMPORT:
+            source_file = attrs.get('source_file')
+            if not source_file:
+                raise serializers.ValidationError({'source_file': 'Obbligatorio per i job di importazione'})
+            try:
+                detect_format(source_file.name, params.get('format'))
+            except DataImportError as e:
+                raise serializers.ValidationError({'source_file': str(e)})
+        
+        elif job_type == DataJob.TYPE_EXPORT:
+            format_type = params.setdefault('format', 'csv')
+            if format_type not in EXPORT_CONTENT_TYPES and format_type not in COLUMNAR_CONTENT_TYPES:
+                raise serializers.ValidationError({'params': f"Formato di esportazione non supportato: {format_type}"})
+        
+        elif job_type == DataJob.TYPE_BULK_DELETE:
+            self._validate_delete_filter(attrs['meta_model'], params)
+        
+        attrs['params'] = params
+        return attrs
+    
+    def _validate_delete_filter(self, meta_model, params):
+        """Compila il filtro subito: gli errori vengono segnalati alla creazione del job"""
+        if not params.get('filter'):
+            raise serializers.ValidationError({
+                'params': "La cancellazione massiva richiede un filtro: usa {\"filter\": {\"campo__op\": valore}}"
+            })
+        
+        model_class = dynamic_model_manager.get_model(meta_model.name)
+        if model_class is None:
+            raise serializers.ValidationError({'meta_model': f"Modello '{meta_model.name}' non caricato"})
+        
+        try:
+            field_types = get_field_types(model_class, list(meta_model.fields.all()))
+            q_object, _ = compile_filters(model_class, field_types, get_filter_params(params))
+        except (QueryDSLError, AttributeError, TypeError) as e:
+            raise serializers.ValidationError({'params': f"Filtro non valido: {e}"})
+        
+        if not q_object:
+            raise serializers.ValidationError({'params': 'Il filtro non contiene condizioni valide'})
+
+
+class DataJobViewSet(mixins.CreateModelMixin,
+                     mixins.ListModelMixin,
+                     mixins.RetrieveModelMixin,
+                     viewsets.GenericViewSet):
+    """
+    Job in background sui dati dei modelli dinamici (import, export, cancellazione massiva).
+    I job vengono eseguiti dai worker di `manage.py run_dynamic_jobs`.
+    """
+    queryset = DataJob.objects.select_related('meta_model')
+    serializer_class = DataJobSerializer
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser, FormParser, JSONParser]
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        for param in ['status', 'job_type']:
+            value = self.request.query_params.get(param)
+            if value:
+                queryset = queryset.filter(**{param: value})
+        
+        meta_model = self.request.query_params.get('meta_model')
+        if meta_model:
+            queryset = queryset.filter(meta_model__name=meta_model)
+        
+        return queryset
+    
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Annulla un job: subito se è in attesa, al prossimo blocco se è in esecuzione"""
+        job = self.get_object()
+        
+        if job.is_finished:
+            return Response(
+                {'error': f'Il job è già terminato ({job.status})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Aggiornamenti condizionati sullo stato: il worker potrebbe prenderlo in carico nel frattempo
+        cancelled = DataJob.objects.filter(pk=job.pk, status=DataJob.STATUS_PENDING).update(
+            status=DataJob.STATUS_CANCELLED, cancel_requested=True
+        )
+        if not cancelled:
+            DataJob.objects.filter(pk=job.pk).update(cancel_requested=True)
+        
+        job.refresh_from_db()
+        return Response(self.get_serializer(job).data)
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Scarica il file prodotto da un job di esportazione"""
+        job = self.get_object()
+        
+        if not job.result_file:
+            return Response(
+                {'error': 'Il job non ha prodotto un file'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return FileResponse(
+            job.result_file.open('rb'),
+            as_attachment=True,
+            filename=os.path.basename(job.result_file.name),
+        )
@@ -0,0 +1,359 @@
+"""
+Esecuzione in background dei job sui dati dei modelli dinamici (vedi DataJob).
+
+I job vengono creati dall'API (/api/jobs/) ed eseguiti dai worker avviati con
+`python manage.py run_dynamic_jobs --workers N`, fuori dal ciclo delle richieste.
+"""
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.core.files import File
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .counters import get_row_count
+from .dynamic_manager import dynamic_model_manager
+from .exporters import (
+    COLUMNAR_CONTENT_TYPES, EXPORT_CHUNK_SIZE, iter_export_content, write_columnar
+)
+from .importers import IMPORT_CHUNK_SIZE, DynamicImporter, detect_format, iter_source_rows
+from .models import DataJob
+from .query_dsl import compile_filters, get_field_types
+
+
+BULK_DELETE_CHUNK_SIZE = 1000
+
+# Un job "running" senza heartbeat da questo intervallo appartiene a un worker terminato
+STALE_JOB_TIMEOUT = timedelta(minutes=10)
+# Ogni quanto i worker cercano job interrotti da rimettere in coda
+STALE_JOB_CHECK_INTERVAL = timedelta(minutes=1)
+# Ogni quanto un job in esecuzione aggiorna l'heartbeat, anche durante un blocco lungo
+HEARTBEAT_INTERVAL = timedelta(minutes=1)
+
+
+class JobCancelled(Exception):
+    """Annullamento richiesto durante l'esecuzione"""
+
+
+class JobLost(Exception):
+    """Il job non appartiene più al worker (rimesso in coda o preso da un altro worker)"""
+
+
+def get_worker_name(index=0):
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+def claim_next_job(worker_name):
+    """
+    Prende in carico il job in attesa più vecchio. L'assegnazione è un UPDATE
+    condizionato sullo stato: se un altro worker lo ha preso prima si passa al successivo.
+    
+    Returns:
+        DataJob o None se non ci sono job in attesa
+    """
+    while True:
+        job_id = DataJob.objects.filter(
+            status=DataJob.STATUS_PENDING
+        ).order_by('created_at', 'pk').values_list('pk', flat=True).first()
+        
+        if job_id is None:
+            return None
+        
+        now = timezone.now()
+        claimed = DataJob.objects.filter(pk=job_id, status=DataJob.STATUS_PENDING).update(
+            status=DataJob.STATUS_RUNNING,
+            worker=worker_name,
+            started_at=now,
+            heartbeat_at=now,
+        )
+        if claimed:
+            return DataJob.objects.select_related('meta_model').get(pk=job_id)
+
+
+def requeue_stale_jobs(timeout=STALE_JOB_TIMEOUT):
+    """Rimette in coda i job rimasti "running" dopo la terminazione del loro worker"""
+    return DataJob.objects.filter(
+        status=DataJob.STATUS_RUNNING,
+        heartbeat_at__lt=timezone.now() - timeout,
+    ).update(status=DataJob.STATUS_PENDING, worker='')
+
+
+def _owned(job):
+    """Il job finché è in esecuzione su questo worker"""
+    return DataJob.objects.filter(pk=job.pk, status=DataJob.STATUS_RUNNING, worker=job.worker)
+
+
+def save_progress(job, processed, total=None, result=None):
+    """
+    Salva l'avanzamento solo se il job appartiene ancora al worker
+    
+    Raises:
+        JobLost: se il job è stato rimesso in coda o preso da un altro worker
+    """
+    updates = {'processed': processed, 'heartbeat_at': timezone.now()}
+    if total is not None:
+        updates['total'] = total
+    if result is not None:
+        updates['result'] = result
+    
+    if not _owned(job).update(**updates):
+        raise JobLost()
+    job.processed = processed
+
+
+def check_cancelled(job):
+    """
+    Raises:
+        JobCancelled: se cancel_requested è stato impostato dall'API
+    """
+    if DataJob.objects.filter(pk=job.pk, cancel_requested=True).exists():
+        raise JobCancelled()
+
+
+def checkpoint(job, processed, total=None):
+    """Salva l'avanzamento e verifica se è stato richiesto l'annullamento"""
+    save_progress(job, processed, total)
+    check_cancelled(job)
+
+
+class JobHeartbeat(threading.Thread):
+    """
+    Aggiorna l'heartbeat di un job ogni HEARTBEAT_INTERVAL in un thread separato:
+    un blocco più lungo di STALE_JOB_TIMEOUT non fa rimettere in coda il job
+    mentre è ancora in esecuzione
+    """
+    
+    def __init__(self, job, interval=None):
+        super().__init__(name=f'heartbeat-job-{job.pk}', daemon=True)
+        self.job = job
+        self.interval = (interval or HEARTBEAT_INTERVAL).total_seconds()
+        self._stopped = threading.Event()
+    
+    def run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                try:
+                    _owned(self.job).update(heartbeat_at=timezone.now())
+                except Exception as e:
+                    print(f"⚠️  Heartbeat del job #{self.job.pk} non salvato: {e}")
+        finally:
+            # Connessione al database propria del thread
+            connection.close()
+    
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def run_job(job):
+    """Esegue un job già preso in carico e ne registra l'esito"""
+    handlers = {
+        DataJob.TYPE_IMPORT: _run_import,
+        DataJob.TYPE_EXPORT: _run_export,
+        DataJob.TYPE_BULK_DELETE: _run_bulk_delete,
+    }
+    
+    # Il worker non passa dal middleware: applica qui le modifiche allo schema
+    dynamic_model_manager.sync_schema_version()
+    
+    status = DataJob.STATUS_COMPLETED
+    error = ''
+    result = {}
+    
+    heartbeat = JobHeartbeat(job)
+    heartbeat.start()
+    try:
+        model_class = dynamic_model_manager.get_model(job.meta_model.name)
+        if model_class is None:
+            raise ValueError(f"Modello '{job.meta_model.name}' non caricato")
+        
+        result = handlers[job.job_type](job, model_class) or {}
+    
+    except JobLost:
+        print(f"⚠️  Job #{job.pk} ({job.job_type}) non più assegnato a {job.worker}: interrotto")
+        return job
+    except JobCancelled:
+        status = DataJob.STATUS_CANCELLED
+    except Exception as e:
+        status = DataJob.STATUS_FAILED
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        heartbeat.stop()
+    
+    if status != DataJob.STATUS_COMPLETED:
+        # Conserva i risultati parziali salvati durante l'esecuzione
+        result = DataJob.objects.filter(pk=job.pk).values_list('result', flat=True).first() or {}
+    
+    job.status = status
+    job.error = error
+    job.result = result
+    job.finished_at = timezone.now()
+    
+    # L'esito viene salvato solo se il job appartiene ancora al worker
+    if not _owned(job).update(
+        status=status, error=error, result=result, finished_at=job.finished_at,
+        result_file=job.result_file.name or '',
+    ):
+        print(f"⚠️  Job #{job.pk} ({job.job_type}) non più assegnato a {job.worker}: esito scartato")
+        return job
+    
+    print(f"{'✅' if status == DataJob.STATUS_COMPLETED else '⚠️ '} Job #{job.pk} ({job.job_type}) {status}")
+    return job
+
+
+def _run_import(job, model_class):
+    params = job.params
+    path = job.source_file.path
+    format_type = detect_format(job.source_file.name, params.get('format'))
+    
+    importer = DynamicImporter(
+        job.meta_model, model_class,
+        column_map=params.get('map'),
+        fk_lookups=params.get('fk_lookups'),
+        chunk_size=int(params.get('chunk_size') or IMPORT_CHUNK_SIZE),
+        keep_ids=bool(params.get('keep_ids')),
+    )
+    
+    # Totale approssimato (righe del file): una lettura veloce in binario
+    total = _count_lines(path) - (1 if format_type == 'csv' else 0)
+    
+    # Un job rimesso in coda riprende dall'ultimo blocco confermato: offset e
+    # conteggi sono salvati nella transazione del blocco, insieme alle righe
+    offset = job.processed
+    imported_before = job.result.get('imported', 0)
+    rejected_before = job.result.get('rejected', 0)
+    
+    def save_chunk_progress(stats):
+        save_progress(job, stats['offset'], total, result={
+            'imported': imported_before + stats['imported'],
+            'rejected': rejected_before + stats['rejected'],
+        })
+    
+    def on_chunk(stats):
+        check_cancelled(job)
+    
+    with open(path, encoding='utf-8-sig', newline='') as source:
+        stats = importer.run(
+            iter_source_rows(source, format_type), offset=offset,
+            on_chunk=on_chunk, save_progress=save_chunk_progress,
+        )
+    
+    return {
+        'imported': imported_before + stats['imported'],
+        'rejected': rejected_before + stats['rejected'],
+        'errors': stats['errors'],
+        'ignored_columns': importer.ignored_columns,
+        'elapsed': round(stats['elapsed'], 1),
+    }
+
+
+def _run_export(job, model_class):
+    format_type = job.params.get('format', 'csv')
+    chunk_size = int(job.params.get('chunk_size') or EXPORT_CHUNK_SIZE)
+    total = get_row_count(model_class)
+    checkpoint(job, 0, total)
+    
+    def on_chunk(processed):
+        checkpoint(job, processed)
+    
+    with tempfile.TemporaryFile() as temporary_file:
+        if format_type in COLUMNAR_CONTENT_TYPES:
+            write_columnar(
+                temporary_file, job.meta_model, model_class, format_type,
+                chunk_size=chunk_size, on_chunk=on_chunk
+            )
+        else:
+            for piece in iter_export_content(
+                job.meta_model, model_class, format_type, chunk_size=chunk_size, on_chunk=on_chunk
+            ):
+                temporary_file.write(piece.encode('utf-8'))
+        
+        temporary_file.seek(0)
+        job.result_file.save(f'{job.meta_model.name}_job{job.pk}.{format_type}', File(temporary_file), save=False)
+    
+    return {'exported': job.processed, 'format': format_type}
+
+
+def _run_bulk_delete(job, model_class):
+    field_types = get_field_types(model_class, list(job.meta_model.fields.all()))
+    q_object, _ = compile_filters(model_class, field_types, get_filter_params(job.params))
+    
+    queryset = model_class.objects.filter(q_object)
+    total = queryset.count()
+    deleted = 0
+    checkpoint(job, 0, total)
+    
+    # Cancella a blocchi per chiave primaria: transazioni brevi e annullabili
+    while True:
+        pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:BULK_DELETE_CHUNK_SIZE])
+        if not pks:
+            break
+        
+        with transaction.atomic():
+            model_class.objects.filter(pk__in=pks).delete()
+        
+        deleted += len(pks)
+        checkpoint(job, deleted)
+    
+    return {'deleted': deleted}
+
+
+def get_filter_params(params):
+    """
+    Parametri di filtro di un job bulk_delete nel formato di compile_filters:
+    il filtro JSON annidato può essere passato come oggetto invece che come stringa
+    """
+    filter_params = dict(params.get('filter') or {})
+    if isinstance(filter_params.get('filter'), (dict, list)):
+        filter_params['filter'] = json.dumps(filter_params['filter'])
+    return filter_params
+
+
+def _count_lines(path):
+    lines = 0
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(1024 * 1024), b''):
+            lines += block.count(b'\n')
+    return lines
+
+
+def worker_loop(worker_name, poll_interval=2.0, once=False):
+    """
+    Ciclo di un worker: prende in carico ed esegue job finché ce ne sono,
+    poi attende poll_interval secondi. Con once=True termina alla coda vuota.
+    
+    All'avvio e poi ogni STALE_JOB_CHECK_INTERVAL rimette in coda i job dei
+    worker terminati senza aggiornare lo stato (vedi requeue_stale_jobs).
+    """
+    print(f"👷 Worker {worker_name} avviato")
+    next_stale_check = 0
+    
+    while True:
+        close_old_connections()
+        
+        if time.monotonic() >= next_stale_check:
+            requeued = requeue_stale_jobs()
+            if requeued:
+                print(f"↪️  {requeued} job interrotti rimessi in coda da {worker_name}")
+            next_stale_check = time.monotonic() + STALE_JOB_CHECK_INTERVAL.total_seconds()
+        
+        job = claim_next_job(worker_name)
+        
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        
+        print(f"▶️  Job #{job.pk} ({job.job_type} {job.meta_model.name}) su {worker_name}")
+        try:
+            run_job(job)
+        except Exception as e:
+            # Errore nel salvataggio dell'esito (es. database non raggiungibile): il worker
+            # resta attivo e il job, senza più heartbeat, verrà rimesso in coda
+            print(f"❌ Job #{job.pk}: esito non salvato ({type(e).__name__}: {e})")
@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand, CommandError
+from dynamic_models.models import MetaModel
+from dynamic_models.dynamic_manager import dynamic_model_manager
+from dynamic_models.exporters import (
+    COLUMNAR_CONTENT_TYPES, EXPORT_CHUNK_SIZE, EXPORT_CONTENT_TYPES,
+    ColumnarExportUnavailable, iter_export_content, write_columnar
+)
+import os
+import time
+
+
+class Command(BaseCommand):
+    help = 'Esporta i dati di un modello dinamico in JSON, NDJSON, CSV, Parquet o Arrow IPC'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'model_name',
+            help='Nome del MetaModel da esportare'
+        )
+        
+        parser.add_argument(
+            'output',
+            help='Percorso del file di destinazione'
+        )
+        
+        parser.add_argument(
+            '--format',
+            choices=sorted(list(EXPORT_CONTENT_TYPES) + list(COLUMNAR_CONTENT_TYPES)),
+            help='Formato di esportazione (default: dedotto dall\'estensione del file)'
+        )
+        
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help='Record letti dal database per blocco / record batch'
+        )
+
+    def handle(self, *args, **options):
+        output = options['output']
+        format_type = options['format'] or os.path.splitext(output)[1].lstrip('.').lower()
+        
+        if format_type not in EXPORT_CONTENT_TYPES and format_type not in COLUMNAR_CONTENT_TYPES:
+            raise CommandError(
+                f"Formato '{format_type}' non riconosciuto: usa --format "
+                f"({', '.join(sorted(list(EXPORT_CONTENT_TYPES) + list(COLUMNAR_CONTENT_TYPES)))})"
+            )
+        
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size deve essere un intero positivo')
+        
+        try:
+            meta_model = MetaModel.objects.get(name=options['model_name'], is_active=True)
+        except MetaModel.DoesNotExist:
+            raise CommandError(f"MetaModel '{options['model_name']}' non trovato o non attivo")
+        
+        model_class = dynamic_model_manager.get_model(meta_model.name)
+        if not model_class:
+            raise CommandError(f"Modello '{meta_model.name}' non caricato")
+        
+        started = time.monotonic()
+        
+        if format_type in COLUMNAR_CONTENT_TYPES:
+            try:
+                count = write_columnar(
+                    output, meta_model, model_class, format_type, chunk_size=options['chunk_size']
+                )
+            except ColumnarExportUnavailable as e:
+                raise CommandError(str(e))
+            
+            summary = f'{count} record'
+        else:
+            with open(output, 'w', encoding='utf-8', newline='') as destination:
+                for piece in iter_export_content(
+                    meta_model, model_class, format_type, chunk_size=options['chunk_size']
+                ):
+                    destination.write(piece)
+            
+            summary = f'{os.path.getsize(output)} byte'
+        
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {meta_model.name} esportato in {output} ({format_type}, {summary}, {elapsed:.1f}s)'
+        ))
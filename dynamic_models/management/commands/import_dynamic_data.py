@@ -0,0 +1,198 @@
+from django.core.management.base import BaseCommand, CommandError
+from dynamic_models.models import MetaModel
+from dynamic_models.dynamic_manager import dynamic_model_manager
+from dynamic_models.importers import (
+    IMPORT_CHUNK_SIZE, DataImportError, DynamicImporter, detect_format, iter_source_rows
+)
+import json
+import os
+
+
+class Command(BaseCommand):
+    help = 'Importa un file CSV o NDJSON in un modello dinamico (bulk_create a blocchi, riprendibile)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'model_name',
+            help='Nome del MetaModel di destinazione'
+        )
+        
+        parser.add_argument(
+            'file',
+            help='File CSV o NDJSON da importare'
+        )
+        
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'ndjson'],
+            help='Formato del file (default: dedotto dall\'estensione)'
+        )
+        
+        parser.add_argument(
+            '--map',
+            action='append',
+            default=[],
+            metavar='COLONNA=CAMPO',
+            help='Associa una colonna del file a un campo (ripetibile)'
+        )
+        
+        parser.add_argument(
+            '--fk-lookup',
+            action='append',
+            default=[],
+            metavar='CAMPO=CAMPO_COLLEGATO',
+            help='Risolve una relazione tramite un campo del modello collegato invece della chiave primaria (ripetibile)'
+        )
+        
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help='Righe per blocco (una transazione per blocco)'
+        )
+        
+        parser.add_argument(
+            '--offset',
+            type=int,
+            help='Salta le prime N righe di dati (ripresa manuale)'
+        )
+        
+        parser.add_argument(
+            '--state-file',
+            help='File JSON in cui salvare l\'offset dopo ogni blocco; se esiste l\'importazione riprende da lì'
+        )
+        
+        parser.add_argument(
+            '--keep-ids',
+            action='store_true',
+            help='Importa la colonna id come chiave primaria'
+        )
+        
+        parser.add_argument(
+            '--delimiter',
+            default=',',
+            help='Separatore delle colonne CSV'
+        )
+        
+        parser.add_argument(
+            '--max-errors',
+            type=int,
+            default=1000,
+            help='Interrompe l\'importazione oltre questo numero di righe scartate (0 = nessun limite)'
+        )
+
+    def handle(self, *args, **options):
+        path = options['file']
+        if not os.path.exists(path):
+            raise CommandError(f'File non trovato: {path}')
+        
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size deve essere un intero positivo')
+        
+        try:
+            format_type = detect_format(path, options['format'])
+            column_map = self._parse_pairs(options['map'], '--map')
+            fk_lookups = self._parse_pairs(options['fk_lookup'], '--fk-lookup')
+        except DataImportError as e:
+            raise CommandError(str(e))
+        
+        try:
+            meta_model = MetaModel.objects.get(name=options['model_name'], is_active=True)
+        except MetaModel.DoesNotExist:
+            raise CommandError(f"MetaModel '{options['model_name']}' non trovato o non attivo")
+        
+        model_class = dynamic_model_manager.get_model(meta_model.name)
+        if not model_class:
+            raise CommandError(f"Modello '{meta_model.name}' non caricato")
+        
+        state_file = options['state_file']
+        offset = self._initial_offset(options['offset'], state_file, path)
+        
+        importer = DynamicImporter(
+            meta_model, model_class,
+            column_map=column_map,
+            fk_lookups=fk_lookups,
+            chunk_size=options['chunk_size'],
+            keep_ids=options['keep_ids'],
+        )
+        max_errors = options['max_errors']
+        
+        def on_chunk(stats):
+            rate = (stats['offset'] - offset) / stats['elapsed'] if stats['elapsed'] else 0
+            self.stdout.write(
+                f"⏳ {stats['offset']} righe lette, {stats['imported']} importate, "
+                f"{stats['rejected']} scartate ({rate:.0f} righe/s)"
+            )
+            if importer.ignored_columns and stats['offset'] - offset <= importer.chunk_size:
+                self.stdout.write(self.style.WARNING(
+                    f"⚠️  Colonne ignorate: {', '.join(importer.ignored_columns)}"
+                ))
+            if state_file:
+                self._save_state(state_file, path, stats)
+            if max_errors and stats['rejected'] > max_errors:
+                return False
+        
+        if offset:
+            self.stdout.write(f'↪️  Ripresa dalla riga {offset}')
+        
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as source:
+                stats = importer.run(
+                    iter_source_rows(source, format_type, options['delimiter']),
+                    offset=offset,
+                    on_chunk=on_chunk,
+                )
+        except DataImportError as e:
+            raise CommandError(str(e))
+        
+        for error in stats['errors']:
+            self.stdout.write(self.style.WARNING(f"   Riga {error['row']}: {error['error']}"))
+        
+        if max_errors and stats['rejected'] > max_errors:
+            raise CommandError(
+                f"Importazione interrotta: {stats['rejected']} righe scartate (limite {max_errors}). "
+                f"Le righe fino alla {stats['offset']} sono state elaborate"
+            )
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {stats['imported']} record importati in {meta_model.name}, "
+            f"{stats['rejected']} scartati ({stats['elapsed']:.1f}s)"
+        ))
+
+    def _parse_pairs(self, values, option):
+        """Converte ['a=b', ...] in {'a': 'b'}"""
+        pairs = {}
+        for value in values:
+            key, separator, target = value.partition('=')
+            if not separator or not key or not target:
+                raise DataImportError(f'{option} richiede il formato chiave=valore, ricevuto: {value}')
+            pairs[key.strip()] = target.strip()
+        return pairs
+
+    def _initial_offset(self, offset, state_file, path):
+        """Offset esplicito, oppure quello salvato nel file di stato per lo stesso file"""
+        if offset is not None:
+            if offset < 0:
+                raise CommandError('--offset non può essere negativo')
+            return offset
+        
+        if state_file and os.path.exists(state_file):
+            with open(state_file, encoding='utf-8') as handle:
+                state = json.load(handle)
+            if state.get('file') != os.path.abspath(path):
+                raise CommandError(f"Il file di stato {state_file} si riferisce a {state.get('file')}")
+            return state.get('offset', 0)
+        
+        return 0
+
+    def _save_state(self, state_file, path, stats):
+        """Salva l'offset in modo atomico (scrittura su file temporaneo e rename)"""
+        temporary_path = f'{state_file}.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as handle:
+            json.dump({
+                'file': os.path.abspath(path),
+                'offset': stats['offset'],
+                'imported': stats['imported'],
+                'rejected': stats['rejected'],
+            }, handle)
+        os.replace(temporary_path, state_file)
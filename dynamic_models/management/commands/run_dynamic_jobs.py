@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from dynamic_models.jobs import get_worker_name, worker_loop
+import multiprocessing
+
+
+def _worker_process(index, poll_interval, once):
+    """Punto di ingresso dei processi worker"""
+    import django
+    django.setup()
+    
+    # Ogni processo apre le proprie connessioni al database
+    connections.close_all()
+    worker_loop(get_worker_name(index), poll_interval, once)
+
+
+class Command(BaseCommand):
+    help = 'Avvia i worker che eseguono i job di import/export/cancellazione dei modelli dinamici'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Numero di processi worker'
+        )
+        
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Secondi di attesa quando la coda è vuota'
+        )
+        
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Termina quando non ci sono più job in attesa'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers <= 0:
+            raise CommandError('--workers deve essere un intero positivo')
+        
+        if workers == 1:
+            worker_loop(get_worker_name(), options['poll_interval'], options['once'])
+            return
+        
+        # Le connessioni del processo padre non vanno condivise con i figli
+        connections.close_all()
+        
+        processes = [
+            multiprocessing.Process(
+                target=_worker_process,
+                args=(index, options['poll_interval'], options['once']),
+                name=f'dynamic-jobs-{index}',
+            )
+            for index in range(workers)
+        ]
+        
+        for process in processes:
+            process.start()
+        
+        self.stdout.write(self.style.SUCCESS(f'👷 {workers} worker avviati (Ctrl+C per terminare)'))
+        
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('⏹️  Arresto dei worker...'))
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
@@ -1,8 +1,180 @@
 from django.utils.deprecation import MiddlewareMixin
+from django.db import transaction
 from django.db.models.signals import post_save, pre_delete
-from django.dispatch import receiver
+from functools import partial
 from .models import MetaModel, MetaField
 from .dynamic_manager import dynamic_model_manager
+import threading
+import weakref
+
+
+# Modifiche ai MetaField in attesa del commit, per thread e per transazione:
+# id del blocco atomic più esterno -> _PendingChanges
+_pending = threading.local()
+
+
+class _PendingChanges(dict):
+    """
+    Modifiche di una transazione (id MetaModel -> {'name', 'fields', 'update', 'backup_done'})
+    e riferimenti deboli ai callback on_commit che le applicano
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.callbacks = weakref.WeakSet()
+
+
+def _get_pending_changes():
+    """
+    Modifiche raccolte nella transazione corrente, indicizzate per blocco atomic
+    più esterno. Appartengono alla transazione finché uno dei loro callback on_commit
+    esiste: Django li scarta al rollback (e li rilascia dopo il commit), quindi un
+    nuovo ingresso nello stesso blocco atomic (es. @transaction.atomic riusato)
+    dopo un rollback parte da modifiche vuote.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        # Autocommit: on_commit esegue subito, nessuna modifica da raccogliere
+        return _PendingChanges()
+    
+    transactions = getattr(_pending, 'transactions', None)
+    if transactions is None:
+        transactions = _pending.transactions = {}
+    
+    key = id(connection.atomic_blocks[0])
+    changes = transactions.get(key)
+    
+    if changes is None or not changes.callbacks:
+        # Le voci di transazioni concluse non servono più
+        for finished in [finished for finished, pending in transactions.items() if not pending.callbacks]:
+            del transactions[finished]
+        changes = transactions[key] = _PendingChanges()
+    
+    return changes
+
+
+def _get_pending_entry(changes, meta_model_id, meta_model_name):
+    """Voce delle modifiche del MetaModel nella transazione corrente"""
+    return changes.setdefault(meta_model_id, {
+        'name': meta_model_name,
+        'fields': set(),
+        'update': False,
+        'backup_done': False,
+    })
+
+
+def _schedule_pending_changes(changes, meta_model_id):
+    """
+    Registra l'applicazione delle modifiche al commit (subito fuori da una transazione).
+    Viene registrata ad ogni modifica: se il savepoint che conteneva una registrazione
+    viene annullato resta valida la successiva; dopo la prima le altre non fanno nulla.
+    """
+    callback = partial(_apply_pending_changes, changes, meta_model_id)
+    changes.callbacks.add(callback)
+    transaction.on_commit(callback, robust=True)
+
+
+def _apply_pending_changes(changes, meta_model_id):
+    """
+    Applica al commit le modifiche raccolte per un MetaModel: un solo
+    update_table (quindi un backup e un confronto dello schema) per transazione
+    """
+    entry = changes.pop(meta_model_id, None)
+    if entry is None or not entry['update']:
+        return
+    
+    meta_model = MetaModel.objects.filter(pk=meta_model_id).first()
+    if meta_model is None:
+        # Il MetaModel è stato eliminato nella stessa transazione
+        return
+    
+    print(f"🔄 Aggiornamento tabella di {meta_model.name} per {len(entry['fields'])} campi modificati: "
+          f"{', '.join(sorted(entry['fields']))}")
+    
+    try:
+        dynamic_model_manager.update_table(meta_model)
+    except Exception as e:
+        print(f"❌ Errore durante l'aggiornamento della tabella: {e}")
+
+
+def _backup_before_delete(meta_model_id, meta_model_name, operation_type, backup_name):
+    """Backup prima di una cancellazione, uno per MetaModel e per transazione"""
+    changes = _get_pending_changes()
+    entry = _get_pending_entry(changes, meta_model_id, meta_model_name)
+    if entry['backup_done']:
+        return
+    
+    try:
+        backup_path = dynamic_model_manager._create_backup(operation_type, backup_name)
+        if backup_path:
+            print(f"💾 Backup creato prima della cancellazione: {backup_path}")
+        entry['backup_done'] = True
+    except Exception as e:
+        print(f"⚠️  Errore durante il backup prima della cancellazione: {e}")
+    
+    _schedule_pending_changes(changes, meta_model_id)
+
+
+def on_metamodel_change(sender, instance, created, **kwargs):
+    """Gestisce le modifiche ai MetaModel"""
+    if created:
+        print(f"📊 Nuovo MetaModel creato: {instance.name}")
+    else:
+        print(f"📝 MetaModel modificato: {instance.name}")
+        # Il backup viene già creato nei metodi create_table/update_table
+
+
+def on_metafield_change(sender, instance, created, raw=False, **kwargs):
+    """
+    Gestisce le modifiche ai MetaField: l'aggiornamento della tabella viene
+    rimandato al commit e fatto una volta per MetaModel (es. form inline con molti campi)
+    """
+    if raw:
+        return
+    
+    meta_model = instance.meta_model
+    if created:
+        print(f"🔧 Nuovo campo creato: {instance.name} in {meta_model.name}")
+    else:
+        print(f"✏️  Campo modificato: {instance.name} in {meta_model.name}")
+    
+    changes = _get_pending_changes()
+    entry = _get_pending_entry(changes, meta_model.pk, meta_model.name)
+    entry['fields'].add(instance.name)
+    entry['update'] = True
+    _schedule_pending_changes(changes, meta_model.pk)
+
+
+def on_metafield_delete(sender, instance, **kwargs):
+    """Gestisce la cancellazione di MetaField"""
+    meta_model = instance.meta_model
+    print(f"🗑️  Campo in cancellazione: {instance.name} da {meta_model.name}")
+    
+    # Crea backup prima della cancellazione del campo
+    _backup_before_delete(meta_model.pk, meta_model.name, "delete_field", f"{meta_model.name}_{instance.name}")
+
+
+def on_metamodel_delete(sender, instance, **kwargs):
+    """Gestisce la cancellazione di MetaModel"""
+    print(f"🗑️  MetaModel in cancellazione: {instance.name}")
+    
+    # Crea backup prima della cancellazione del modello (anche per i campi eliminati a cascata)
+    _backup_before_delete(instance.pk, instance.name, "delete_model", instance.name)
+
+
+def connect_schema_monitoring():
+    """
+    Collega i receiver del monitoraggio. Con dispatch_uid più chiamate non
+    duplicano i receiver; weak=False li mantiene attivi per tutta la vita del processo.
+    """
+    post_save.connect(on_metamodel_change, sender=MetaModel, weak=False,
+                      dispatch_uid='dynamic_models_monitor_metamodel_change')
+    post_save.connect(on_metafield_change, sender=MetaField, weak=False,
+                      dispatch_uid='dynamic_models_monitor_metafield_change')
+    pre_delete.connect(on_metafield_delete, sender=MetaField, weak=False,
+                       dispatch_uid='dynamic_models_monitor_metafield_delete')
+    pre_delete.connect(on_metamodel_delete, sender=MetaModel, weak=False,
+                       dispatch_uid='dynamic_models_monitor_metamodel_delete')
 
 
 class SchemaChangeMonitoringMiddleware(MiddlewareMixin):
@@ -16,61 +188,23 @@ class SchemaChangeMonitoringMiddleware(MiddlewareMixin):
     
     def setup_signals(self):
         """Configura i segnali per monitorare le modifiche"""
-        
-        @receiver(post_save, sender=MetaModel)
-        def on_metamodel_change(sender, instance, created, **kwargs):
-            """Gestisce le modifiche ai MetaModel"""
-            if created:
-                print(f"📊 Nuovo MetaModel creato: {instance.name}")
-            else:
-                print(f"📝 MetaModel modificato: {instance.name}")
-                # Il backup viene già creato nei metodi create_table/update_table
-        
-        @receiver(post_save, sender=MetaField)
-        def on_metafield_change(sender, instance, created, **kwargs):
-            """Gestisce le modifiche ai MetaField"""
-            if created:
-                print(f"🔧 Nuovo campo creato: {instance.name} in {instance.meta_model.name}")
-            else:
-                print(f"✏️  Campo modificato: {instance.name} in {instance.meta_model.name}")
-                
-            # Attiva l'aggiornamento della tabella quando un campo viene modificato
-            try:
-                dynamic_model_manager.update_table(instance.meta_model)
-            except Exception as e:
-                print(f"❌ Errore durante l'aggiornamento della tabella: {e}")
-        
-        @receiver(pre_delete, sender=MetaField)
-        def on_metafield_delete(sender, instance, **kwargs):
-            """Gestisce la cancellazione di MetaField"""
-            print(f"🗑️  Campo in cancellazione: {instance.name} da {instance.meta_model.name}")
-            
-            # Crea backup prima della cancellazione del campo
-            try:
-                backup_path = dynamic_model_manager._create_backup(
-                    "delete_field", 
-                    f"{instance.meta_model.name}_{instance.name}"
-                )
-                if backup_path:
-                    print(f"💾 Backup creato prima della cancellazione: {backup_path}")
-            except Exception as e:
-                print(f"⚠️  Errore durante il backup prima della cancellazione: {e}")
-        
-        @receiver(pre_delete, sender=MetaModel)
-        def on_metamodel_delete(sender, instance, **kwargs):
-            """Gestisce la cancellazione di MetaModel"""
-            print(f"🗑️  MetaModel in cancellazione: {instance.name}")
-            
-            # Crea backup prima della cancellazione del modello
-            try:
-                backup_path = dynamic_model_manager._create_backup(
-                    "delete_model", 
-                    instance.name
-                )
-                if backup_path:
-                    print(f"💾 Backup creato prima della cancellazione: {backup_path}")
-            except Exception as e:
-                print(f"⚠️  Errore durante il backup prima della cancellazione: {e}")
+        connect_schema_monitoring()
+
+
+class SchemaVersionSyncMiddleware(MiddlewareMixin):
+    """
+    Middleware che ad ogni richiesta confronta la versione globale dello schema
+    con quella caricata dal processo e ricarica solo i modelli modificati.
+    Permette a tutti i worker di vedere le modifiche senza riavvio.
+    """
+    
+    def process_request(self, request):
+        try:
+            dynamic_model_manager.sync_schema_version()
+        except Exception as e:
+            # Non bloccare la richiesta se la sincronizzazione fallisce
+            print(f"⚠️  Errore durante la sincronizzazione dello schema: {e}")
+        return None
 
 
 def register_schema_monitoring():
@@ -78,6 +212,5 @@ def register_schema_monitoring():
     Funzione helper per registrare il monitoraggio delle modifiche allo schema
     Può essere chiamata durante l'inizializzazione dell'app
     """
-    middleware = SchemaChangeMonitoringMiddleware(None)
-    middleware.setup_signals()
+    connect_schema_monitoring()
     print("🔍 Monitoraggio delle modifiche allo schema attivato")
\ No newline at end of file
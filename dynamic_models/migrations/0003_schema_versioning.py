@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dynamic_models', '0002_add_relation_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchemaState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Stato Schema',
+                'verbose_name_plural': 'Stato Schema',
+            },
+        ),
+        migrations.AddField(
+            model_name='metamodel',
+            name='schema_version',
+            field=models.PositiveBigIntegerField(db_index=True, default=0, editable=False, help_text="Versione globale dello schema all'ultima modifica del modello o dei suoi campi"),
+        ),
+        migrations.AlterField(
+            model_name='metafield',
+            name='field_type',
+            field=models.CharField(choices=[('char', 'Testo breve'), ('text', 'Testo lungo'), ('integer', 'Numero intero'), ('decimal', 'Numero decimale'), ('boolean', 'Booleano'), ('date', 'Data'), ('datetime', 'Data e ora'), ('foreign_key', 'Chiave esterna (1 a molti)'), ('many_to_many', 'Relazione molti a molti'), ('one_to_one', 'Relazione uno a uno'), ('email', 'Email'), ('url', 'URL'), ('file', 'File'), ('image', 'Immagine')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dynamic_models', '0003_schema_versioning'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='metafield',
+            name='db_index',
+            field=models.BooleanField(default=False, help_text='Crea un indice sulla colonna'),
+        ),
+        migrations.AddField(
+            model_name='metamodel',
+            name='indexes',
+            field=models.JSONField(blank=True, default=list, help_text='\n        Indici composti o parziali, es:\n        [{"fields": ["category", "-created"]},\n         {"fields": ["email"], "condition": {"is_active": true}}]\n    '),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dynamic_models', '0004_declarative_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_type', models.CharField(choices=[('import', 'Importazione'), ('export', 'Esportazione'), ('bulk_delete', 'Cancellazione massiva')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'In attesa'), ('running', 'In esecuzione'), ('completed', 'Completato'), ('failed', 'Fallito'), ('cancelled', 'Annullato')], default='pending', max_length=20)),
+                ('params', models.JSONField(blank=True, default=dict, help_text="\n        Parametri per tipo:\n        - import: format, map, fk_lookups, chunk_size, keep_ids\n        - export: format (json, ndjson, csv, parquet, arrow)\n        - bulk_delete: filter (stessi parametri di ?campo__op= e ?filter= dell'API)\n    ")),
+                ('source_file', models.FileField(blank=True, upload_to='dynamic_jobs/input/')),
+                ('result_file', models.FileField(blank=True, upload_to='dynamic_jobs/output/')),
+                ('processed', models.PositiveBigIntegerField(default=0)),
+                ('total', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True)),
+                ('cancel_requested', models.BooleanField(default=False)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='dynamic_jobs', to=settings.AUTH_USER_MODEL)),
+                ('meta_model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='dynamic_models.metamodel')),
+            ],
+            options={
+                'verbose_name': 'Job Dati',
+                'verbose_name_plural': 'Job Dati',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='dynamic_mod_status_c2ac25_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dynamic_models', '0005_data_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='metamodel',
+            name='fulltext_search',
+            field=models.BooleanField(default=False, help_text='Indice full-text (SQLite FTS5) sui campi di testo, usato dalla ricerca. Viene creato o rimosso con Crea/Aggiorna Tabella'),
+        ),
+    ]
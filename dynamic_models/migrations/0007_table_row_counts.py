@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dynamic_models', '0006_fulltext_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableRowCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table_name', models.CharField(max_length=100, unique=True)),
+                ('row_count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Conteggio Righe',
+                'verbose_name_plural': 'Conteggi Righe',
+            },
+        ),
+    ]
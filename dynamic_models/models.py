@@ -1,9 +1,30 @@
 from django.db import models
+from django.conf import settings
 from django.contrib.postgres.fields import JSONField
 from django.apps import apps
-from django.db import connection
+from django.db import connection, transaction
+from django.db.models import F
 from django.core.management import call_command
+from django.utils import timezone
 import importlib
+import hashlib
+import json
+
+
+# Prefisso degli indici gestiti da MetaModel/MetaField: gli altri indici della tabella
+# (ad esempio quelli creati da Django per le ForeignKey) non vengono toccati
+MANAGED_INDEX_PREFIX = 'dmidx_'
+
+
+def get_managed_index_name(table_name, field_names, condition=None):
+    """
+    Restituisce un nome di indice stabile e di al massimo 30 caratteri.
+    Il nome dipende dalla definizione: se l'indice cambia, cambia anche il nome.
+    """
+    definition = json.dumps([table_name, list(field_names), condition or {}], sort_keys=True, default=str)
+    digest = hashlib.sha1(definition.encode('utf-8')).hexdigest()[:10]
+    base = '_'.join(name.lstrip('-') for name in field_names)[:13]
+    return f"{MANAGED_INDEX_PREFIX}{base}_{digest}"
 
 
 class MetaModel(models.Model):
@@ -28,6 +49,22 @@ class MetaModel(models.Model):
     table_name = models.CharField(max_length=100, unique=True, help_text="Nome della tabella nel database")
     description = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
+    indexes = models.JSONField(default=list, blank=True, help_text="""
+        Indici composti o parziali, es:
+        [{"fields": ["category", "-created"]},
+         {"fields": ["email"], "condition": {"is_active": true}}]
+    """)
+    fulltext_search = models.BooleanField(
+        default=False,
+        help_text="Indice full-text (SQLite FTS5) sui campi di testo, usato dalla ricerca. "
+                  "Viene creato o rimosso con Crea/Aggiorna Tabella"
+    )
+    schema_version = models.PositiveBigIntegerField(
+        default=0,
+        db_index=True,
+        editable=False,
+        help_text="Versione globale dello schema all'ultima modifica del modello o dei suoi campi"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -48,28 +85,119 @@ class MetaModel(models.Model):
         except LookupError:
             return None
     
-    def create_model_class(self):
-        """Crea la classe del modello Django a runtime"""
+    def get_schema_fingerprint(self, fields=None):
+        """
+        Restituisce un hash stabile della definizione del modello e dei suoi campi.
+        Due definizioni identiche producono lo stesso fingerprint.
+        
+        Args:
+            fields: Lista opzionale di MetaField già caricati (evita la query)
+        """
+        if fields is None:
+            fields = self.fields.all()
+        
+        payload = {
+            'name': self.name,
+            'table_name': self.table_name,
+            'fields': [field.get_definition() for field in fields],
+            'indexes': self.indexes,
+        }
+        serialized = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+    
+    def create_model_class(self, fields=None, known_models=None):
+        """
+        Crea la classe del modello Django a runtime
+        
+        Args:
+            fields: Lista opzionale di MetaField già caricati (evita la query)
+            known_models: Insieme opzionale dei nomi dei MetaModel attivi, usato per
+                risolvere le relazioni senza interrogare il database
+        """
         app_label = 'dynamic_models'
         
+        if fields is None:
+            fields = self.fields.all()
+        
         # Costruisci gli attributi del modello
         attrs = {
             '__module__': f'{app_label}.models',
             'Meta': type('Meta', (), {
                 'db_table': self.table_name,
                 'app_label': app_label,
+                'indexes': self.get_index_definitions(fields),
             }),
             '__str__': lambda self: f"{self.__class__.__name__} #{self.pk}",
         }
         
         # Aggiungi i campi definiti
-        for field in self.fields.all():
-            attrs[field.name] = field.get_django_field()
+        for field in fields:
+            attrs[field.name] = field.get_django_field(known_models)
         
         # Crea la classe del modello
         model_class = type(self.name, (models.Model,), attrs)
         
         return model_class
+    
+    def get_index_definitions(self, fields=None):
+        """
+        Costruisce gli indici Django dichiarati sui campi (db_index) e sul modello (indexes)
+        
+        Args:
+            fields: Lista opzionale di MetaField già caricati (evita la query)
+        """
+        if fields is None:
+            fields = self.fields.all()
+        
+        field_types = {field.name: field.field_type for field in fields}
+        index_definitions = []
+        
+        # Indici su singola colonna (ForeignKey, OneToOne e campi unique sono già indicizzati)
+        for field in fields:
+            if field.db_index and not field.unique and field.field_type not in ['foreign_key', 'many_to_many', 'one_to_one']:
+                index_definitions.append(models.Index(
+                    fields=[field.name],
+                    name=get_managed_index_name(self.table_name, [field.name]),
+                ))
+        
+        # Indici composti e parziali
+        for index in self.indexes or []:
+            index_fields = index.get('fields') or []
+            condition = index.get('condition') or None
+            unknown = [name for name in index_fields if field_types.get(name.lstrip('-'), 'many_to_many') == 'many_to_many']
+            unknown += [key for key in (condition or {}) if key.split('__', 1)[0] not in field_types]
+            if unknown:
+                print(f"⚠️  Indice {index_fields} su {self.name} ignorato: campi non indicizzabili {unknown}")
+                continue
+            
+            index_definitions.append(models.Index(
+                fields=index_fields,
+                name=get_managed_index_name(self.table_name, index_fields, condition),
+                condition=models.Q(**condition) if condition else None,
+            ))
+        
+        return index_definitions
+    
+    def clean(self):
+        """Valida la struttura della dichiarazione degli indici"""
+        from django.core.exceptions import ValidationError
+        
+        if not isinstance(self.indexes, list):
+            raise ValidationError({'indexes': 'Gli indici devono essere una lista'})
+        
+        for index in self.indexes:
+            if not isinstance(index, dict):
+                raise ValidationError({'indexes': 'Ogni indice deve essere un oggetto con la chiave "fields"'})
+            
+            index_fields = index.get('fields')
+            if not isinstance(index_fields, list) or not index_fields or not all(
+                isinstance(name, str) and name.lstrip('-').isidentifier() for name in index_fields
+            ):
+                raise ValidationError({'indexes': f'"fields" deve essere una lista non vuota di nomi di campo: {index}'})
+            
+            condition = index.get('condition')
+            if condition is not None and (not isinstance(condition, dict) or not condition):
+                raise ValidationError({'indexes': f'"condition" deve essere un oggetto campo -> valore: {index}'})
 
 
 class MetaField(models.Model):
@@ -109,6 +237,7 @@ class MetaField(models.Model):
     help_text = models.TextField(blank=True)
     required = models.BooleanField(default=False)
     unique = models.BooleanField(default=False)
+    db_index = models.BooleanField(default=False, help_text="Crea un indice sulla colonna")
     default_value = models.CharField(max_length=500, blank=True)
     
     # Parametri specifici per tipo di campo (stored as JSON)
@@ -162,8 +291,32 @@ class MetaField(models.Model):
     def __str__(self):
         return f"{self.meta_model.name}.{self.name}"
     
-    def get_django_field(self):
-        """Restituisce un'istanza del campo Django appropriato"""
+    def get_definition(self):
+        """Restituisce i valori che determinano la struttura del campo Django generato"""
+        return {
+            'name': self.name,
+            'field_type': self.field_type,
+            'verbose_name': self.verbose_name,
+            'help_text': self.help_text,
+            'required': self.required,
+            'unique': self.unique,
+            'db_index': self.db_index,
+            'default_value': self.default_value,
+            'field_params': self.field_params,
+            'related_model': self.related_model,
+            'relation_type': self.relation_type,
+            'on_delete': self.on_delete,
+            'related_name': self.related_name,
+            'order': self.order,
+        }
+    
+    def get_django_field(self, known_models=None):
+        """
+        Restituisce un'istanza del campo Django appropriato
+        
+        Args:
+            known_models: Insieme opzionale dei nomi dei MetaModel attivi (vedi _get_target_model)
+        """
         field_kwargs = {
             'verbose_name': self.verbose_name or self.name,
             'help_text': self.help_text,
@@ -227,18 +380,18 @@ class MetaField(models.Model):
             return models.ImageField(upload_to=upload_to, **field_kwargs)
         
         elif self.field_type in ['foreign_key', 'one_to_one', 'many_to_many']:
-            return self._create_relational_field(field_kwargs)
+            return self._create_relational_field(field_kwargs, known_models)
         
         # Default fallback
         return models.CharField(max_length=255, **field_kwargs)
     
-    def _create_relational_field(self, field_kwargs):
+    def _create_relational_field(self, field_kwargs, known_models=None):
         """Crea un campo relazionale Django"""
         if not self.related_model:
             raise ValueError(f"Campo {self.name}: related_model è obbligatorio per i campi relazionali")
         
         # Ottieni il modello di destinazione
-        target_model = self._get_target_model()
+        target_model = self._get_target_model(known_models)
         if not target_model:
             raise ValueError(f"Campo {self.name}: modello di destinazione '{self.related_model}' non trovato")
         
@@ -278,8 +431,14 @@ class MetaField(models.Model):
         elif self.field_type == 'many_to_many':
             return models.ManyToManyField(target_reference, **field_kwargs)
     
-    def _get_target_model(self):
-        """Ottiene la classe del modello di destinazione"""
+    def _get_target_model(self, known_models=None):
+        """
+        Ottiene la classe del modello di destinazione
+        
+        Args:
+            known_models: Insieme opzionale dei nomi dei MetaModel attivi. Se fornito,
+                l'esistenza del modello dinamico viene verificata senza query
+        """
         if not self.related_model:
             return None
         
@@ -314,10 +473,13 @@ class MetaField(models.Model):
         # Se non è registrato, controlla se esiste un MetaModel con quel nome
         # Questo serve per la validazione durante la creazione dei campi
         try:
-            meta_model_exists = MetaModel.objects.filter(
-                name=self.related_model, 
-                is_active=True
-            ).exists()
+            if known_models is not None:
+                meta_model_exists = self.related_model in known_models
+            else:
+                meta_model_exists = MetaModel.objects.filter(
+                    name=self.related_model, 
+                    is_active=True
+                ).exists()
             
             if meta_model_exists:
                 # Restituisci una classe placeholder che indica che il modello esiste
@@ -462,4 +624,163 @@ class MetaField(models.Model):
         elif self.field_type == 'boolean':
             return self.default_value.lower() in ('true', '1', 'yes')
         else:
-            return self.default_value
\ No newline at end of file
+            return self.default_value
+
+
+class SchemaState(models.Model):
+    """
+    Versione globale dello schema dei modelli dinamici (riga singola).
+    Viene incrementata ad ogni modifica di MetaModel/MetaField ed è letta
+    da ogni processo per capire se deve ricaricare dei modelli.
+    """
+    
+    SINGLETON_ID = 1
+    
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Stato Schema"
+        verbose_name_plural = "Stato Schema"
+    
+    def __str__(self):
+        return f"Schema v{self.version}"
+    
+    @classmethod
+    def get_version(cls):
+        """Legge la versione corrente (una lettura per chiave primaria)"""
+        version = cls.objects.filter(pk=cls.SINGLETON_ID).values_list('version', flat=True).first()
+        return version or 0
+    
+    @classmethod
+    def get_state(cls):
+        """Restituisce (versione, data ultima modifica) con una sola query"""
+        state = cls.objects.filter(pk=cls.SINGLETON_ID).values_list('version', 'updated_at').first()
+        return state or (0, None)
+    
+    @classmethod
+    def bump(cls, meta_model_id=None):
+        """
+        Incrementa la versione globale e la assegna al MetaModel modificato
+        
+        Args:
+            meta_model_id: ID del MetaModel modificato (None per modifiche globali, es. cancellazioni)
+        
+        Returns:
+            La nuova versione globale
+        """
+        with transaction.atomic():
+            updated = cls.objects.filter(pk=cls.SINGLETON_ID).update(
+                version=F('version') + 1,
+                updated_at=timezone.now()
+            )
+            if not updated:
+                cls.objects.get_or_create(pk=cls.SINGLETON_ID, defaults={'version': 1})
+            
+            version = cls.get_version()
+            
+            if meta_model_id is not None:
+                MetaModel.objects.filter(pk=meta_model_id).update(schema_version=version)
+        
+        return version
+
+
+class DataJob(models.Model):
+    """
+    Operazione sui dati dei modelli dinamici eseguita in background
+    (import, export, cancellazione massiva) dal comando run_dynamic_jobs
+    """
+    
+    TYPE_IMPORT = 'import'
+    TYPE_EXPORT = 'export'
+    TYPE_BULK_DELETE = 'bulk_delete'
+    
+    JOB_TYPES = [
+        (TYPE_IMPORT, 'Importazione'),
+        (TYPE_EXPORT, 'Esportazione'),
+        (TYPE_BULK_DELETE, 'Cancellazione massiva'),
+    ]
+    
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+    
+    STATUSES = [
+        (STATUS_PENDING, 'In attesa'),
+        (STATUS_RUNNING, 'In esecuzione'),
+        (STATUS_COMPLETED, 'Completato'),
+        (STATUS_FAILED, 'Fallito'),
+        (STATUS_CANCELLED, 'Annullato'),
+    ]
+    
+    FINISHED_STATUSES = [STATUS_COMPLETED, STATUS_FAILED, STATUS_CANCELLED]
+    
+    meta_model = models.ForeignKey(MetaModel, on_delete=models.CASCADE, related_name='jobs')
+    job_type = models.CharField(max_length=20, choices=JOB_TYPES)
+    status = models.CharField(max_length=20, choices=STATUSES, default=STATUS_PENDING)
+    params = models.JSONField(default=dict, blank=True, help_text="""
+        Parametri per tipo:
+        - import: format, map, fk_lookups, chunk_size, keep_ids
+        - export: format (json, ndjson, csv, parquet, arrow)
+        - bulk_delete: filter (stessi parametri di ?campo__op= e ?filter= dell'API)
+    """)
+    source_file = models.FileField(upload_to='dynamic_jobs/input/', blank=True)
+    result_file = models.FileField(upload_to='dynamic_jobs/output/', blank=True)
+    
+    # Avanzamento
+    processed = models.PositiveBigIntegerField(default=0)
+    total = models.PositiveBigIntegerField(null=True, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    cancel_requested = models.BooleanField(default=False)
+    
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='dynamic_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Job Dati"
+        verbose_name_plural = "Job Dati"
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+    
+    def __str__(self):
+        return f"{self.get_job_type_display()} {self.meta_model.name} #{self.pk} ({self.status})"
+    
+    @property
+    def progress(self):
+        """Percentuale di avanzamento (None se il totale non è noto)"""
+        if self.status == self.STATUS_COMPLETED:
+            return 100.0
+        if not self.total:
+            return None
+        return round(min(self.processed / self.total, 1) * 100, 1)
+    
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
+
+
+class TableRowCount(models.Model):
+    """
+    Numero di righe di una tabella dinamica, mantenuto dai trigger di INSERT e DELETE
+    installati da create_table/update_table (vedi counters.py): evita COUNT(*)
+    sulle liste non filtrate.
+    """
+    
+    table_name = models.CharField(max_length=100, unique=True)
+    row_count = models.BigIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = "Conteggio Righe"
+        verbose_name_plural = "Conteggi Righe"
+    
+    def __str__(self):
+        return f"{self.table_name}: {self.row_count}"
@@ -0,0 +1,253 @@
+from functools import partial
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from rest_framework import serializers
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.settings import api_settings
+
+from .counters import count_queryset
+
+
+def get_indexed_field_names(model_class):
+    """
+    Restituisce i campi del modello coperti da un indice (chiave primaria,
+    campi unique e campi con db_index, incluse le ForeignKey, e il primo
+    campo degli indici non parziali in Meta.indexes)
+    """
+    indexed = {
+        field.name for field in model_class._meta.concrete_fields
+        if field.primary_key or field.unique or field.db_index
+    }
+    indexed.update(
+        index.fields[0].lstrip('-') for index in model_class._meta.indexes
+        if index.fields and index.condition is None
+    )
+    return indexed
+
+
+def use_cursor_pagination(request):
+    """True se la richiesta (o la configurazione) chiede la paginazione a cursore"""
+    if 'cursor' in request.GET or request.GET.get('pagination') == 'cursor':
+        return True
+    return getattr(settings, 'DYNAMIC_MODELS_CURSOR_PAGINATION', False)
+
+
+class DynamicCursorPagination(CursorPagination):
+    """
+    Paginazione keyset per i modelli dinamici: nessun COUNT(*) né OFFSET,
+    il tempo di risposta non dipende dalla profondità della pagina.
+    
+    L'ordinamento (?ordering=campo o -campo) è ammesso solo su campi indicizzati e non nullable.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = 'id'
+    ordering_param = 'ordering'
+    
+    def get_ordering(self, request, queryset, view):
+        ordering = request.query_params.get(self.ordering_param)
+        if not ordering:
+            return (self.ordering,)
+        
+        model_class = queryset.model
+        field_name = ordering.lstrip('-')
+        
+        if field_name not in get_indexed_field_names(model_class):
+            raise serializers.ValidationError({
+                self.ordering_param: f"La paginazione a cursore richiede un campo indicizzato, '{field_name}' non lo è"
+            })
+        
+        # Il cursore codifica la posizione come stringa e non può rappresentare NULL:
+        # i campi nullable salterebbero o ripeterebbero righe
+        field = model_class._meta.get_field(field_name)
+        if field.null:
+            raise serializers.ValidationError({
+                self.ordering_param: f"La paginazione a cursore richiede un campo non nullable, '{field_name}' ammette NULL"
+            })
+        
+        # La posizione del cursore viene letta dall'istanza: per le FK serve la colonna (author_id)
+        descending = ordering.startswith('-')
+        prefix = '-' if descending else ''
+        
+        if field.primary_key:
+            return (f'{prefix}{field.attname}',)
+        
+        # La chiave primaria come spareggio rende l'ordine deterministico
+        return (f'{prefix}{field.attname}', f'{prefix}pk')
+
+
+class KeysetPage:
+    """
+    Pagina ottenuta con paginazione keyset (WHERE id > ultimo_id LIMIT n).
+    Espone un'interfaccia simile a django.core.paginator.Page per i template.
+    """
+    
+    is_keyset = True
+    
+    def __init__(self, object_list, has_next, has_previous, field_name='id'):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.field_name = field_name
+    
+    def __iter__(self):
+        return iter(self.object_list)
+    
+    def __len__(self):
+        return len(self.object_list)
+    
+    def has_next(self):
+        return self._has_next
+    
+    def has_previous(self):
+        return self._has_previous
+    
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+    
+    @property
+    def next_after(self):
+        """Valore da passare come ?after= per la pagina successiva"""
+        return getattr(self.object_list[-1], self.field_name) if self.object_list else None
+    
+    @property
+    def previous_before(self):
+        """Valore da passare come ?before= per la pagina precedente"""
+        return getattr(self.object_list[0], self.field_name) if self.object_list else None
+
+
+def keyset_paginate(queryset, per_page, after=None, before=None, field_name='id'):
+    """
+    Pagina un queryset per chiave invece che per offset
+    
+    Args:
+        queryset: QuerySet da paginare
+        per_page: Numero di record per pagina
+        after: Restituisce i record con chiave maggiore di questo valore
+        before: Restituisce i record con chiave minore di questo valore
+        field_name: Campo indicizzato e univoco usato come chiave
+    
+    Returns:
+        KeysetPage
+    """
+    if before is not None:
+        rows = list(
+            queryset.filter(**{f'{field_name}__lt': before}).order_by(f'-{field_name}')[:per_page + 1]
+        )
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        return KeysetPage(rows, has_next=True, has_previous=has_previous, field_name=field_name)
+    
+    if after is not None:
+        queryset = queryset.filter(**{f'{field_name}__gt': after})
+    
+    rows = list(queryset.order_by(field_name)[:per_page + 1])
+    has_next = len(rows) > per_page
+    return KeysetPage(rows[:per_page], has_next=has_next, has_previous=after is not None, field_name=field_name)
+
+
+
+class CountedPage(Page):
+    """
+    Pagina di CountedPaginator: con un conteggio non esatto la pagina successiva
+    esiste se è stata letta una riga oltre la fine della pagina
+    """
+    
+    has_more = None
+    
+    def has_next(self):
+        if self.has_more is not None:
+            return self.has_more
+        return super().has_next()
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator che usa un conteggio già noto (contatore mantenuto o stima)
+    invece di eseguire COUNT(*) sul queryset
+    
+    Con un conteggio non esatto (limite inferiore o stima del planner) il numero
+    di pagina non è limitato da num_pages: ogni pagina legge per_page + 1 righe
+    per sapere se ne esiste una successiva.
+    
+    Args:
+        count: Numero di righe (None = conteggio normale del Paginator)
+        count_exact: False se count è una stima o un limite inferiore
+    """
+    
+    def __init__(self, object_list, per_page, count=None, count_exact=True, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            # Sostituisce la cached_property del Paginator
+            self.count = count
+        self.count_exact = count_exact
+    
+    @classmethod
+    def for_queryset(cls, queryset, per_page, **kwargs):
+        """Paginator con il conteggio calcolato da counters.count_queryset"""
+        count, count_exact = count_queryset(queryset)
+        return cls(queryset, per_page, count=count, count_exact=count_exact, **kwargs)
+    
+    def validate_number(self, number):
+        if self.count_exact:
+            return super().validate_number(number)
+        
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+    
+    def page(self, number):
+        if self.count_exact:
+            return super().page(number)
+        
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+        
+        # Le righe lette sono un limite inferiore più preciso del conteggio stimato
+        self.count = max(self.count, bottom + len(rows))
+        
+        page = self._get_page(rows[:self.per_page], number, self)
+        page.has_more = len(rows) > self.per_page
+        return page
+    
+    def _get_page(self, *args, **kwargs):
+        return CountedPage(*args, **kwargs)
+
+
+class DynamicPageNumberPagination(PageNumberPagination):
+    """
+    Paginazione per numero di pagina con il conteggio di counters.count_queryset:
+    nessun COUNT(*) sulle liste non filtrate. La risposta riporta count_exact
+    (False se count è approssimato, vedi DYNAMIC_MODELS_APPROXIMATE_COUNT_THRESHOLD).
+    """
+    
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.get_page_size(request):
+            count, count_exact = count_queryset(queryset)
+            self.django_paginator_class = partial(CountedPaginator, count=count, count_exact=count_exact)
+        return super().paginate_queryset(queryset, request, view)
+    
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_exact'] = self.page.paginator.count_exact
+        return response
+    
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_exact'] = {'type': 'boolean', 'example': True}
+        return response_schema
@@ -0,0 +1,261 @@
+"""
+Linguaggio di filtro e ordinamento per i modelli dinamici (vedi DOCUMENTATION.md).
+I filtri vengono validati rispetto al tipo dei MetaField e compilati in oggetti Q.
+"""
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from .dynamic_manager import dynamic_model_manager
+
+
+TEXT_LOOKUPS = ['exact', 'iexact', 'in', 'isnull', 'contains', 'icontains', 'startswith', 'istartswith']
+RANGE_LOOKUPS = ['exact', 'gt', 'gte', 'lt', 'lte', 'range', 'in', 'isnull']
+RELATION_LOOKUPS = ['exact', 'in', 'isnull']
+
+# Operatori ammessi per tipo di MetaField
+ALLOWED_LOOKUPS = {
+    'char': TEXT_LOOKUPS,
+    'text': TEXT_LOOKUPS,
+    'email': TEXT_LOOKUPS,
+    'url': TEXT_LOOKUPS,
+    'file': TEXT_LOOKUPS,
+    'image': TEXT_LOOKUPS,
+    'integer': RANGE_LOOKUPS,
+    'decimal': RANGE_LOOKUPS,
+    'date': RANGE_LOOKUPS,
+    'datetime': RANGE_LOOKUPS,
+    'boolean': ['exact', 'isnull'],
+    'foreign_key': RELATION_LOOKUPS,
+    'one_to_one': RELATION_LOOKUPS,
+    'many_to_many': RELATION_LOOKUPS,
+}
+
+# Valori booleani nei parametri di query (BooleanField.to_python accetta solo "True", "t", "1"...)
+BOOLEAN_VALUES = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}
+
+# Parametri di query che non sono filtri anche se coincidono con il nome di un campo
+RESERVED_PARAMS = {
+    'page', 'page_size', 'cursor', 'pagination', 'ordering', 'fields', 'exclude',
+    'format', 'filter', 'search', 'expand',
+}
+
+# Profondità massima dei gruppi and/or/not nel parametro filter
+MAX_FILTER_DEPTH = 10
+
+# Piani compilati: (classe modello, versione schema, filtro canonico) -> Q
+_plan_cache = {}
+PLAN_CACHE_LIMIT = 1024
+
+
+class QueryDSLError(ValueError):
+    """Filtro o ordinamento non valido"""
+
+
+def _invalidate_plans(meta_model_name=None):
+    if meta_model_name is None:
+        _plan_cache.clear()
+        return
+    
+    for key in [key for key in _plan_cache if key[0].__name__ == meta_model_name]:
+        _plan_cache.pop(key, None)
+
+
+dynamic_model_manager.register_cache_invalidator(_invalidate_plans)
+
+
+def get_field_types(model_class, meta_fields):
+    """
+    Costruisce la mappa nome campo -> tipo di MetaField (la chiave primaria è un intero)
+    """
+    field_types = {field.name: field.field_type for field in meta_fields}
+    field_types[model_class._meta.pk.name] = 'integer'
+    return field_types
+
+
+def compile_filters(model_class, field_types, query_params, schema_version=None):
+    """
+    Compila i filtri della richiesta in un oggetto Q
+    
+    Args:
+        model_class: Classe del modello dinamico
+        field_types: Mappa nome campo -> tipo (vedi get_field_types)
+        query_params: QueryDict (o dict) con i parametri della richiesta
+        schema_version: Versione dello schema, parte della chiave di cache
+    
+    Returns:
+        Tupla (Q, usa_m2m): usa_m2m indica che serve distinct()
+    
+    Raises:
+        QueryDSLError: se un campo, un operatore o un valore non è valido
+    """
+    simple_filters = []
+    for key in sorted(query_params.keys()):
+        if key in RESERVED_PARAMS or key.split('__', 1)[0] not in field_types:
+            continue
+        values = query_params.getlist(key) if hasattr(query_params, 'getlist') else [query_params[key]]
+        simple_filters.extend((key, value) for value in values)
+    
+    raw_filter = query_params.get('filter') or ''
+    if not simple_filters and not raw_filter:
+        return Q(), False
+    
+    cache_key = (model_class, schema_version, tuple(simple_filters), raw_filter)
+    plan = _plan_cache.get(cache_key)
+    if plan is not None:
+        return plan
+    
+    compiler = _FilterCompiler(model_class, field_types)
+    q_object = Q()
+    
+    for key, value in simple_filters:
+        field_name, _, lookup = key.partition('__')
+        q_object &= compiler.condition(field_name, lookup or 'exact', value)
+    
+    if raw_filter:
+        try:
+            tree = json.loads(raw_filter)
+        except (ValueError, RecursionError):
+            raise QueryDSLError("Il parametro 'filter' deve essere JSON valido")
+        q_object &= compiler.node(tree)
+    
+    plan = (q_object, compiler.uses_many_to_many)
+    
+    if len(_plan_cache) >= PLAN_CACHE_LIMIT:
+        _plan_cache.clear()
+    _plan_cache[cache_key] = plan
+    
+    return plan
+
+
+def compile_ordering(model_class, field_types, ordering_param):
+    """
+    Valida ?ordering=-a,b e restituisce la lista per order_by()
+    
+    Raises:
+        QueryDSLError: se un campo non esiste o non è ordinabile
+    """
+    ordering = []
+    
+    for item in (ordering_param or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        
+        field_name = item.lstrip('-')
+        if field_name not in field_types:
+            raise QueryDSLError(f"Campo di ordinamento sconosciuto: '{field_name}'")
+        if field_types[field_name] == 'many_to_many':
+            raise QueryDSLError(f"Non è possibile ordinare per il campo molti a molti '{field_name}'")
+        
+        ordering.append(item)
+    
+    # La chiave primaria come spareggio rende la paginazione deterministica
+    pk_name = model_class._meta.pk.name
+    if ordering and not any(item.lstrip('-') == pk_name for item in ordering):
+        ordering.append(pk_name)
+    
+    return ordering
+
+
+class _FilterCompiler:
+    """Traduce i nodi del filtro in oggetti Q validando campi, operatori e valori"""
+    
+    def __init__(self, model_class, field_types):
+        self.model_class = model_class
+        self.field_types = field_types
+        self.uses_many_to_many = False
+    
+    def node(self, node, depth=1):
+        if not isinstance(node, dict):
+            raise QueryDSLError("Ogni nodo del filtro deve essere un oggetto JSON")
+        
+        if depth > MAX_FILTER_DEPTH:
+            raise QueryDSLError(f"Filtro troppo annidato: profondità massima {MAX_FILTER_DEPTH}")
+        
+        if 'and' in node or 'or' in node:
+            group = 'and' if 'and' in node else 'or'
+            children = node[group]
+            if not isinstance(children, list) or not children:
+                raise QueryDSLError(f"'{group}' richiede una lista non vuota di condizioni")
+            
+            q_object = self.node(children[0], depth + 1)
+            for child in children[1:]:
+                if group == 'and':
+                    q_object &= self.node(child, depth + 1)
+                else:
+                    q_object |= self.node(child, depth + 1)
+            return q_object
+        
+        if 'not' in node:
+            return ~self.node(node['not'], depth + 1)
+        
+        if 'field' not in node:
+            raise QueryDSLError("Una condizione richiede almeno 'field' (e opzionalmente 'op' e 'value')")
+        
+        field_name, lookup = node['field'], node.get('op', 'exact')
+        if not isinstance(field_name, str) or not isinstance(lookup, str):
+            raise QueryDSLError("'field' e 'op' devono essere stringhe")
+        
+        return self.condition(field_name, lookup, node.get('value'), from_json=True)
+    
+    def condition(self, field_name, lookup, value, from_json=False):
+        field_type = self.field_types.get(field_name)
+        if field_type is None:
+            raise QueryDSLError(f"Campo sconosciuto: '{field_name}'")
+        
+        allowed = ALLOWED_LOOKUPS.get(field_type, ['exact', 'isnull'])
+        if lookup not in allowed:
+            raise QueryDSLError(
+                f"Operatore '{lookup}' non ammesso per il campo '{field_name}' ({field_type}). "
+                f"Operatori validi: {', '.join(allowed)}"
+            )
+        
+        if field_type == 'many_to_many':
+            self.uses_many_to_many = True
+        
+        return Q(**{f'{field_name}__{lookup}': self._coerce(field_name, lookup, value, from_json)})
+    
+    def _coerce(self, field_name, lookup, value, from_json):
+        if lookup == 'isnull':
+            if isinstance(value, bool):
+                return value
+            return str(value).lower() in ('true', '1', 'yes')
+        
+        if lookup in ('in', 'range'):
+            if isinstance(value, str) and not from_json:
+                values = [item for item in value.split(',') if item != '']
+            elif isinstance(value, list):
+                values = value
+            else:
+                raise QueryDSLError(f"'{lookup}' su '{field_name}' richiede una lista di valori")
+            
+            if lookup == 'range' and len(values) != 2:
+                raise QueryDSLError(f"'range' su '{field_name}' richiede esattamente due valori")
+            
+            return [self._to_python(field_name, item) for item in values]
+        
+        return self._to_python(field_name, value)
+    
+    def _to_python(self, field_name, value):
+        field = self.model_class._meta.get_field(field_name)
+        if field.is_relation:
+            # Le relazioni si filtrano per chiave primaria del modello collegato
+            field = field.target_field if not field.many_to_many else field.related_model._meta.pk
+        
+        if isinstance(value, (dict, list)):
+            raise QueryDSLError(f"Valore non valido per '{field_name}': atteso un valore semplice")
+        
+        if isinstance(value, str) and field.get_internal_type() == 'BooleanField':
+            value = BOOLEAN_VALUES.get(value.lower(), value)
+        
+        if value is not None and not isinstance(value, str) and field.get_internal_type() in (
+            'CharField', 'TextField', 'EmailField', 'URLField', 'FileField', 'ImageField'
+        ):
+            value = str(value)
+        
+        try:
+            return field.to_python(value)
+        except ValidationError as e:
+            raise QueryDSLError(f"Valore non valido per '{field_name}': {' '.join(e.messages)}")
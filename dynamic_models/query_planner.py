@@ -0,0 +1,212 @@
+"""
+Pianificazione del caricamento delle relazioni dei modelli dinamici.
+
+Dai MetaField relazionali si ricavano select_related (foreign_key e one_to_one:
+JOIN nella stessa query) e prefetch_related (many_to_many: una query per relazione
+e per pagina), così il numero di query di una lista non dipende dal numero di righe.
+I piani sono in cache per classe del modello, versione dello schema e campi richiesti.
+
+Le relazioni incluse con ?expand= (es. "author,coauthors.author") hanno un piano a
+parte: le catene di foreign key in JOIN, il resto con prefetch (una query per livello),
+più le molti a molti dei modelli collegati, serializzate come id.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+
+from .dynamic_manager import dynamic_model_manager
+
+
+RelationPlan = namedtuple('RelationPlan', ['select_related', 'prefetch_related'])
+
+# Cache dei piani: (classe modello, versione schema, campi) -> RelationPlan
+_relation_plan_cache = {}
+# Le combinazioni di ?fields= sono potenzialmente molte: oltre il limite la cache si svuota
+RELATION_PLAN_CACHE_LIMIT = 512
+
+
+def _invalidate_relation_plans(meta_model_name=None):
+    if meta_model_name is None:
+        _relation_plan_cache.clear()
+        return
+    
+    for key in [key for key in _relation_plan_cache if key[0].__name__ == meta_model_name]:
+        _relation_plan_cache.pop(key, None)
+
+
+dynamic_model_manager.register_cache_invalidator(_invalidate_relation_plans)
+
+
+# Piani di ?expand=: (classe modello, versione schema, percorsi) -> RelationPlan.
+# Dipendono anche dallo schema dei modelli collegati: ogni modifica li svuota tutti
+_expand_plan_cache = {}
+
+
+def _invalidate_expand_plans(meta_model_name=None):
+    _expand_plan_cache.clear()
+
+
+dynamic_model_manager.register_cache_invalidator(_invalidate_expand_plans)
+
+
+class ExpandError(ValueError):
+    """Parametro ?expand= non valido"""
+
+
+def get_relation_plan(model_class, meta_fields, schema_version, fields=None):
+    """
+    Restituisce il piano di caricamento delle relazioni di un modello dinamico
+    
+    Args:
+        model_class: Classe del modello dinamico
+        meta_fields: MetaField del modello (usati solo alla prima costruzione del piano)
+        schema_version: Versione dello schema del MetaModel
+        fields: Tupla opzionale dei campi caricati (None = tutti)
+    
+    Returns:
+        RelationPlan con le tuple dei campi per select_related e prefetch_related
+    """
+    key = (model_class, schema_version, fields)
+    plan = _relation_plan_cache.get(key)
+    
+    if plan is None:
+        select_related = []
+        prefetch_related = []
+        
+        for meta_field in meta_fields:
+            if fields is not None and meta_field.name not in fields:
+                continue
+            
+            try:
+                django_field = model_class._meta.get_field(meta_field.name)
+            except FieldDoesNotExist:
+                continue
+            
+            if not django_field.is_relation:
+                continue
+            
+            if meta_field.field_type in ['foreign_key', 'one_to_one']:
+                select_related.append(meta_field.name)
+            elif meta_field.field_type == 'many_to_many':
+                prefetch_related.append(meta_field.name)
+        
+        plan = RelationPlan(tuple(select_related), tuple(prefetch_related))
+        
+        if len(_relation_plan_cache) >= RELATION_PLAN_CACHE_LIMIT:
+            _relation_plan_cache.clear()
+        _relation_plan_cache[key] = plan
+    
+    return plan
+
+
+def apply_relation_plan(queryset, plan, select_related=True):
+    """
+    Applica il piano al queryset
+    
+    Args:
+        select_related: False se le foreign key servono solo come id (es. serializer
+            con PrimaryKeyRelatedField, che legge <campo>_id senza JOIN)
+    """
+    if select_related and plan.select_related:
+        queryset = queryset.select_related(*plan.select_related)
+    if plan.prefetch_related:
+        queryset = queryset.prefetch_related(*plan.prefetch_related)
+    return queryset
+
+
+def get_max_expand_depth():
+    return getattr(settings, 'DYNAMIC_MODELS_MAX_EXPAND_DEPTH', 2)
+
+
+def _get_expandable_field(model_class, name):
+    """Relazione diretta di un modello dinamico verso un altro modello dinamico"""
+    try:
+        field = model_class._meta.get_field(name)
+    except FieldDoesNotExist:
+        raise ExpandError(f"{model_class.__name__} non ha il campo '{name}'")
+    
+    if not field.is_relation or field.auto_created:
+        raise ExpandError(f"'{name}' non è una relazione di {model_class.__name__}")
+    
+    # Solo modelli dinamici: i modelli Django (es. auth.User) esporrebbero tutti i loro campi
+    related_model = field.related_model
+    if related_model._meta.app_label != 'dynamic_models' or dynamic_model_manager.get_model(related_model.__name__) is None:
+        raise ExpandError(
+            f"'{name}' punta a {related_model._meta.label}: "
+            f"sono espandibili solo le relazioni verso modelli dinamici"
+        )
+    
+    return field
+
+
+def parse_expand(model_class, expand_param, max_depth=None):
+    """
+    Valida ?expand= e lo normalizza in una tupla ordinata di percorsi, compresi
+    quelli intermedi: "coauthors.author" -> ('coauthors', 'coauthors.author')
+    
+    Raises:
+        ExpandError: campo inesistente, non relazionale, verso un modello non
+            dinamico o percorso più profondo di DYNAMIC_MODELS_MAX_EXPAND_DEPTH
+    """
+    if max_depth is None:
+        max_depth = get_max_expand_depth()
+    
+    paths = set()
+    
+    for path in expand_param.split(','):
+        path = path.strip()
+        if not path:
+            continue
+        
+        segments = path.split('.')
+        if len(segments) > max_depth:
+            raise ExpandError(f"'{path}': profondità massima {max_depth}")
+        
+        current_model = model_class
+        for depth, name in enumerate(segments, start=1):
+            current_model = _get_expandable_field(current_model, name).related_model
+            paths.add('.'.join(segments[:depth]))
+    
+    return tuple(sorted(paths))
+
+
+def get_expand_plan(model_class, schema_version, expand_paths):
+    """
+    Piano di caricamento per i percorsi di ?expand= (già validati da parse_expand)
+    
+    Le catene di sole foreign key/one_to_one vanno in select_related, quelle che
+    attraversano una molti a molti in prefetch_related; le molti a molti non espanse
+    dei modelli collegati vengono precaricate perché il serializer annidato le
+    rappresenta come liste di id.
+    """
+    key = (model_class, schema_version, expand_paths)
+    plan = _expand_plan_cache.get(key)
+    
+    if plan is None:
+        select_related = []
+        prefetch_related = []
+        
+        for path in expand_paths:
+            current_model = model_class
+            single_valued = True
+            
+            for name in path.split('.'):
+                field = current_model._meta.get_field(name)
+                single_valued = single_valued and not field.many_to_many
+                current_model = field.related_model
+            
+            lookup = path.replace('.', '__')
+            (select_related if single_valued else prefetch_related).append(lookup)
+            
+            for m2m_field in current_model._meta.many_to_many:
+                if f'{path}.{m2m_field.name}' not in expand_paths:
+                    prefetch_related.append(f'{lookup}__{m2m_field.name}')
+        
+        plan = RelationPlan(tuple(select_related), tuple(prefetch_related))
+        
+        if len(_expand_plan_cache) >= RELATION_PLAN_CACHE_LIMIT:
+            _expand_plan_cache.clear()
+        _expand_plan_cache[key] = plan
+    
+    return plan
@@ -0,0 +1,39 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import MetaModel, MetaField, SchemaState
+from .dynamic_manager import dynamic_model_manager
+
+
+@receiver(post_save, sender=MetaModel, dispatch_uid='dynamic_models_metamodel_saved')
+def on_metamodel_saved(sender, instance, raw=False, **kwargs):
+    """Incrementa la versione dello schema quando un MetaModel viene salvato"""
+    if raw:
+        return
+    SchemaState.bump(instance.pk)
+    # Un rename invalida anche le voci indicizzate con il vecchio nome
+    dynamic_model_manager.invalidate_caches()
+
+
+@receiver(post_delete, sender=MetaModel, dispatch_uid='dynamic_models_metamodel_deleted')
+def on_metamodel_deleted(sender, instance, **kwargs):
+    """Incrementa la versione dello schema quando un MetaModel viene eliminato"""
+    SchemaState.bump()
+    dynamic_model_manager.invalidate_caches(instance.name)
+
+
+@receiver(post_save, sender=MetaField, dispatch_uid='dynamic_models_metafield_saved')
+def on_metafield_saved(sender, instance, raw=False, **kwargs):
+    """Incrementa la versione del MetaModel a cui appartiene il campo salvato"""
+    if raw:
+        return
+    SchemaState.bump(instance.meta_model_id)
+    dynamic_model_manager.invalidate_caches(instance.meta_model.name)
+
+
+@receiver(post_delete, sender=MetaField, dispatch_uid='dynamic_models_metafield_deleted')
+def on_metafield_deleted(sender, instance, **kwargs):
+    """Incrementa la versione del MetaModel a cui apparteneva il campo eliminato"""
+    SchemaState.bump(instance.meta_model_id)
+    # Durante la cancellazione a cascata del MetaModel la riga padre può non esistere più
+    meta_model = MetaModel.objects.filter(pk=instance.meta_model_id).first()
+    dynamic_model_manager.invalidate_caches(meta_model.name if meta_model else None)
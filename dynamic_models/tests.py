@@ -1,3 +1,1772 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipIf
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import Permission, User
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, pre_delete
+from django.http import QueryDict
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from . import query_dsl
+from .admin import get_dynamic_app_section_models
+from .api_views import _serializer_class_cache, get_dynamic_serializer_class, resolve_dynamic_model
+from .autocomplete import AUTOCOMPLETE_PAGE_SIZE
+from .data_views import _form_class_cache, get_dynamic_form
+from .dynamic_manager import dynamic_model_manager
+from .exporters import get_export_columns, iter_export_rows, write_columnar
+from .fulltext import apply_search, is_fulltext_supported
+from .importers import DynamicImporter
+from .jobs import (
+    STALE_JOB_CHECK_INTERVAL, STALE_JOB_TIMEOUT, JobHeartbeat, claim_next_job, requeue_stale_jobs, run_job,
+    worker_loop
+)
+from .middleware import connect_schema_monitoring
+from .models import MANAGED_INDEX_PREFIX, DataJob, MetaModel, MetaField, SchemaState
+from .query_dsl import QueryDSLError, compile_filters, get_field_types
+from .query_planner import RelationPlan, get_relation_plan
+
+
+class DynamicModelTestCase(TransactionTestCase):
+    """
+    Base per i test sui modelli dinamici: le tabelle vengono create con lo
+    schema_editor (su SQLite non dentro una transazione, quindi TransactionTestCase)
+    e rimosse a fine test insieme alle classi registrate
+    """
+
+    def setUp(self):
+        # I backup (e la pulizia di quelli vecchi) non devono toccare la directory del progetto
+        self._backup_dir = dynamic_model_manager._backup_dir
+        dynamic_model_manager._backup_dir = tempfile.mkdtemp()
+        self.meta_models = []
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def tearDown(self):
+        for meta_model in reversed(self.meta_models):
+            # Un test può aver tolto il modello dal registry: serve la classe per la DROP
+            if dynamic_model_manager.get_model(meta_model.name) is None:
+                dynamic_model_manager.register_model(meta_model)
+            dynamic_model_manager.drop_table(meta_model)
+            dynamic_model_manager.unregister_model(meta_model.name)
+        dynamic_model_manager.invalidate_caches()
+        shutil.rmtree(dynamic_model_manager._backup_dir, ignore_errors=True)
+        dynamic_model_manager._backup_dir = self._backup_dir
+
+    def create_dynamic_model(self, name, fields, **kwargs):
+        """Crea MetaModel, MetaField e tabella; restituisce (MetaModel, classe del modello)"""
+        meta_model = MetaModel.objects.create(name=name, table_name=f'test_{name.lower()}', **kwargs)
+        for field in fields:
+            MetaField.objects.create(meta_model=meta_model, **field)
+
+        dynamic_model_manager.create_table(meta_model)
+        self.meta_models.append(meta_model)
+        return meta_model, dynamic_model_manager.get_model(name)
+
+    def create_library(self):
+        """Tag, Author e Book (titolo, pagine indicizzate, autore nullable, tag M2M)"""
+        self.create_dynamic_model('Tag', [{'name': 'label', 'field_type': 'char'}])
+        self.create_dynamic_model('Author', [{'name': 'name', 'field_type': 'char'}])
+        return self.create_dynamic_model('Book', [
+            {'name': 'title', 'field_type': 'char'},
+            {'name': 'pages', 'field_type': 'integer', 'db_index': True, 'required': True},
+            {'name': 'author', 'field_type': 'foreign_key', 'related_model': 'Author',
+             'required': False, 'on_delete': 'SET_NULL'},
+            {'name': 'tags', 'field_type': 'many_to_many', 'related_model': 'Tag'},
+        ])
+
+    def walk_pages(self, url):
+        """Segue i link next di una lista paginata e restituisce gli id in ordine"""
+        ids = []
+        while url:
+            response = self.api.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return ids
+
+
+class CursorPaginationTests(DynamicModelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        _, self.Book = self.create_library()
+        Author = dynamic_model_manager.get_model('Author')
+        authors = [Author.objects.create(name=f'autore {i}') for i in range(3)]
+
+        # Valori ripetuti e autori mancanti: l'ordine deve restare deterministico
+        for i in range(60):
+            self.Book.objects.create(
+                title=f'libro {i}',
+                pages=i % 4,
+                author=authors[i % 3] if i % 5 else None,
+            )
+        self.book_ids = sorted(self.Book.objects.values_list('pk', flat=True))
+
+    def test_walk_every_page_returns_each_row_once(self):
+        for ordering in ['id', '-id', 'pages', '-pages']:
+            with self.subTest(ordering=ordering):
+                ids = self.walk_pages(f'/api/data/Book/?pagination=cursor&ordering={ordering}&page_size=7')
+                self.assertEqual(len(ids), len(set(ids)))
+                self.assertEqual(sorted(ids), self.book_ids)
+
+    def test_nullable_field_is_rejected(self):
+        for ordering in ['author', '-author']:
+            with self.subTest(ordering=ordering):
+                response = self.api.get(f'/api/data/Book/?pagination=cursor&ordering={ordering}&page_size=7')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('ordering', response.data)
+
+    def test_unindexed_field_is_rejected(self):
+        response = self.api.get('/api/data/Book/?pagination=cursor&ordering=title')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(DYNAMIC_MODELS_APPROXIMATE_COUNT_THRESHOLD=10)
+class ApproximateCountPaginationTests(DynamicModelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        _, self.Book = self.create_library()
+        for i in range(40):
+            # 30 titoli con la "o", 10 senza
+            self.Book.objects.create(title=f'romanzo {i}' if i % 4 else f'saggi {i}', pages=i)
+        self.matching_ids = sorted(self.Book.objects.filter(title__icontains='o').values_list('pk', flat=True))
+
+    def test_page_past_threshold_is_reachable(self):
+        response = self.api.get('/api/data/Book/?title__icontains=o&page=3&page_size=5')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertFalse(response.data['count_exact'])
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_walk_every_page_returns_each_matching_row(self):
+        ids = self.walk_pages('/api/data/Book/?title__icontains=o&page_size=5&ordering=id')
+        self.assertEqual(ids, self.matching_ids)
+
+    def test_page_past_the_end_is_not_found(self):
+        response = self.api.get('/api/data/Book/?title__icontains=o&page=7&page_size=5')
+        self.assertEqual(response.status_code, 404)
+
+    def test_admin_list_does_not_fall_back_to_last_estimated_page(self):
+        self.client.force_login(self.user)
+        meta_model = MetaModel.objects.get(name='Book')
+        # 30 risultati, 25 per pagina: la stima (10) darebbe una sola pagina
+        response = self.client.get(f'/data/{meta_model.pk}/?q=romanzo&page=2')
+        self.assertEqual(response.status_code, 200)
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, 2)
+        self.assertEqual(len(page_obj), 5)
+        self.assertFalse(page_obj.paginator.count_exact)
+
+
+class AppRegistryTests(DynamicModelTestCase):
+
+    def test_unregister_removes_auto_created_through_models(self):
+        _, Book = self.create_library()
+        app_models = apps.get_app_config('dynamic_models').models
+        self.assertIn('book_tags', app_models)
+
+        dynamic_model_manager.unregister_model('Book')
+
+        self.assertNotIn('book', app_models)
+        self.assertNotIn('book_tags', app_models)
+
+    def test_rebuild_does_not_reregister_through_models(self):
+        meta_model, _ = self.create_library()
+        dynamic_model_manager.unregister_model('Book')
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            Book = dynamic_model_manager.register_model(meta_model)
+
+        self.assertEqual([str(w.message) for w in caught if 'already registered' in str(w.message)], [])
+        self.assertIs(apps.get_model('dynamic_models', 'book_tags'), Book.tags.through)
+
+
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        self.meta_model = MetaModel.objects.create(name='Book', table_name='test_book')
+
+    def create_job(self, **kwargs):
+        return DataJob.objects.create(meta_model=self.meta_model, job_type=DataJob.TYPE_EXPORT, **kwargs)
+
+    def test_each_job_is_claimed_once(self):
+        first, second = self.create_job(), self.create_job()
+
+        self.assertEqual(claim_next_job('worker-a').pk, first.pk)
+        self.assertEqual(claim_next_job('worker-b').pk, second.pk)
+        self.assertIsNone(claim_next_job('worker-c'))
+
+        self.assertEqual(
+            dict(DataJob.objects.values_list('pk', 'worker')),
+            {first.pk: 'worker-a', second.pk: 'worker-b'},
+        )
+
+    def test_job_claimed_concurrently_is_skipped(self):
+        first, second = self.create_job(), self.create_job()
+        real_now = timezone.now
+
+        def claimed_by_other_worker():
+            # Un altro worker prende il primo job tra la SELECT e l'UPDATE
+            DataJob.objects.filter(pk=first.pk, status=DataJob.STATUS_PENDING).update(
+                status=DataJob.STATUS_RUNNING, worker='worker-b'
+            )
+            return real_now()
+
+        with mock.patch('dynamic_models.jobs.timezone.now', side_effect=claimed_by_other_worker):
+            job = claim_next_job('worker-a')
+
+        self.assertEqual(job.pk, second.pk)
+        first.refresh_from_db()
+        self.assertEqual(first.worker, 'worker-b')
+
+    def test_requeue_only_stale_running_jobs(self):
+        now = timezone.now()
+        stale = self.create_job(status=DataJob.STATUS_RUNNING, worker='dead',
+                                heartbeat_at=now - STALE_JOB_TIMEOUT - timedelta(seconds=1))
+        alive = self.create_job(status=DataJob.STATUS_RUNNING, worker='alive', heartbeat_at=now)
+
+        self.assertEqual(requeue_stale_jobs(), 1)
+
+        stale.refresh_from_db()
+        alive.refresh_from_db()
+        self.assertEqual((stale.status, stale.worker), (DataJob.STATUS_PENDING, ''))
+        self.assertEqual((alive.status, alive.worker), (DataJob.STATUS_RUNNING, 'alive'))
+
+    def test_worker_loop_requeues_stale_jobs_periodically(self):
+        clock = [0.0]
+        checks = []
+
+        def idle_poll(seconds):
+            clock[0] += seconds
+            if len(checks) == 3:
+                raise KeyboardInterrupt
+
+        def count_check(*args, **kwargs):
+            checks.append(clock[0])
+            return 0
+
+        interval = STALE_JOB_CHECK_INTERVAL.total_seconds()
+        with mock.patch('dynamic_models.jobs.time.monotonic', side_effect=lambda: clock[0]), \
+                mock.patch('dynamic_models.jobs.time.sleep', side_effect=idle_poll), \
+                mock.patch('dynamic_models.jobs.requeue_stale_jobs', side_effect=count_check):
+            with self.assertRaises(KeyboardInterrupt):
+                worker_loop('worker-a', poll_interval=interval / 2)
+
+        self.assertEqual(checks, [0.0, interval, interval * 2])
+
+
+class JobExecutionTests(DynamicModelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.meta_model, self.Book = self.create_library()
+
+    def create_job(self, job_type, **kwargs):
+        return DataJob.objects.create(meta_model=self.meta_model, job_type=job_type, **kwargs)
+
+    def test_import_progress_is_committed_with_each_chunk(self):
+        job = self.create_job(DataJob.TYPE_IMPORT, params={'chunk_size': 2})
+        job.source_file.save('books.csv', ContentFile('title,pages\nuno,1\ndue,x\ntre,3\nquattro,4\ncinque,5\n'))
+        job = claim_next_job('worker-a')
+
+        # Il worker termina subito dopo il commit del primo blocco
+        with mock.patch('dynamic_models.jobs.check_cancelled', side_effect=SystemExit):
+            with self.assertRaises(SystemExit):
+                run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed), (DataJob.STATUS_RUNNING, 2))
+        self.assertEqual(job.result, {'imported': 1, 'rejected': 1})
+        self.assertEqual(self.Book.objects.count(), 1)
+
+        DataJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - STALE_JOB_TIMEOUT * 2)
+        self.assertEqual(requeue_stale_jobs(), 1)
+        job = run_job(claim_next_job('worker-b'))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DataJob.STATUS_COMPLETED)
+        self.assertEqual((job.result['imported'], job.result['rejected']), (4, 1))
+        self.assertEqual(sorted(self.Book.objects.values_list('title', flat=True)), ['cinque', 'quattro', 'tre', 'uno'])
+
+    def test_cancel_requested_stops_the_job(self):
+        self.Book.objects.create(title='libro', pages=10)
+        self.create_job(DataJob.TYPE_BULK_DELETE, params={'filter': {}}, cancel_requested=True)
+
+        job = run_job(claim_next_job('worker-a'))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DataJob.STATUS_CANCELLED)
+        self.assertEqual(self.Book.objects.count(), 1)
+
+    def test_job_taken_by_another_worker_is_abandoned(self):
+        self.Book.objects.create(title='libro', pages=10)
+        self.create_job(DataJob.TYPE_BULK_DELETE, params={'filter': {}})
+        job = claim_next_job('worker-a')
+
+        # Rimesso in coda e preso da un altro worker mentre worker-a era fermo
+        DataJob.objects.filter(pk=job.pk).update(worker='worker-b')
+        run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), (DataJob.STATUS_RUNNING, 'worker-b'))
+        self.assertIsNone(job.finished_at)
+        self.assertEqual(self.Book.objects.count(), 1)
+
+    def test_heartbeat_thread_keeps_a_long_job_alive(self):
+        self.create_job(DataJob.TYPE_EXPORT)
+        job = claim_next_job('worker-a')
+        stale = timezone.now() - STALE_JOB_TIMEOUT * 2
+        DataJob.objects.filter(pk=job.pk).update(heartbeat_at=stale)
+
+        heartbeat = JobHeartbeat(job, interval=timedelta(milliseconds=20))
+        heartbeat.start()
+        time.sleep(0.2)
+        heartbeat.stop()
+
+        job.refresh_from_db()
+        self.assertGreater(job.heartbeat_at, stale)
+        self.assertEqual(requeue_stale_jobs(), 0)
+
+
+class ModelClassCacheTests(DynamicModelTestCase):
+
+    def stats_delta(self, before):
+        after = dynamic_model_manager.get_cache_stats()
+        return after['hits'] - before['hits'], after['misses'] - before['misses']
+
+    def test_unchanged_definition_reuses_class(self):
+        meta_model, Book = self.create_library()
+
+        before = dynamic_model_manager.get_cache_stats()
+        self.assertIs(dynamic_model_manager.register_model(meta_model), Book)
+        self.assertEqual(self.stats_delta(before), (1, 0))
+
+    def test_changed_field_rebuilds_class(self):
+        meta_model, Book = self.create_library()
+        field = meta_model.fields.get(name='title')
+        field.verbose_name = 'Titolo'
+        field.save()
+
+        before = dynamic_model_manager.get_cache_stats()
+        model_class = dynamic_model_manager.register_model(meta_model)
+        self.assertEqual(self.stats_delta(before), (0, 1))
+        self.assertIsNot(model_class, Book)
+        self.assertEqual(model_class._meta.get_field('title').verbose_name, 'Titolo')
+
+    def test_stale_classes_are_evicted(self):
+        book_model, Book = self.create_library()
+        author_model = MetaModel.objects.get(name='Author')
+        MetaField.objects.create(meta_model=author_model, name='country', field_type='char')
+        Author = dynamic_model_manager.register_model(author_model)
+
+        # Book punta alla classe precedente di Author: va ricostruito, non riusato
+        self.assertIs(apps.get_model('dynamic_models', 'author'), Author)
+        before = dynamic_model_manager.get_cache_stats()
+        NewBook = dynamic_model_manager.register_model(book_model)
+        self.assertEqual(self.stats_delta(before), (0, 1))
+        self.assertIsNot(NewBook, Book)
+        self.assertIs(NewBook._meta.get_field('author').related_model, Author)
+
+        # Dopo la rimozione la classe non resta in cache
+        dynamic_model_manager.unregister_model('Book')
+        self.assertNotIn('Book', dynamic_model_manager._model_class_cache)
+        before = dynamic_model_manager.get_cache_stats()
+        dynamic_model_manager.register_model(book_model)
+        self.assertEqual(self.stats_delta(before), (0, 1))
+
+    def test_load_all_models_resolves_chains_and_cycles(self):
+        self.create_library()
+        person_model, _ = self.create_dynamic_model('Person', [{'name': 'name', 'field_type': 'char'}])
+        self.create_dynamic_model('Team', [
+            {'name': 'leader', 'field_type': 'foreign_key', 'related_model': 'Person', 'on_delete': 'SET_NULL'},
+        ])
+        MetaField.objects.create(meta_model=person_model, name='team', field_type='foreign_key',
+                                 related_model='Team', on_delete='SET_NULL')
+
+        # Registry vuoto come all'avvio del processo
+        for name in list(dynamic_model_manager.registered_models):
+            dynamic_model_manager.unregister_model(name)
+        with self.assertNumQueries(3):
+            # versione dello schema + MetaModel attivi + tutti i loro MetaField
+            dynamic_model_manager.load_all_models()
+
+        stats = dynamic_model_manager.bootstrap_stats
+        self.assertEqual((stats['models'], stats['errors']), (5, 0))
+        self.assertEqual(stats['cyclic_models'], ['Person', 'Team'])
+
+        Book, Person, Team = (dynamic_model_manager.get_model(name) for name in ('Book', 'Person', 'Team'))
+        self.assertIs(Book._meta.get_field('author').related_model, dynamic_model_manager.get_model('Author'))
+        self.assertIs(Person._meta.get_field('team').related_model, Team)
+        self.assertIs(Team._meta.get_field('leader').related_model, Person)
+
+    def test_load_order_registers_targets_first(self):
+        self.create_library()
+        meta_models = list(MetaModel.objects.prefetch_related('fields').order_by('-name'))
+        fields_by_model = {meta_model.name: list(meta_model.fields.all()) for meta_model in meta_models}
+
+        with self.assertNumQueries(0):
+            ordered, cyclic = dynamic_model_manager._resolve_load_order(meta_models, fields_by_model)
+
+        names = [meta_model.name for meta_model in ordered]
+        self.assertEqual(cyclic, set())
+        self.assertLess(names.index('Author'), names.index('Book'))
+        self.assertLess(names.index('Tag'), names.index('Book'))
+
+    def test_many_to_many_writes_after_update_table(self):
+        meta_model, _ = self.create_library()
+        MetaField.objects.create(meta_model=meta_model, name='isbn', field_type='char')
+        dynamic_model_manager.update_table(meta_model)
+
+        # La tabella intermedia della nuova classe deve puntare alla nuova classe, non a quella sostituita
+        Book = dynamic_model_manager.get_model('Book')
+        Tag = dynamic_model_manager.get_model('Tag')
+        self.assertIs(Book.tags.through._meta.get_field('book').related_model, Book)
+
+        book = Book.objects.create(title='libro', pages=10, isbn='978-88')
+        tag = Tag.objects.create(label='romanzo')
+        book.tags.add(tag)
+        self.assertEqual(list(Book.objects.get(pk=book.pk).tags.values_list('label', flat=True)), ['romanzo'])
+
+
+@override_settings(DYNAMIC_MODELS_LAZY_LOADING=True, DYNAMIC_MODELS_MAX_LOADED_MODELS=1)
+class LazyLoadingTests(DynamicModelTestCase):
+
+    def unload(self, *names):
+        for name in names:
+            dynamic_model_manager.unregister_model(name)
+
+    def test_materializes_targets_and_referrers(self):
+        self.create_library()
+        self.unload('Book', 'Author', 'Tag')
+        lazy_loads = dynamic_model_manager.cache_stats['lazy_loads']
+
+        Author = dynamic_model_manager.get_model('Author')
+
+        self.assertIs(apps.get_model('dynamic_models', 'Author'), Author)
+        # Book ha una foreign key verso Author, Tag è il target della molti a molti di Book
+        self.assertEqual(set(dynamic_model_manager.registered_models), {'Author', 'Book', 'Tag'})
+        self.assertEqual(dynamic_model_manager.cache_stats['lazy_loads'], lazy_loads + 3)
+
+    def test_delete_applies_on_delete_of_unloaded_referrers(self):
+        _, Book = self.create_library()
+        Author = dynamic_model_manager.get_model('Author')
+        book = Book.objects.create(title='libro', pages=10, author=Author.objects.create(name='autore'))
+        self.unload('Book', 'Author', 'Tag')
+
+        dynamic_model_manager.get_model('Author').objects.get().delete()
+
+        # on_delete=SET_NULL applicato anche se Book non era caricato
+        self.assertIsNone(dynamic_model_manager.get_model('Book').objects.get(pk=book.pk).author_id)
+
+    def test_connected_models_are_pinned(self):
+        self.create_library()
+        self.unload('Book', 'Author', 'Tag')
+        evictions = dynamic_model_manager.cache_stats['evictions']
+
+        dynamic_model_manager.get_model('Book')
+
+        self.assertEqual(set(dynamic_model_manager.registered_models), {'Author', 'Book', 'Tag'})
+        self.assertEqual(dynamic_model_manager.cache_stats['evictions'], evictions)
+
+    def test_cold_models_are_evicted_but_not_concrete_models(self):
+        self.create_dynamic_model('Note', [{'name': 'text', 'field_type': 'char'}])
+        self.create_dynamic_model('Memo', [{'name': 'text', 'field_type': 'char'}])
+        self.unload('Note', 'Memo')
+        evictions = dynamic_model_manager.cache_stats['evictions']
+
+        self.assertIs(dynamic_model_manager.get_model('MetaModel'), MetaModel)
+        dynamic_model_manager.get_model('Note')
+        dynamic_model_manager.get_model('Memo')
+
+        self.assertEqual(set(dynamic_model_manager.registered_models), {'Memo'})
+        self.assertEqual(dynamic_model_manager.cache_stats['evictions'], evictions + 1)
+        self.assertNotIn('MetaModel', dynamic_model_manager._access_order)
+        self.assertIs(apps.get_model('dynamic_models', 'MetaModel'), MetaModel)
+        self.assertIsNone(apps.get_app_config('dynamic_models').models.get('note'))
+
+
+@override_settings(DYNAMIC_MODELS_LAZY_LOADING=True)
+class AdminAppSectionTests(DynamicModelTestCase):
+
+    def test_section_does_not_materialize_models(self):
+        self.create_library()
+        MetaModel.objects.create(name='Draft', table_name='test_draft')
+        for name in ['Book', 'Author', 'Tag']:
+            dynamic_model_manager.unregister_model(name)
+        dynamic_model_manager.invalidate_caches()
+
+        section_models = get_dynamic_app_section_models()
+
+        self.assertEqual(sorted(model['object_name'] for model in section_models), ['Author', 'Book', 'Tag'])
+        self.assertEqual(dynamic_model_manager.registered_models, {})
+
+    def test_section_follows_table_creation_and_drop(self):
+        self.client.force_login(self.user)
+        meta_model = MetaModel.objects.create(name='Draft', table_name='test_draft')
+        MetaField.objects.create(meta_model=meta_model, name='title', field_type='char')
+        data_list_url = reverse('dynamic_data_list', args=[meta_model.pk])
+        # Classe già costruita (es. all'avvio) prima che la tabella esista
+        dynamic_model_manager.register_model(meta_model)
+
+        self.assertNotContains(self.client.get('/admin/'), data_list_url)
+
+        dynamic_model_manager.create_table(meta_model)
+        self.assertContains(self.client.get('/admin/'), data_list_url)
+
+        dynamic_model_manager.drop_table(meta_model)
+        self.assertNotContains(self.client.get('/admin/'), data_list_url)
+
+
+class SchemaMonitoringTests(DynamicModelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.meta_model, _ = self.create_library()
+        connect_schema_monitoring()
+        self.addCleanup(self.disconnect_schema_monitoring)
+
+    def disconnect_schema_monitoring(self):
+        post_save.disconnect(sender=MetaModel, dispatch_uid='dynamic_models_monitor_metamodel_change')
+        post_save.disconnect(sender=MetaField, dispatch_uid='dynamic_models_monitor_metafield_change')
+        pre_delete.disconnect(sender=MetaField, dispatch_uid='dynamic_models_monitor_metafield_delete')
+        pre_delete.disconnect(sender=MetaModel, dispatch_uid='dynamic_models_monitor_metamodel_delete')
+
+    def test_rolled_back_changes_are_not_reused_by_the_same_atomic(self):
+        # @transaction.atomic su una funzione riusa la stessa istanza di Atomic ad ogni chiamata
+        @transaction.atomic
+        def delete_title(fail):
+            self.meta_model.fields.get(name='title').delete()
+            if fail:
+                raise RuntimeError('annullata')
+
+        with mock.patch.object(dynamic_model_manager, '_create_backup', return_value=None) as create_backup, \
+                mock.patch.object(dynamic_model_manager, 'update_table') as update_table:
+            with self.assertRaises(RuntimeError):
+                delete_title(fail=True)
+            delete_title(fail=False)
+
+        # Il backup della transazione annullata non vale per quella successiva
+        self.assertEqual(create_backup.call_count, 2)
+        update_table.assert_not_called()
+        self.assertFalse(self.meta_model.fields.filter(name='title').exists())
+
+    def test_field_changes_are_applied_once_per_transaction(self):
+        with mock.patch.object(dynamic_model_manager, 'update_table') as update_table:
+            with transaction.atomic():
+                MetaField.objects.create(meta_model=self.meta_model, name='isbn', field_type='char')
+                MetaField.objects.create(meta_model=self.meta_model, name='year', field_type='integer')
+                update_table.assert_not_called()
+
+        update_table.assert_called_once()
+
+    def test_committed_changes_are_not_reused_by_the_same_atomic(self):
+        @transaction.atomic
+        def add_field(name):
+            MetaField.objects.create(meta_model=self.meta_model, name=name, field_type='char')
+
+        with mock.patch.object(dynamic_model_manager, 'update_table') as update_table:
+            add_field('isbn')
+            add_field('publisher')
+
+        # Ogni transazione confermata applica le proprie modifiche
+        self.assertEqual(update_table.call_count, 2)
+
+    def test_rolled_back_savepoint_keeps_outer_changes(self):
+        with mock.patch.object(dynamic_model_manager, 'update_table') as update_table:
+            with transaction.atomic():
+                MetaField.objects.create(meta_model=self.meta_model, name='isbn', field_type='char')
+                with self.assertRaises(RuntimeError), transaction.atomic():
+                    MetaField.objects.create(meta_model=self.meta_model, name='year', field_type='integer')
+                    raise RuntimeError('annullata')
+
+        update_table.assert_called_once()
+
+    def test_rolled_back_savepoint_discards_its_changes(self):
+        with mock.patch.object(dynamic_model_manager, 'update_table') as update_table:
+            with transaction.atomic():
+                with self.assertRaises(RuntimeError), transaction.atomic():
+                    MetaField.objects.create(meta_model=self.meta_model, name='year', field_type='integer')
+                    raise RuntimeError('annullata')
+
+        update_table.assert_not_called()
+
+
+class SchemaVersionSyncTests(DynamicModelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.create_library()
+        self.addCleanup(setattr, dynamic_model_manager, '_schema_version_seen',
+                        dynamic_model_manager._schema_version_seen)
+
+    def change_in_other_process(self):
+        """
+        Aggiunge un campo a Tag come farebbe un altro processo: la versione globale
+        avanza (SchemaState.bump) ma questo processo resta alla versione precedente
+        """
+        version = SchemaState.get_version()
+        MetaField.objects.create(meta_model=MetaModel.objects.get(name='Tag'), name='color', field_type='char')
+        self.assertGreater(SchemaState.get_version(), version)
+        dynamic_model_manager._schema_version_seen = version
+
+    def test_sync_reloads_only_changed_models(self):
+        self.change_in_other_process()
+
+        with mock.patch.object(dynamic_model_manager, 'register_model',
+                               wraps=dynamic_model_manager.register_model) as register_model:
+            self.assertEqual(dynamic_model_manager.sync_schema_version(), ['Tag'])
+
+        self.assertEqual([call.args[0].name for call in register_model.call_args_list], ['Tag'])
+        self.assertEqual(dynamic_model_manager.schema_version, SchemaState.get_version())
+        self.assertTrue(hasattr(dynamic_model_manager.get_model('Tag'), 'color'))
+
+        # Senza nuove modifiche basta la lettura della versione
+        with self.assertNumQueries(1):
+            self.assertEqual(dynamic_model_manager.sync_schema_version(), [])
+
+    def test_middleware_syncs_before_the_request(self):
+        self.change_in_other_process()
+
+        with mock.patch.object(dynamic_model_manager, 'register_model',
+                               wraps=dynamic_model_manager.register_model) as register_model:
+            response = self.api.get('/api/data/Tag/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([call.args[0].name for call in register_model.call_args_list], ['Tag'])
+        self.assertTrue(hasattr(dynamic_model_manager.get_model('Tag'), 'color'))
+
+
+class APIQueryCountTests(DynamicModelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.meta_model, self.Book = self.create_library()
+        self.Book.objects.create(title='libro', pages=10)
+
+    def metadata_queries(self, queries):
+        """Query sulle tabelle dei metadati (MetaModel/MetaField)"""
+        return [query['sql'] for query in queries if 'dynamic_models_meta' in query['sql']]
+
+    def test_warm_model_resolution_does_not_query_metadata(self):
+        resolve_dynamic_model('Book')
+        with self.assertNumQueries(0):
+            resolution = resolve_dynamic_model('Book')
+        self.assertIs(resolution['model_class'], self.Book)
+
+        self.assertEqual(self.api.get('/api/data/Book/').status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get('/api/data/Book/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.metadata_queries(queries), [])
+
+    def test_schema_change_invalidates_model_resolution(self):
+        resolve_dynamic_model('Book')
+        MetaField.objects.create(meta_model=self.meta_model, name='isbn', field_type='char')
+        dynamic_model_manager.update_table(self.meta_model)
+
+        with CaptureQueriesContext(connection) as queries:
+            resolution = resolve_dynamic_model('Book')
+        self.assertNotEqual(self.metadata_queries(queries), [])
+        self.assertIn('isbn', [field.name for field in resolution['fields']])
+        self.assertIs(resolution['model_class'], dynamic_model_manager.get_model('Book'))
+
+
+    def book_serializer_classes(self):
+        return {
+            serializer_class for key, serializer_class in _serializer_class_cache.items()
+            if key[0].__name__ == 'Book'
+        }
+
+    def test_serializer_class_is_reused_across_requests(self):
+        self.assertEqual(self.api.get('/api/data/Book/').status_code, 200)
+        serializer_classes = self.book_serializer_classes()
+        self.assertEqual(len(serializer_classes), 1)
+        serializer_class = next(iter(serializer_classes))
+
+        self.assertEqual(self.api.get('/api/data/Book/').status_code, 200)
+        self.assertEqual(self.book_serializer_classes(), {serializer_class})
+        schema_version = MetaModel.objects.get(name='Book').schema_version
+        with self.assertNumQueries(0):
+            self.assertIs(get_dynamic_serializer_class(self.Book, schema_version), serializer_class)
+            serializer_class(self.Book.objects.none(), many=True).child.fields
+        # I campi vengono introspezionati una volta per classe
+        self.assertIn('_fields_prototype', serializer_class.__dict__)
+
+    def test_field_change_invalidates_serializer_class(self):
+        self.assertEqual(self.api.get('/api/data/Book/').status_code, 200)
+        old_classes = self.book_serializer_classes()
+
+        MetaField.objects.create(meta_model=self.meta_model, name='isbn', field_type='char')
+        dynamic_model_manager.update_table(self.meta_model)
+        self.assertEqual(self.book_serializer_classes(), set())
+
+        response = self.api.get('/api/data/Book/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('isbn', response.data['results'][0])
+        self.assertFalse(self.book_serializer_classes() & old_classes)
+
+
+    def count_queries(self, url):
+        # La prima richiesta sincronizza lo schema del processo; il documento
+        # dello schema è in cache e va ricostruito ad ogni misura
+        self.api.get(url)
+        dynamic_model_manager.invalidate_caches()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_meta_model_queries_do_not_grow_with_models(self):
+        urls = ['/api/meta-models/', '/api/meta-models/schema/']
+        counts = [self.count_queries(url) for url in urls]
+
+        for i in range(3):
+            self.create_dynamic_model(f'Extra{i}', [
+                {'name': 'name', 'field_type': 'char'},
+                {'name': 'book', 'field_type': 'foreign_key', 'related_model': 'Book', 'on_delete': 'SET_NULL'},
+            ])
+
+        for url, count in zip(urls, counts):
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), count)
+
+
+class FieldSelectionTests(DynamicModelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        _, self.Book = self.create_library()
+        author = dynamic_model_manager.get_model('Author').objects.create(name='Calvino')
+        tag = dynamic_model_manager.get_model('Tag').objects.create(label='romanzo')
+        self.book = self.Book.objects.create(title='Il barone rampante', pages=280, author=author)
+        self.book.tags.add(tag)
+
+    def get(self, url):
+        """Richiesta GET; restituisce (risposta, SQL della SELECT sulla tabella dei libri)"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get(url)
+        selects = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT') and 'FROM "test_book"' in query['sql'] and 'COUNT' not in query['sql']
+        ]
+        return response, selects[-1] if selects else ''
+
+    def test_fields_limits_columns_and_keeps_pk(self):
+        response, sql = self.get('/api/data/Book/?fields=title')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+
+        columns = sql.split(' FROM ')[0]
+        self.assertIn('"test_book"."id"', columns)
+        self.assertIn('"test_book"."title"', columns)
+        self.assertNotIn('"test_book"."pages"', columns)
+        self.assertNotIn('"test_book"."author_id"', columns)
+
+    def test_exclude_removes_fields(self):
+        response, sql = self.get('/api/data/Book/?exclude=pages,tags')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'author'})
+        self.assertNotIn('"test_book"."pages"', sql.split(' FROM ')[0])
+
+        response, _ = self.get(f'/api/data/Book/{self.book.pk}/?fields=title,tags&exclude=tags')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(set(response.data), {'id', 'title'})
+
+    def test_unknown_field_is_rejected(self):
+        for param in ['fields=title,publisher', 'exclude=publisher']:
+            with self.subTest(param=param):
+                response = self.api.get(f'/api/data/Book/?{param}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('publisher', str(response.data['fields']))
+
+    def test_expand_requires_selected_field(self):
+        response = self.api.get('/api/data/Book/?fields=title&expand=author')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expand', response.data)
+
+        response = self.api.get('/api/data/Book/?fields=title,author&expand=author')
+        self.assertEqual(response.status_code, 200, response.content)
+        row = response.data['results'][0]
+        self.assertEqual(set(row), {'id', 'title', 'author'})
+        self.assertEqual(row['author']['name'], 'Calvino')
+
+
+class IndexManagementTests(DynamicModelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.meta_model, _ = self.create_library()
+
+    def table_indexes(self):
+        """Indici non univoci della tabella dei libri letti dal database: nome -> colonne"""
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, 'test_book')
+        return {
+            name: info['columns'] for name, info in constraints.items()
+            if info['index'] and not info['primary_key'] and not info['unique']
+        }
+
+    def managed(self, indexes):
+        return {name: columns for name, columns in indexes.items() if name.startswith(MANAGED_INDEX_PREFIX)}
+
+    def test_index_definitions(self):
+        self.meta_model.indexes = [
+            {'fields': ['title', '-pages']},
+            {'fields': ['title'], 'condition': {'pages__gt': 100}},
+            {'fields': ['tags']},
+        ]
+        definitions = {tuple(index.fields): index for index in self.meta_model.get_index_definitions()}
+
+        # db_index sulla foreign key e indici sulle M2M non generano indici gestiti
+        self.assertEqual(set(definitions), {('pages',), ('title', '-pages'), ('title',)})
+        self.assertIsNone(definitions[('title', '-pages')].condition)
+        self.assertEqual(definitions[('title',)].condition, Q(pages__gt=100))
+        for index in definitions.values():
+            self.assertTrue(index.name.startswith(MANAGED_INDEX_PREFIX))
+            self.assertLessEqual(len(index.name), 30)
+
+    def test_update_table_creates_and_drops_managed_indexes(self):
+        initial = self.table_indexes()
+        self.assertEqual(list(self.managed(initial).values()), [['pages']])
+        foreign_key_indexes = {name: columns for name, columns in initial.items() if columns == ['author_id']}
+        self.assertEqual(len(foreign_key_indexes), 1)
+
+        self.meta_model.indexes = [
+            {'fields': ['title', '-pages']},
+            {'fields': ['title'], 'condition': {'pages__gt': 100}},
+        ]
+        self.meta_model.save()
+        dynamic_model_manager.update_table(self.meta_model)
+
+        managed = self.managed(self.table_indexes())
+        self.assertEqual(sorted(managed.values()), [['pages'], ['title'], ['title', 'pages']])
+        if connection.vendor == 'sqlite':
+            partial_name = next(name for name, columns in managed.items() if columns == ['title'])
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT sql FROM sqlite_master WHERE name = %s", [partial_name])
+                self.assertIn('WHERE', cursor.fetchone()[0])
+
+        # Rimuovendo le dichiarazioni gli indici gestiti spariscono, quello della foreign key resta
+        self.meta_model.indexes = []
+        self.meta_model.save()
+        MetaField.objects.filter(meta_model=self.meta_model, name='pages').update(db_index=False)
+        dynamic_model_manager.update_table(self.meta_model)
+
+        final = self.table_indexes()
+        self.assertEqual(self.managed(final), {})
+        for name, columns in foreign_key_indexes.items():
+            self.assertEqual(final.get(name), columns)
+
+
+class SchemaConditionalResponseTests(DynamicModelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.meta_model, _ = self.create_library()
+
+    def get(self, url, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.api.get(url, **headers)
+
+    def test_unchanged_schema_returns_not_modified(self):
+        response = self.get('/api/meta-models/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.get('/api/meta-models/', etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # Una modifica dello schema invalida il validatore
+        MetaField.objects.create(meta_model=self.meta_model, name='isbn', field_type='char')
+        self.assertEqual(self.get('/api/meta-models/', etag).status_code, 200)
+
+    def test_pages_and_endpoints_do_not_share_etags(self):
+        urls = [
+            '/api/meta-models/',
+            '/api/meta-models/?page=2',
+            '/api/meta-models/schema/',
+            f'/api/meta-models/{self.meta_model.pk}/',
+        ]
+        etags = [self.get(url)['ETag'] for url in urls[:1] + urls[2:]]
+        self.assertEqual(len(set(etags)), 3)
+
+        # La prima pagina non convalida le altre risorse
+        for url in urls[1:]:
+            self.assertNotEqual(self.get(url, etags[0]).status_code, 304, url)
+
+    def test_query_string_order_does_not_change_etag(self):
+        first = self.get('/api/meta-models/?page=1&format=json')
+        second = self.get('/api/meta-models/?format=json&page=1')
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertNotEqual(first['ETag'], self.get('/api/meta-models/')['ETag'])
+
+
+class BulkEndpointTests(DynamicModelTestCase):
+
+    url = '/api/data/Product/bulk/'
+
+    def setUp(self):
+        super().setUp()
+        _, self.Tag = self.create_dynamic_model('Tag', [{'name': 'label', 'field_type': 'char'}])
+        _, self.Product = self.create_dynamic_model('Product', [
+            {'name': 'sku', 'field_type': 'char', 'required': True, 'unique': True},
+            {'name': 'name', 'field_type': 'char'},
+            {'name': 'stock', 'field_type': 'integer'},
+            {'name': 'tags', 'field_type': 'many_to_many', 'related_model': 'Tag'},
+        ])
+
+    def test_create(self):
+        tag = self.Tag.objects.create(label='offerta')
+        response = self.api.post(self.url, [
+            {'sku': 'A1', 'name': 'penna', 'stock': 10, 'tags': [tag.pk]},
+            {'sku': 'B2', 'name': 'matita', 'stock': 5},
+            {'sku': 'C3', 'name': 'gomma'},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data, {'created': 3, 'updated': 0, 'errors': [], 'chunk_size': 1000})
+        self.assertEqual(sorted(self.Product.objects.values_list('sku', flat=True)), ['A1', 'B2', 'C3'])
+        self.assertEqual(list(self.Product.objects.get(sku='A1').tags.all()), [tag])
+
+    def test_upsert_on_unique_key(self):
+        self.Product.objects.create(sku='A1', name='vecchio nome', stock=1)
+
+        response = self.api.post(f'{self.url}?upsert_on=sku', [
+            {'sku': 'A1', 'name': 'penna', 'stock': 10},
+            {'sku': 'B2', 'name': 'matita', 'stock': 5},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 1))
+        self.assertEqual(self.Product.objects.count(), 2)
+        self.assertEqual(self.Product.objects.values_list('name', 'stock').get(sku='A1'), ('penna', 10))
+
+    def test_upsert_on_non_unique_field_is_rejected(self):
+        response = self.api.post(f'{self.url}?upsert_on=name', [{'sku': 'A1'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('upsert_on', response.data)
+
+    def test_rejected_chunk_returns_multi_status(self):
+        real_bulk_create = self.Product.objects.bulk_create
+        calls = []
+
+        def fail_second_chunk(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise IntegrityError('vincolo violato')
+            return real_bulk_create(*args, **kwargs)
+
+        rows = [{'sku': f'P{i}', 'name': f'prodotto {i}'} for i in range(5)]
+        with mock.patch.object(self.Product.objects, 'bulk_create', side_effect=fail_second_chunk):
+            response = self.api.post(f'{self.url}?chunk_size=2', rows, format='json')
+
+        self.assertEqual(response.status_code, 207, response.content)
+        self.assertEqual(set(response.data), {'created', 'updated', 'errors', 'chunk_size'})
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['chunk_size']), (3, 0, 2))
+        self.assertEqual([error['index'] for error in response.data['errors']], [2, 3])
+        for error in response.data['errors']:
+            self.assertEqual(set(error), {'index', 'errors'})
+            self.assertIn('non_field_errors', error['errors'])
+
+        # Il blocco rifiutato è annullato per intero, gli altri restano scritti
+        self.assertEqual(sorted(self.Product.objects.values_list('sku', flat=True)), ['P0', 'P1', 'P4'])
+
+    def test_invalid_rows_are_reported_by_index(self):
+        self.Product.objects.create(sku='A1')
+
+        response = self.api.post(self.url, [
+            {'sku': 'B2', 'stock': 'molti'},
+            {'sku': 'C3'},
+            {'sku': 'A1'},
+            {'sku': 'C3'},
+            'non un oggetto',
+        ], format='json')
+
+        self.assertEqual(response.status_code, 207, response.content)
+        self.assertEqual(response.data['created'], 1)
+        errors = {error['index']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(sorted(errors), [0, 2, 3, 4])
+        self.assertIn('stock', errors[0])
+        self.assertIn('sku', errors[2])
+        self.assertIn('sku', errors[3])
+        self.assertIn('non_field_errors', errors[4])
+
+    def test_only_invalid_rows_is_bad_request(self):
+        response = self.api.post(self.url, [{'name': 'senza sku'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(response.data['errors'][0]['index'], 0)
+
+
+class QueryDSLTests(DynamicModelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        _, Tag = self.create_dynamic_model('Tag', [{'name': 'label', 'field_type': 'char'}])
+        _, Author = self.create_dynamic_model('Author', [{'name': 'name', 'field_type': 'char'}])
+        self.meta_model, self.Item = self.create_dynamic_model('Item', [
+            {'name': 'title', 'field_type': 'char'},
+            {'name': 'pages', 'field_type': 'integer'},
+            {'name': 'price', 'field_type': 'decimal'},
+            {'name': 'published', 'field_type': 'date'},
+            {'name': 'flag', 'field_type': 'boolean'},
+            # Campo con il nome di un parametro riservato
+            {'name': 'search', 'field_type': 'char'},
+            {'name': 'author', 'field_type': 'foreign_key', 'related_model': 'Author', 'on_delete': 'SET_NULL'},
+            {'name': 'tags', 'field_type': 'many_to_many', 'related_model': 'Tag'},
+        ])
+        self.field_types = get_field_types(self.Item, list(self.meta_model.fields.all()))
+
+        self.tag_x, self.tag_y = Tag.objects.create(label='x'), Tag.objects.create(label='y')
+        self.author_a, self.author_b = Author.objects.create(name='a'), Author.objects.create(name='b')
+
+        alpha = self.Item.objects.create(title='Alpha', pages=100, price=Decimal('9.50'), published=date(2024, 1, 1),
+                                         flag=True, search='alpha', author=self.author_a)
+        beta = self.Item.objects.create(title='beta', pages=250, price=Decimal('20.00'), published=date(2024, 6, 1),
+                                        flag=False, search='beta', author=self.author_b)
+        self.Item.objects.create(title='Gamma', pages=400)
+        alpha.tags.set([self.tag_x])
+        beta.tags.set([self.tag_x, self.tag_y])
+
+    def compile(self, query_string):
+        return compile_filters(self.Item, self.field_types, QueryDict(query_string))
+
+    def titles(self, query_string):
+        q_object, uses_many_to_many = self.compile(query_string)
+        queryset = self.Item.objects.filter(q_object)
+        if uses_many_to_many:
+            queryset = queryset.distinct()
+        return sorted(queryset.values_list('title', flat=True))
+
+    def test_each_operator(self):
+        a, b, x, y = self.author_a.pk, self.author_b.pk, self.tag_x.pk, self.tag_y.pk
+        cases = {
+            'title=Alpha': ['Alpha'],
+            'title__iexact=alpha': ['Alpha'],
+            'title__contains=et': ['beta'],
+            'title__icontains=A': ['Alpha', 'Gamma', 'beta'],
+            'title__startswith=G': ['Gamma'],
+            'title__istartswith=B': ['beta'],
+            'title__in=Alpha,Gamma': ['Alpha', 'Gamma'],
+            'pages__gt=100': ['Gamma', 'beta'],
+            'pages__gte=250': ['Gamma', 'beta'],
+            'pages__lt=250': ['Alpha'],
+            'pages__lte=250': ['Alpha', 'beta'],
+            'pages__range=100,300': ['Alpha', 'beta'],
+            'pages__in=100,400': ['Alpha', 'Gamma'],
+            'price__gte=10': ['beta'],
+            'price__isnull=true': ['Gamma'],
+            'published__lt=2024-03-01': ['Alpha'],
+            'published__range=2024-01-01,2024-12-31': ['Alpha', 'beta'],
+            'flag__isnull=1': ['Gamma'],
+            f'author={a}': ['Alpha'],
+            f'author__in={a},{b}': ['Alpha', 'beta'],
+            'author__isnull=true': ['Gamma'],
+            f'tags={x}': ['Alpha', 'beta'],
+            f'tags__in={x},{y}': ['Alpha', 'beta'],
+            'pages__gte=100&pages__lt=400': ['Alpha', 'beta'],
+        }
+        for query_string, expected in cases.items():
+            with self.subTest(query_string=query_string):
+                self.assertEqual(self.titles(query_string), expected)
+
+    def test_json_filter(self):
+        tree = {'or': [
+            {'field': 'title', 'op': 'startswith', 'value': 'G'},
+            {'and': [{'field': 'pages', 'op': 'in', 'value': [100, 250]}, {'not': {'field': 'flag', 'value': True}}]},
+        ]}
+        self.assertEqual(self.titles(urlencode({'filter': json.dumps(tree)})), ['Gamma', 'beta'])
+
+    def test_many_to_many_filter_requires_distinct(self):
+        self.assertTrue(self.compile(f'tags={self.tag_x.pk}')[1])
+        self.assertFalse(self.compile('pages__gt=1')[1])
+
+    def test_unknown_field_or_lookup_is_rejected(self):
+        for query_string in [
+            urlencode({'filter': json.dumps({'field': 'missing', 'value': 1})}),
+            'title__regex=^A',
+            'title__gt=A',
+            'flag__in=true,false',
+            'tags__icontains=x',
+            urlencode({'filter': json.dumps({'and': []})}),
+            'filter=non json',
+        ]:
+            with self.subTest(query_string=query_string):
+                with self.assertRaises(QueryDSLError):
+                    self.compile(query_string)
+
+    def test_non_string_field_or_op_is_rejected(self):
+        for tree in [
+            {'field': ['title'], 'value': 'Alpha'},
+            {'field': {'name': 'title'}, 'value': 'Alpha'},
+            {'field': 'title', 'op': ['exact'], 'value': 'Alpha'},
+            {'field': 'title', 'op': {'exact': True}, 'value': 'Alpha'},
+            {'field': 'published', 'value': {'year': 2024}},
+            {'field': 'pages', 'op': 'in', 'value': [[1, 2]]},
+        ]:
+            with self.subTest(tree=tree):
+                with self.assertRaises(QueryDSLError):
+                    self.compile(urlencode({'filter': json.dumps(tree)}))
+
+        response = self.api.get('/api/data/Item/?' + urlencode({'filter': json.dumps({'field': ['title']})}))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('filter', response.data)
+
+    def test_filter_depth_is_limited(self):
+        def nested(depth):
+            tree = {'field': 'title', 'value': 'Alpha'}
+            for _ in range(depth - 1):
+                tree = {'and': [tree]}
+            return tree
+
+        self.assertEqual(self.titles(urlencode({'filter': json.dumps(nested(query_dsl.MAX_FILTER_DEPTH))})), ['Alpha'])
+        with self.assertRaises(QueryDSLError):
+            self.compile(urlencode({'filter': json.dumps(nested(query_dsl.MAX_FILTER_DEPTH + 1))}))
+
+        # Annidamento oltre il limite di ricorsione del parser JSON
+        deep_filter = '{"not": ' * 100000 + '{"field": "title", "value": "Alpha"}' + '}' * 100000
+        with self.assertRaises(QueryDSLError):
+            self.compile(urlencode({'filter': deep_filter}))
+
+    def test_invalid_value_is_rejected(self):
+        for query_string in ['pages=molte', 'published=ieri', 'pages__range=1', 'flag=forse']:
+            with self.subTest(query_string=query_string):
+                with self.assertRaises(QueryDSLError):
+                    self.compile(query_string)
+
+    def test_boolean_and_date_values_are_coerced(self):
+        self.assertEqual(self.compile('flag=true')[0], Q(flag__exact=True))
+        self.assertEqual(self.compile('flag=false')[0], Q(flag__exact=False))
+        self.assertEqual(self.compile('published__gte=2024-03-01')[0], Q(published__gte=date(2024, 3, 1)))
+        self.assertEqual(self.compile('pages__in=1,2')[0], Q(pages__in=[1, 2]))
+        self.assertEqual(self.titles('flag=true'), ['Alpha'])
+        self.assertEqual(self.titles('flag=false'), ['beta'])
+
+    def test_reserved_params_are_not_filters(self):
+        self.assertEqual(self.compile('search=alpha&page=2&page_size=5&ordering=title&fields=title&expand=author'),
+                         (Q(), False))
+        # Parametri che non corrispondono a nessun campo vengono ignorati
+        self.assertEqual(self.compile('missing=1&missing__gt=2'), (Q(), False))
+
+    def test_plans_are_cached_and_bounded(self):
+        first = self.compile('pages__gt=1')
+        self.assertIs(self.compile('pages__gt=1'), first)
+
+        with mock.patch('dynamic_models.query_dsl.PLAN_CACHE_LIMIT', 3):
+            for pages in range(10):
+                self.compile(f'pages__gt={pages}')
+                self.assertLessEqual(len(query_dsl._plan_cache), 3)
+
+        dynamic_model_manager.invalidate_caches('Item')
+        self.assertFalse(any(key[0] is self.Item for key in query_dsl._plan_cache))
+
+    def test_api_filters(self):
+        response = self.api.get('/api/data/Item/?flag=true')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([row['title'] for row in response.data['results']], ['Alpha'])
+
+        response = self.api.get('/api/data/Item/?title__regex=A')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('filter', response.data)
+
+
+class ImporterTests(DynamicModelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        _, self.Author = self.create_dynamic_model('Author', [
+            {'name': 'name', 'field_type': 'char', 'required': True, 'unique': True},
+        ])
+        _, self.Tag = self.create_dynamic_model('Tag', [
+            {'name': 'label', 'field_type': 'char', 'required': True, 'unique': True},
+        ])
+        self.meta_model, self.Book = self.create_dynamic_model('Book', [
+            {'name': 'title', 'field_type': 'char', 'required': True},
+            {'name': 'isbn', 'field_type': 'char', 'unique': True},
+            {'name': 'pages', 'field_type': 'integer', 'required': True},
+            {'name': 'price', 'field_type': 'decimal'},
+            {'name': 'published', 'field_type': 'date'},
+            {'name': 'available', 'field_type': 'boolean'},
+            {'name': 'author', 'field_type': 'foreign_key', 'related_model': 'Author', 'on_delete': 'SET_NULL'},
+            {'name': 'tags', 'field_type': 'many_to_many', 'related_model': 'Tag'},
+        ])
+        self.author = self.Author.objects.create(name='Calvino')
+        self.tags = [self.Tag.objects.create(label=label) for label in ['romanzo', 'classico']]
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+
+    def write_file(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(content)
+        return path
+
+    def import_file(self, path, *args):
+        stdout = StringIO()
+        call_command('import_dynamic_data', 'Book', path, *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def run_importer(self, rows, **kwargs):
+        importer = DynamicImporter(self.meta_model, self.Book, **kwargs)
+        return importer.run(rows)
+
+    def test_values_are_converted_by_field_type(self):
+        stats = self.run_importer([{
+            'title': 'Il barone rampante', 'isbn': '978-1', 'pages': '320', 'price': '12.50',
+            'published': '1957-06-01', 'available': 'sì', 'author': str(self.author.pk),
+            'tags': f'{self.tags[0].pk};{self.tags[1].pk}',
+        }])
+
+        self.assertEqual((stats['imported'], stats['rejected']), (1, 0))
+        book = self.Book.objects.get()
+        self.assertEqual(
+            (book.pages, book.price, book.published, book.available, book.author_id),
+            (320, Decimal('12.50'), date(1957, 6, 1), True, self.author.pk),
+        )
+        self.assertEqual(sorted(book.tags.values_list('label', flat=True)), ['classico', 'romanzo'])
+
+    def test_invalid_rows_are_rejected_with_row_number(self):
+        # Come le righe di un CSV: stesse colonne per tutte le righe
+        empty = {'title': '', 'pages': '10', 'published': '', 'available': '', 'author': ''}
+        rows = [
+            dict(empty, title='ok'),
+            dict(empty, title='pagine', pages='molte'),
+            dict(empty, title='data', published='ieri'),
+            dict(empty, title='booleano', available='forse'),
+            dict(empty, title='obbligatorio', pages=''),
+            dict(empty, title='autore', author='999'),
+        ]
+        stats = self.run_importer(rows)
+
+        self.assertEqual((stats['imported'], stats['rejected']), (1, 5))
+        errors = {error['row']: error['error'] for error in stats['errors']}
+        self.assertEqual(sorted(errors), [2, 3, 4, 5, 6])
+        self.assertTrue(errors[2].startswith('pages: '))
+        self.assertTrue(errors[6].startswith('author: '))
+        self.assertEqual(list(self.Book.objects.values_list('title', flat=True)), ['ok'])
+
+    def test_map_and_fk_lookup(self):
+        path = self.write_file('books.csv', (
+            'Titolo,Codice,Pagine,Autore,Generi,Note\n'
+            'Le città invisibili,978-2,170,Calvino,romanzo;classico,da rileggere\n'
+        ))
+        output = self.import_file(
+            path, '--map', 'Titolo=title', '--map', 'Codice=isbn', '--map', 'Pagine=pages',
+            '--map', 'Autore=author', '--map', 'Generi=tags',
+            '--fk-lookup', 'author=name', '--fk-lookup', 'tags=label',
+        )
+
+        book = self.Book.objects.get()
+        self.assertEqual((book.title, book.isbn, book.pages, book.author_id), ('Le città invisibili', '978-2', 170, self.author.pk))
+        self.assertEqual(sorted(book.tags.values_list('label', flat=True)), ['classico', 'romanzo'])
+        self.assertIn('Colonne ignorate: Note', output)
+
+    def test_ndjson_keeps_json_types(self):
+        path = self.write_file('books.ndjson', (
+            json.dumps({'title': 'Palomar', 'pages': 130, 'available': False, 'tags': [self.tags[0].pk]}) + '\n'
+        ))
+        self.import_file(path)
+
+        book = self.Book.objects.get()
+        self.assertEqual((book.pages, book.available), (130, False))
+        self.assertEqual(list(book.tags.all()), [self.tags[0]])
+
+    def test_invalid_configuration_is_rejected(self):
+        path = self.write_file('books.csv', 'title,pages\nPalomar,130\n')
+        for args in [
+            ['--map', 'title=missing'],
+            ['--map', 'Titolo=title'],
+            ['--fk-lookup', 'pages=name'],
+            ['--fk-lookup', 'author=missing', '--map', 'title=author'],
+            ['--map', 'title'],
+        ]:
+            with self.subTest(args=args):
+                with self.assertRaises(CommandError):
+                    self.import_file(path, *args)
+        self.assertFalse(self.Book.objects.exists())
+
+    def test_rejected_chunk_is_retried_row_by_row(self):
+        self.Book.objects.create(title='esistente', isbn='978-3', pages=1)
+        rows = [
+            {'title': 'primo', 'isbn': '978-4', 'pages': '10'},
+            {'title': 'duplicato', 'isbn': '978-3', 'pages': '10'},
+            {'title': 'terzo', 'isbn': '978-5', 'pages': '10'},
+            {'title': 'quarto', 'isbn': '978-6', 'pages': '10'},
+        ]
+        stats = self.run_importer(rows, chunk_size=3)
+
+        self.assertEqual((stats['imported'], stats['rejected']), (3, 1))
+        self.assertEqual([error['row'] for error in stats['errors']], [2])
+        self.assertEqual(
+            sorted(self.Book.objects.values_list('title', flat=True)),
+            ['esistente', 'primo', 'quarto', 'terzo'],
+        )
+
+    def test_offset_skips_imported_rows(self):
+        path = self.write_file('books.csv', 'title,pages\nuno,1\ndue,2\ntre,3\n')
+        self.import_file(path, '--offset', '2')
+        self.assertEqual(list(self.Book.objects.values_list('title', flat=True)), ['tre'])
+
+    def test_state_file_resumes_from_last_chunk(self):
+        path = self.write_file('books.csv', 'title,pages\nuno,1\ndue,2\ntre,3\n')
+        state_file = os.path.join(self.tmpdir, 'state.json')
+
+        self.import_file(path, '--chunk-size', '2', '--state-file', state_file)
+        with open(state_file, encoding='utf-8') as handle:
+            self.assertEqual(json.load(handle)['offset'], 3)
+
+        # Le righe aggiunte al file vengono importate, quelle già lette no
+        with open(path, 'a', encoding='utf-8') as handle:
+            handle.write('quattro,4\n')
+        output = self.import_file(path, '--chunk-size', '2', '--state-file', state_file)
+
+        self.assertIn('Ripresa dalla riga 3', output)
+        self.assertEqual(sorted(self.Book.objects.values_list('pages', flat=True)), [1, 2, 3, 4])
+
+        other_path = self.write_file('other.csv', 'title,pages\nuno,1\n')
+        with self.assertRaises(CommandError):
+            self.import_file(other_path, '--state-file', state_file)
+
+
+class ExporterTests(DynamicModelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        _, self.Tag = self.create_dynamic_model('Tag', [{'name': 'label', 'field_type': 'char'}])
+        self.meta_model, self.Book = self.create_dynamic_model('Book', [
+            {'name': 'title', 'field_type': 'char'},
+            {'name': 'price', 'field_type': 'decimal'},
+            {'name': 'published', 'field_type': 'date'},
+            {'name': 'updated', 'field_type': 'datetime'},
+            {'name': 'tags', 'field_type': 'many_to_many', 'related_model': 'Tag'},
+        ])
+        self.tags = [self.Tag.objects.create(label=label) for label in ['romanzo', 'classico']]
+        self.updated = timezone.make_aware(datetime(2024, 3, 1, 12, 30))
+        self.books = [
+            self.Book.objects.create(
+                title=f'libro {i}', price=Decimal('12.50') + i, published=date(2024, 1, i + 1), updated=self.updated
+            )
+            for i in range(5)
+        ]
+        self.books[0].tags.add(*self.tags)
+        self.books[3].tags.add(self.tags[1])
+        self.client.force_login(self.user)
+
+    def export(self, format_type):
+        response = self.client.get(f'/data/{self.meta_model.pk}/export/?format={format_type}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def test_rows_are_read_in_chunks(self):
+        columns, m2m_fields = get_export_columns(self.Book, list(self.meta_model.fields.all()))
+        progress = []
+
+        # Per blocco: una query per i record e una per le M2M; l'ultima lettura è vuota
+        with self.assertNumQueries(7):
+            rows = list(iter_export_rows(
+                self.Book.objects.all(), columns, m2m_fields, chunk_size=2, on_chunk=progress.append
+            ))
+
+        self.assertEqual(progress, [2, 4, 5])
+        self.assertEqual([row[0] for row in rows], [book.pk for book in self.books])
+        self.assertEqual(rows[0][-1], sorted(tag.pk for tag in self.tags))
+        self.assertEqual(rows[1][-1], [])
+
+    def test_json_export(self):
+        response, content = self.export('json')
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+        document = json.loads(content)
+        self.assertEqual((document['meta_model'], document['count']), ('Book', 5))
+        first = document['data'][0]
+        self.assertEqual(first['price'], '12.50')
+        self.assertEqual(first['published'], '2024-01-01')
+        self.assertEqual(first['updated'], self.updated.isoformat())
+        self.assertEqual(first['tags'], sorted(tag.pk for tag in self.tags))
+
+    def test_ndjson_export(self):
+        _, content = self.export('ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [book.pk for book in self.books])
+        self.assertEqual(rows[4]['price'], '16.50')
+        self.assertEqual(rows[3]['tags'], [self.tags[1].pk])
+
+    def test_csv_export(self):
+        response, content = self.export('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+
+        rows = list(csv.reader(StringIO(content)))
+        self.assertEqual(rows[0], ['id', 'title', 'price', 'published', 'updated', 'tags'])
+        self.assertEqual(len(rows), 6)
+        tag_ids = ';'.join(str(tag.pk) for tag in sorted(self.tags, key=lambda tag: tag.pk))
+        self.assertEqual(rows[1][1:], ['libro 0', '12.50', '2024-01-01', self.updated.isoformat(), tag_ids])
+        self.assertEqual(rows[2][-1], '')
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(f'/data/{self.meta_model.pk}/export/?format=xml')
+        self.assertEqual(response.status_code, 400)
+
+    def test_columnar_export_without_pyarrow(self):
+        for format_type in ['parquet', 'arrow']:
+            with self.subTest(format_type=format_type), \
+                    mock.patch.dict(sys.modules, {'pyarrow': None, 'pyarrow.parquet': None}):
+                response = self.client.get(f'/data/{self.meta_model.pk}/export/?format={format_type}')
+                self.assertEqual(response.status_code, 501)
+                self.assertIn('pyarrow', response.json()['error'])
+
+    @skipIf(pyarrow is None, 'pyarrow non installato')
+    def test_columnar_export_schema(self):
+        expected_types = {
+            'id': pyarrow.int64(),
+            'title': pyarrow.string(),
+            'price': pyarrow.decimal128(10, 2),
+            'published': pyarrow.date32(),
+            'updated': pyarrow.timestamp('us', tz=settings.TIME_ZONE if settings.USE_TZ else None),
+            'tags': pyarrow.list_(pyarrow.int64()),
+        }
+        readers = {
+            'parquet': pyarrow.parquet.read_table,
+            'arrow': lambda source: pyarrow.ipc.open_file(source).read_all(),
+        }
+
+        for format_type, read in readers.items():
+            with self.subTest(format_type=format_type):
+                response = self.client.get(f'/data/{self.meta_model.pk}/export/?format={format_type}')
+                self.assertEqual(response.status_code, 200)
+                table = read(pyarrow.BufferReader(b''.join(response.streaming_content)))
+
+                self.assertEqual({field.name: field.type for field in table.schema}, expected_types)
+                self.assertEqual(table.num_rows, 5)
+                first = table.slice(0, 1).to_pylist()[0]
+                self.assertEqual(first['price'], Decimal('12.50'))
+                self.assertEqual(first['published'], date(2024, 1, 1))
+                self.assertEqual(first['updated'], self.updated)
+                self.assertEqual(first['tags'], sorted(tag.pk for tag in self.tags))
+
+    @skipIf(pyarrow is None, 'pyarrow non installato')
+    def test_parquet_is_written_one_batch_per_chunk(self):
+        sink = pyarrow.BufferOutputStream()
+        count = write_columnar(sink, self.meta_model, self.Book, 'parquet', chunk_size=2)
+
+        self.assertEqual(count, 5)
+        parquet_file = pyarrow.parquet.ParquetFile(pyarrow.BufferReader(sink.getvalue()))
+        self.assertEqual(parquet_file.metadata.num_row_groups, 3)
+
+
+class FullTextSearchTests(DynamicModelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.meta_model, self.Article = self.create_dynamic_model('Article', [
+            {'name': 'title', 'field_type': 'char'},
+            {'name': 'body', 'field_type': 'text'},
+            {'name': 'pages', 'field_type': 'integer'},
+        ], fulltext_search=True)
+        if not is_fulltext_supported():
+            self.skipTest('FTS5 non disponibile')
+
+    def search(self, text, meta_model=None):
+        return apply_search(self.Article.objects.all(), meta_model or self.meta_model, self.Article, text)
+
+    def titles(self, queryset):
+        return list(queryset.values_list('title', flat=True))
+
+    def test_triggers_keep_index_in_sync(self):
+        article = self.Article.objects.create(title='Città invisibili', body='Marco Polo racconta')
+        self.assertEqual(self.titles(self.search('polo')), ['Città invisibili'])
+        # remove_diacritics: "citta" trova "Città"
+        self.assertEqual(self.titles(self.search('citta')), ['Città invisibili'])
+
+        article.body = 'Kublai Khan ascolta'
+        article.save()
+        self.assertEqual(self.titles(self.search('polo')), [])
+        self.assertEqual(self.titles(self.search('kublai')), ['Città invisibili'])
+
+        # Gli aggiornamenti delle colonne non indicizzate non toccano l'indice
+        self.Article.objects.filter(pk=article.pk).update(pages=180)
+        self.assertEqual(self.titles(self.search('kublai')), ['Città invisibili'])
+
+        article.delete()
+        self.assertEqual(self.titles(self.search('kublai')), [])
+
+    def test_results_are_ordered_by_rank(self):
+        self.Article.objects.create(title='Appunti', body='un barone tra tanti alberi e altre piante')
+        self.Article.objects.create(title='Il barone rampante', body='il barone vive sugli alberi, barone per sempre')
+        self.Article.objects.create(title='Il cavaliere inesistente', body='armatura vuota')
+
+        results = self.search('barone')
+        self.assertEqual(self.titles(results), ['Il barone rampante', 'Appunti'])
+        ranks = [article.search_rank for article in results]
+        self.assertEqual(ranks, sorted(ranks))
+        self.assertEqual(results.count(), 2)
+
+        # Un ordinamento esplicito sostituisce la rilevanza
+        self.assertEqual(self.titles(results.order_by('title')), ['Appunti', 'Il barone rampante'])
+        # Prefisso sull'ultima parola, operatori FTS5 non interpretati
+        self.assertEqual(self.titles(self.search('barone ramp')), ['Il barone rampante'])
+        self.assertEqual(self.titles(self.search('barone OR armatura')), [])
+
+    def test_without_index_falls_back_to_icontains(self):
+        self.Article.objects.create(title='Il barone rampante', body='romanzo')
+        self.meta_model.fulltext_search = False
+
+        with CaptureQueriesContext(connection) as queries:
+            # "aron" non è un prefisso: trovato solo dalla scansione con icontains
+            self.assertEqual(self.titles(self.search('aron')), ['Il barone rampante'])
+        self.assertNotIn('MATCH', queries[-1]['sql'])
+        self.assertIn('LIKE', queries[-1]['sql'])
+
+    def test_api_search(self):
+        self.Article.objects.create(title='Il barone rampante', body='alberi')
+        self.Article.objects.create(title='Il visconte dimezzato', body='medaglia')
+
+        response = self.api.get('/api/data/Article/?search=alberi')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([row['title'] for row in response.data['results']], ['Il barone rampante'])
+
+
+class DynamicFormCacheTests(DynamicModelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.meta_model, self.Book = self.create_library()
+        self.client.force_login(self.user)
+
+    def form_class(self):
+        response = self.client.get(f'/data/{self.meta_model.pk}/add/')
+        self.assertEqual(response.status_code, 200)
+        return type(response.context['form'])
+
+    def test_form_class_is_reused_across_requests(self):
+        form_class = self.form_class()
+        self.assertIs(self.form_class(), form_class)
+
+        meta_model = MetaModel.objects.get(pk=self.meta_model.pk)
+        with self.assertNumQueries(0):
+            self.assertIs(get_dynamic_form(self.Book, meta_model), form_class)
+
+        # Le istanze lavorano su una copia dei campi della classe
+        form = form_class()
+        form.fields['title'].label = 'modificato'
+        self.assertNotEqual(form_class.base_fields['title'].label, 'modificato')
+
+    def test_schema_change_invalidates_form_class(self):
+        form_class = self.form_class()
+        self.assertNotIn('isbn', form_class.base_fields)
+
+        MetaField.objects.create(meta_model=self.meta_model, name='isbn', field_type='char')
+        dynamic_model_manager.update_table(self.meta_model)
+        self.assertFalse([key for key in _form_class_cache if key[0].__name__ == 'Book'])
+
+        new_form_class = self.form_class()
+        self.assertIsNot(new_form_class, form_class)
+        self.assertIn('isbn', new_form_class.base_fields)
+
+
+class AutocompleteTests(DynamicModelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.meta_model, _ = self.create_library()
+        self.review_model, _ = self.create_dynamic_model('Review', [
+            {'name': 'reviewer', 'field_type': 'foreign_key', 'related_model': 'auth.User', 'on_delete': 'SET_NULL'},
+        ])
+        Author = dynamic_model_manager.get_model('Author')
+        self.authors = [Author.objects.create(name=f'autore {i:02d}') for i in range(AUTOCOMPLETE_PAGE_SIZE + 5)]
+        self.client.force_login(self.user)
+
+    def autocomplete(self, meta_model, field_name, **params):
+        response = self.client.get(f'/data/{meta_model.pk}/autocomplete/{field_name}/', params)
+        return response.status_code, response.json()
+
+    def test_results_are_paged_without_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            status, data = self.autocomplete(self.meta_model, 'author')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(set(data), {'results', 'pagination'})
+        self.assertEqual(data['pagination'], {'more': True})
+        self.assertEqual(len(data['results']), AUTOCOMPLETE_PAGE_SIZE)
+        first = data['results'][0]
+        self.assertEqual(set(first), {'id', 'text'})
+        self.assertEqual(first['id'], str(self.authors[0].pk))
+        self.assertTrue(first['text'].endswith(' · autore 00'))
+        self.assertFalse([query['sql'] for query in queries if 'COUNT(' in query['sql']])
+
+        status, data = self.autocomplete(self.meta_model, 'author', page=2)
+        self.assertEqual(data['pagination'], {'more': False})
+        self.assertEqual([row['id'] for row in data['results']], [str(author.pk) for author in self.authors[-5:]])
+
+    def test_search_by_text_and_id(self):
+        _, data = self.autocomplete(self.meta_model, 'author', term='autore 1')
+        self.assertEqual(len(data['results']), 10)
+
+        target = self.authors[7]
+        for term in [str(target.pk), f'#{target.pk}']:
+            with self.subTest(term=term):
+                _, data = self.autocomplete(self.meta_model, 'author', term=term)
+                self.assertEqual([row['id'] for row in data['results']], [str(target.pk)])
+
+    def test_unknown_or_non_relational_field_is_not_found(self):
+        for field_name in ['title', 'missing']:
+            with self.subTest(field_name=field_name):
+                response = self.client.get(f'/data/{self.meta_model.pk}/autocomplete/{field_name}/')
+                self.assertEqual(response.status_code, 404)
+
+    def test_django_models_require_view_permission(self):
+        staff = User.objects.create_user('staff', password='password', is_staff=True)
+        self.client.force_login(staff)
+
+        status, data = self.autocomplete(self.review_model, 'reviewer')
+        self.assertEqual(status, 403)
+        self.assertIn('error', data)
+
+        staff.user_permissions.add(Permission.objects.get(codename='view_user'))
+        staff = User.objects.get(pk=staff.pk)
+        self.client.force_login(staff)
+        status, data = self.autocomplete(self.review_model, 'reviewer', term='admin')
+        self.assertEqual(status, 200)
+        self.assertEqual([row['id'] for row in data['results']], [str(self.user.pk)])
+
+
+class RelationPlanTests(DynamicModelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.meta_model, self.Book = self.create_library()
+        Author = dynamic_model_manager.get_model('Author')
+        Tag = dynamic_model_manager.get_model('Tag')
+        authors = [Author.objects.create(name=f'autore {i}') for i in range(3)]
+        tags = [Tag.objects.create(label=f'tag {i}') for i in range(3)]
+        for i in range(30):
+            book = self.Book.objects.create(title=f'libro {i}', pages=i, author=authors[i % 3])
+            book.tags.add(tags[i % 3], tags[(i + 1) % 3])
+        self.client.force_login(self.user)
+
+    def count_queries(self, client, url):
+        client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_plan(self):
+        fields = list(self.meta_model.fields.all())
+        plan = get_relation_plan(self.Book, fields, self.meta_model.schema_version)
+        self.assertEqual(plan, RelationPlan(('author',), ('tags',)))
+        self.assertIs(get_relation_plan(self.Book, fields, self.meta_model.schema_version), plan)
+
+        # Con ?fields= solo le relazioni richieste
+        plan = get_relation_plan(self.Book, fields, self.meta_model.schema_version, ('id', 'title', 'author'))
+        self.assertEqual(plan, RelationPlan(('author',), ()))
+
+    def test_api_queries_do_not_depend_on_page_size(self):
+        for params in ['', '&expand=author', '&expand=author,tags', '&fields=id,title']:
+            with self.subTest(params=params):
+                small = self.count_queries(self.api, f'/api/data/Book/?page_size=5{params}')
+                large = self.count_queries(self.api, f'/api/data/Book/?page_size=30{params}')
+                self.assertEqual(small, large)
+
+    def test_admin_list_queries_do_not_depend_on_rows(self):
+        url = f'/data/{self.meta_model.pk}/'
+        full_page = self.count_queries(self.client, url)
+
+        self.Book.objects.filter(pages__gte=3).delete()
+        self.assertEqual(self.count_queries(self.client, url), full_page)
+
+
+class ExpandTests(DynamicModelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        _, self.Book = self.create_library()
+        _, self.Review = self.create_dynamic_model('Review', [
+            {'name': 'text', 'field_type': 'text'},
+            {'name': 'book', 'field_type': 'foreign_key', 'related_model': 'Book', 'on_delete': 'CASCADE'},
+            {'name': 'reviewer', 'field_type': 'foreign_key', 'related_model': 'auth.User', 'on_delete': 'SET_NULL'},
+        ])
+        self.author = dynamic_model_manager.get_model('Author').objects.create(name='Calvino')
+        Tag = dynamic_model_manager.get_model('Tag')
+        self.tags = [Tag.objects.create(label=label) for label in ['romanzo', 'classico']]
+        self.book = self.Book.objects.create(title='Il barone rampante', pages=280, author=self.author)
+        self.book.tags.add(*self.tags)
+        self.review = self.Review.objects.create(text='bello', book=self.book, reviewer=self.user)
+
+    def get(self, url):
+        response = self.api.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def test_foreign_key_and_many_to_many(self):
+        row = self.get('/api/data/Book/?expand=author')['results'][0]
+        self.assertEqual(row['author'], {'id': self.author.pk, 'name': 'Calvino'})
+        # Le molti a molti non espanse restano liste di id
+        self.assertEqual(sorted(row['tags']), sorted(tag.pk for tag in self.tags))
+
+        row = self.get(f'/api/data/Book/{self.book.pk}/?expand=tags')
+        self.assertEqual(row['author'], self.author.pk)
+        self.assertEqual(sorted(tag['label'] for tag in row['tags']), ['classico', 'romanzo'])
+
+    def test_nested_paths(self):
+        row = self.get('/api/data/Review/?expand=book.author')['results'][0]
+        self.assertEqual(row['book']['title'], 'Il barone rampante')
+        self.assertEqual(row['book']['author']['name'], 'Calvino')
+        self.assertEqual(sorted(row['book']['tags']), sorted(tag.pk for tag in self.tags))
+        self.assertEqual(row['reviewer'], self.user.pk)
+
+    def test_depth_limit(self):
+        self.get('/api/data/Review/?expand=book.tags')
+
+        with override_settings(DYNAMIC_MODELS_MAX_EXPAND_DEPTH=1):
+            response = self.api.get('/api/data/Review/?expand=book.tags')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('profondità', str(response.data['expand']))
+            self.get('/api/data/Review/?expand=book')
+
+    def test_invalid_paths_are_rejected(self):
+        for expand in ['reviewer', 'text', 'missing', 'book.missing']:
+            with self.subTest(expand=expand):
+                response = self.api.get(f'/api/data/Review/?expand={expand}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('expand', response.data)
+
+        # I campi dei modelli Django non vengono esposti
+        self.assertIn('auth.User', str(self.api.get('/api/data/Review/?expand=reviewer').data['expand']))
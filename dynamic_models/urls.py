@@ -2,15 +2,17 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .api_views import MetaModelViewSet, DynamicModelViewSet
 from .auth_views import CustomAuthToken, LogoutView
+from .job_views import DataJobViewSet
 from .data_views import (
     dynamic_data_list, dynamic_data_add, dynamic_data_edit, 
-    dynamic_data_delete, dynamic_data_export
+    dynamic_data_delete, dynamic_data_export, dynamic_data_autocomplete
 )
 from .backup_views import backup_management_view, restore_backup_view, backup_status_api
 
 # Router per le API
 router = DefaultRouter()
 router.register(r'meta-models', MetaModelViewSet, basename='metamodel')
+router.register(r'jobs', DataJobViewSet, basename='datajob')
 
 urlpatterns = [
     # Auth endpoints  
@@ -29,6 +31,13 @@ urlpatterns = [
          }), 
          name='dynamic-model-list'),
     
+    # Scrittura massiva: lista JSON o NDJSON, ?upsert_on=<campo unique>, ?chunk_size=
+    path('api/data/<str:model_name>/bulk/', 
+         DynamicModelViewSet.as_view({
+             'post': 'bulk'
+         }), 
+         name='dynamic-model-bulk'),
+    
     path('api/data/<str:model_name>/<int:pk>/', 
          DynamicModelViewSet.as_view({
              'get': 'retrieve',
@@ -44,6 +53,8 @@ urlpatterns = [
     path('data/<int:meta_model_id>/<int:object_id>/', dynamic_data_edit, name='dynamic_data_edit'),
     path('data/<int:meta_model_id>/<int:object_id>/delete/', dynamic_data_delete, name='dynamic_data_delete'),
     path('data/<int:meta_model_id>/export/', dynamic_data_export, name='dynamic_data_export'),
+    path('data/<int:meta_model_id>/autocomplete/<str:field_name>/', dynamic_data_autocomplete, 
+         name='dynamic_data_autocomplete'),
     
     # Admin backup management
     path('backup-management/', backup_management_view, name='backup_management'),
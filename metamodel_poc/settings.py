@@ -56,6 +56,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'dynamic_models.middleware.SchemaVersionSyncMiddleware',
 ]
 
 REST_FRAMEWORK = {
@@ -70,6 +71,23 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 50
 }
 
+# Modelli dinamici
+# Con il caricamento lazy le classi vengono costruite al primo utilizzo invece che all'avvio;
+# oltre il limite i modelli usati meno di recente (e non referenziati da relazioni) vengono rimossi
+DYNAMIC_MODELS_LAZY_LOADING = False
+DYNAMIC_MODELS_MAX_LOADED_MODELS = 500
+# Paginazione a cursore (keyset) di default per /api/data/<model>/ e per la lista dati dell'admin;
+# se False resta attivabile per richiesta con ?pagination=cursor
+DYNAMIC_MODELS_CURSOR_PAGINATION = False
+# Righe validate e scritte per transazione da POST /api/data/<model>/bulk/ (sovrascrivibile con ?chunk_size=)
+DYNAMIC_MODELS_BULK_CHUNK_SIZE = 1000
+# Conteggi delle liste filtrate: esatti fino a questa soglia, oltre approssimati
+# (stima del planner su PostgreSQL, altrimenti "oltre N"); None = sempre esatti.
+# Le liste non filtrate usano sempre il contatore mantenuto dai trigger
+DYNAMIC_MODELS_APPROXIMATE_COUNT_THRESHOLD = None
+# Profondità massima dei percorsi di ?expand= (es. 2 = "coauthors.author")
+DYNAMIC_MODELS_MAX_EXPAND_DEPTH = 2
+
 ROOT_URLCONF = 'metamodel_poc.urls'
 
 TEMPLATES = [
@@ -96,6 +114,11 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # WAL: le letture non bloccano le scritture dei worker di run_dynamic_jobs
+        'OPTIONS': {
+            'timeout': 20,
+            'init_command': 'PRAGMA journal_mode=WAL;',
+        },
     }
 }
 